@@ -0,0 +1,69 @@
+# alembic/env.py
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+
+# Make `app` importable when alembic is run from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, DATABASE_URL, Base
+from app import models  # noqa: F401  (registers every table on Base.metadata)
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Keeps autogenerate away from the FTS5 table and its shadow tables, which 0003 manages by hand."""
+    return not (type_ == "table" and name.startswith("products_fts"))
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL for the configured database without connecting."""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations on the app's engine (or a connection handed in by run_migrations)."""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite can't ALTER most things in place; batch mode rebuilds the table
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,197 @@
+"""Baseline schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 17:49:03.674683
+
+The original schema, as Base.metadata.create_all built it before search,
+facets and the hot-path indexes. Databases created with create_all are
+stamped at this revision by app.database.run_migrations and then upgraded.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('first_name', sa.String(length=100), nullable=False),
+    sa.Column('last_name', sa.String(length=100), nullable=False),
+    sa.Column('address', sa.Text(), nullable=False),
+    sa.Column('city', sa.String(length=100), nullable=False),
+    sa.Column('state', sa.String(length=100), nullable=False),
+    sa.Column('country', sa.String(length=100), nullable=True),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('user_type', sa.String(length=20), nullable=False),
+    sa.Column('farm_name', sa.String(length=255), nullable=True),
+    sa.Column('farm_size', sa.String(length=100), nullable=True),
+    sa.Column('farm_type', sa.String(length=100), nullable=True),
+    sa.Column('years_farming', sa.Integer(), nullable=True),
+    sa.Column('business_name', sa.String(length=255), nullable=True),
+    sa.Column('business_type', sa.String(length=100), nullable=True),
+    sa.Column('business_reg_number', sa.String(length=100), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('location', sa.String(length=255), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('profile_photo', sa.String(length=500), nullable=True),
+    sa.Column('farm_photo', sa.String(length=500), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table('business_profiles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('business_name', sa.String(length=255), nullable=False),
+    sa.Column('business_type', sa.String(length=100), nullable=False),
+    sa.Column('business_reg_number', sa.String(length=100), nullable=False),
+    sa.Column('business_description', sa.Text(), nullable=True),
+    sa.Column('business_logo', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index('ix_business_profiles_id', 'business_profiles', ['id'], unique=False)
+
+    op.create_table('farmer_profiles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('farm_name', sa.String(length=255), nullable=False),
+    sa.Column('farm_size', sa.String(length=100), nullable=False),
+    sa.Column('farm_type', sa.String(length=100), nullable=False),
+    sa.Column('years_farming', sa.Integer(), nullable=True),
+    sa.Column('certification', sa.JSON(), nullable=True),
+    sa.Column('farm_description', sa.Text(), nullable=True),
+    sa.Column('farm_photo', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index('ix_farmer_profiles_id', 'farmer_profiles', ['id'], unique=False)
+
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_number', sa.String(length=50), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('payment_status', sa.String(length=50), nullable=True),
+    sa.Column('delivery_type', sa.String(length=50), nullable=False),
+    sa.Column('delivery_address', sa.Text(), nullable=True),
+    sa.Column('delivery_date', sa.DateTime(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_orders_id', 'orders', ['id'], unique=False)
+    op.create_index('ix_orders_order_number', 'orders', ['order_number'], unique=True)
+
+    op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('quantity_available', sa.Integer(), nullable=True),
+    sa.Column('unit', sa.String(length=50), nullable=False),
+    sa.Column('min_order_quantity', sa.Integer(), nullable=True),
+    sa.Column('is_available', sa.Boolean(), nullable=True),
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_products_id', 'products', ['id'], unique=False)
+
+    op.create_table('order_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('unit_price', sa.Float(), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_items_id', 'order_items', ['id'], unique=False)
+
+    op.create_table('product_images',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('image_url', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_product_images_id', 'product_images', ['id'], unique=False)
+
+    op.create_table('reviews',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('farmer_id', sa.Integer(), nullable=True),
+    sa.Column('rating', sa.Integer(), nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('is_approved', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reviews_id', 'reviews', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reviews_id', table_name='reviews')
+
+    op.drop_table('reviews')
+    op.drop_index('ix_product_images_id', table_name='product_images')
+
+    op.drop_table('product_images')
+    op.drop_index('ix_order_items_id', table_name='order_items')
+
+    op.drop_table('order_items')
+    op.drop_index('ix_products_id', table_name='products')
+
+    op.drop_table('products')
+    op.drop_index('ix_orders_order_number', table_name='orders')
+    op.drop_index('ix_orders_id', table_name='orders')
+
+    op.drop_table('orders')
+    op.drop_index('ix_farmer_profiles_id', table_name='farmer_profiles')
+
+    op.drop_table('farmer_profiles')
+    op.drop_index('ix_business_profiles_id', table_name='business_profiles')
+
+    op.drop_table('business_profiles')
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+
+    op.drop_table('users')
@@ -0,0 +1,86 @@
+"""Hot-path composite and partial indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 18:32:41.118204
+
+Backfills products.is_available and makes it NOT NULL so the catalog can
+filter on `is_available = true` alone, then adds indexes for the queries
+the API actually runs:
+
+- partial (created_at, id) and (category, price) indexes over listable
+  products for the keyset listing, category/price filters and facet seeks
+- (farmer_id, created_at, id) for farmer listings
+- order_items.order_id / product_id for the eager loads and stock lookups
+- (customer_id, created_at) for buyer order history
+- users.phone and product_images.product_id for lookups by those columns
+
+Every step checks what already exists, since databases built by earlier
+create_all calls may have some of these already.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+LISTABLE_WHERE = {
+    "sqlite_where": sa.text("is_available = 1"),
+    "postgresql_where": sa.text("is_available"),
+}
+
+INDEXES = [
+    ("ix_products_listable_created_at_id", "products", ["created_at", "id"], LISTABLE_WHERE),
+    ("ix_products_listable_category_price", "products", ["category", "price"], LISTABLE_WHERE),
+    ("ix_products_farmer_created_at_id", "products", ["farmer_id", "created_at", "id"], {}),
+    ("ix_order_items_order_id", "order_items", ["order_id"], {}),
+    ("ix_order_items_product_id", "order_items", ["product_id"], {}),
+    ("ix_orders_customer_created_at", "orders", ["customer_id", "created_at"], {}),
+    ("ix_users_phone", "users", ["phone"], {}),
+    ("ix_product_images_product_id", "product_images", ["product_id"], {}),
+]
+
+
+def _index_names(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    op.execute("UPDATE products SET is_available = true WHERE is_available IS NULL")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.alter_column(
+            "is_available",
+            existing_type=sa.Boolean(),
+            nullable=False,
+            server_default=sa.true(),
+        )
+
+    # Superseded by the partial listable index
+    if "ix_products_created_at_id" in _index_names("products"):
+        op.drop_index("ix_products_created_at_id", table_name="products")
+
+    for name, table, columns, options in INDEXES:
+        if name not in _index_names(table):
+            op.create_index(name, table, columns, unique=False, **options)
+
+
+def downgrade() -> None:
+    for name, table, columns, options in reversed(INDEXES):
+        if name in _index_names(table):
+            op.drop_index(name, table_name=table)
+
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.alter_column(
+            "is_available",
+            existing_type=sa.Boolean(),
+            nullable=True,
+            server_default=None,
+        )
@@ -0,0 +1,101 @@
+"""Product search index and category facet tables
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:47:09.530176
+
+Brings the product search index (FTS5 on SQLite, GIN on PostgreSQL) and
+the category facet summary tables under migrations. Both were previously
+created by create_all, so existing objects are left in place. The FTS
+index and facet tables are rebuilt from products at the end: 0002's batch
+rebuild of `products` on SQLite drops any sync triggers created before it.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        content='products', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN ("
+    "to_tsvector('english', coalesce(name, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(category, '')))",
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+
+    if "category_facets" not in tables:
+        op.create_table('category_facets',
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('available_count', sa.Integer(), nullable=False),
+        sa.Column('min_price', sa.Float(), nullable=True),
+        sa.Column('max_price', sa.Float(), nullable=True),
+        sa.Column('median_price', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('category')
+        )
+    if "category_price_buckets" not in tables:
+        op.create_table('category_price_buckets',
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('bucket', sa.Integer(), nullable=False),
+        sa.Column('product_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('category', 'bucket')
+        )
+
+    if bind.dialect.name == "sqlite":
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+    elif bind.dialect.name == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+
+    from app.utils.facets import rebuild_category_facets
+    session = Session(bind=bind)
+    rebuild_category_facets(session)
+    session.flush()
+    session.close()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in ("products_fts_ai", "products_fts_ad", "products_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS products_fts")
+    elif op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_products_search")
+    op.drop_table('category_price_buckets')
+    op.drop_table('category_facets')
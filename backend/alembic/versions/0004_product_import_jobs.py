@@ -0,0 +1,43 @@
+"""Product import jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 19:26:12.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('product_import_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_rows', sa.Integer(), nullable=False),
+    sa.Column('created_count', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('errors', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_product_import_jobs_farmer_id', 'product_import_jobs', ['farmer_id'], unique=False)
+    op.create_index('ix_product_import_jobs_id', 'product_import_jobs', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_import_jobs_id', table_name='product_import_jobs')
+    op.drop_index('ix_product_import_jobs_farmer_id', table_name='product_import_jobs')
+    op.drop_table('product_import_jobs')
@@ -0,0 +1,50 @@
+"""Farm coordinates and product geohash index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 19:58:37.240915
+
+Adds latitude/longitude to users (the farm location) and denormalizes them,
+plus a precision-9 geohash, onto products. Products inherit their farmer's
+location; no farmer has coordinates yet, so there is nothing to backfill.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    op.create_index(
+        'ix_products_listable_geohash', 'products', ['geohash'], unique=False,
+        sqlite_where=sa.text("is_available = 1"), postgresql_where=sa.text("is_available"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_listable_geohash', table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
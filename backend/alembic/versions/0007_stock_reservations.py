@@ -0,0 +1,64 @@
+"""Stock reservations
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 21:12:48.530611
+
+Adds reservations and their items, plus products.quantity_reserved: the
+running total of units held by unexpired reservations, so listings can show
+sellable stock without summing reservations per request.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('quantity_reserved', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('buyer_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['buyer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reservations_buyer_id', 'reservations', ['buyer_id'], unique=False)
+    op.create_index('ix_reservations_expires_at', 'reservations', ['expires_at'], unique=False)
+    op.create_index('ix_reservations_id', 'reservations', ['id'], unique=False)
+
+    op.create_table('reservation_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['reservation_id'], ['reservations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reservation_items_id', 'reservation_items', ['id'], unique=False)
+    op.create_index('ix_reservation_items_reservation_id', 'reservation_items', ['reservation_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservation_items_reservation_id', table_name='reservation_items')
+    op.drop_index('ix_reservation_items_id', table_name='reservation_items')
+    op.drop_table('reservation_items')
+    op.drop_index('ix_reservations_id', table_name='reservations')
+    op.drop_index('ix_reservations_expires_at', table_name='reservations')
+    op.drop_index('ix_reservations_buyer_id', table_name='reservations')
+    op.drop_table('reservations')
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('quantity_reserved')
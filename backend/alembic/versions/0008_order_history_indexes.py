@@ -0,0 +1,38 @@
+"""Order history keyset indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 21:49:20.671035
+
+Buyer and farmer order histories page by (created_at, id), newest first.
+The buyer index gains the id tiebreaker plus a status-filtered variant, and
+the farmer inbox walks orders in (created_at, id) order.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_orders_customer_created_at', table_name='orders')
+    op.create_index('ix_orders_customer_created_at_id', 'orders', ['customer_id', 'created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_orders_customer_status_created_at_id', 'orders', ['customer_id', 'status', 'created_at', 'id'], unique=False
+    )
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
+    op.drop_index('ix_orders_customer_status_created_at_id', table_name='orders')
+    op.drop_index('ix_orders_customer_created_at_id', table_name='orders')
+    op.create_index('ix_orders_customer_created_at', 'orders', ['customer_id', 'created_at'], unique=False)
@@ -0,0 +1,48 @@
+"""Farmer-order link table
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 23:12:41.208530
+
+One farmer_orders row per (farmer, order) with the farmer's subtotal and line
+count, backfilled from order_items. The farmer inbox pages it by primary key,
+so the (created_at, id) walk over all orders and its index go away.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('farmer_orders',
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('subtotal', sa.Float(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('farmer_id', 'order_id')
+    )
+    op.create_index(op.f('ix_farmer_orders_order_id'), 'farmer_orders', ['order_id'], unique=False)
+    op.execute(
+        "INSERT INTO farmer_orders (farmer_id, order_id, subtotal, item_count) "
+        "SELECT products.farmer_id, order_items.order_id, SUM(order_items.total_price), COUNT(*) "
+        "FROM order_items JOIN products ON products.id = order_items.product_id "
+        "GROUP BY products.farmer_id, order_items.order_id"
+    )
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
+
+
+def downgrade() -> None:
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+    op.drop_index(op.f('ix_farmer_orders_order_id'), table_name='farmer_orders')
+    op.drop_table('farmer_orders')
@@ -0,0 +1,57 @@
+"""Inventory ledger and snapshots
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:41:07.318254
+
+Append-only inventory_movements plus per-product inventory_snapshots. Every
+existing product gets an opening snapshot of its current quantity_available,
+so the ledger balances from here on.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('inventory_movements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_inventory_movements_id'), 'inventory_movements', ['id'], unique=False)
+    op.create_index('ix_inventory_movements_product_id_id', 'inventory_movements', ['product_id', 'id'], unique=False)
+    op.create_table('inventory_snapshots',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('last_movement_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    op.execute(
+        "INSERT INTO inventory_snapshots (product_id, quantity, last_movement_id) "
+        "SELECT id, COALESCE(quantity_available, 0), 0 FROM products"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('inventory_snapshots')
+    op.drop_index('ix_inventory_movements_product_id_id', table_name='inventory_movements')
+    op.drop_index(op.f('ix_inventory_movements_id'), table_name='inventory_movements')
+    op.drop_table('inventory_movements')
@@ -0,0 +1,82 @@
+"""Farmer sales rollups
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 02:06:53.904127
+
+Per-farmer daily sales, per-product totals and per-customer order counts for
+the analytics dashboard, backfilled from order_items. Cancelled orders don't
+count; delivered ones also count as earned.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE_ITEMS = (
+    "FROM order_items JOIN orders ON orders.id = order_items.order_id "
+    "JOIN products ON products.id = order_items.product_id "
+    "WHERE COALESCE(orders.status, 'pending') != 'cancelled' "
+)
+
+
+def upgrade() -> None:
+    op.create_table('farmer_customers',
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('farmer_id', 'customer_id')
+    )
+    op.create_table('farmer_daily_sales',
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('earned', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('farmer_id', 'day')
+    )
+    op.create_table('farmer_product_sales',
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('farmer_id', 'product_id')
+    )
+    op.execute(
+        "INSERT INTO farmer_daily_sales (farmer_id, day, order_count, units, revenue, earned) "
+        "SELECT products.farmer_id, DATE(orders.created_at), COUNT(DISTINCT orders.id), "
+        "CAST(SUM(order_items.quantity) AS INTEGER), SUM(order_items.total_price), "
+        "SUM(CASE WHEN orders.status = 'delivered' THEN order_items.total_price ELSE 0 END) "
+        + LIVE_ITEMS + "GROUP BY products.farmer_id, DATE(orders.created_at)"
+    )
+    op.execute(
+        "INSERT INTO farmer_product_sales (farmer_id, product_id, units, revenue) "
+        "SELECT products.farmer_id, order_items.product_id, "
+        "CAST(SUM(order_items.quantity) AS INTEGER), SUM(order_items.total_price) "
+        + LIVE_ITEMS + "GROUP BY products.farmer_id, order_items.product_id"
+    )
+    op.execute(
+        "INSERT INTO farmer_customers (farmer_id, customer_id, order_count) "
+        "SELECT products.farmer_id, orders.customer_id, COUNT(DISTINCT orders.id) "
+        + LIVE_ITEMS + "GROUP BY products.farmer_id, orders.customer_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('farmer_product_sales')
+    op.drop_table('farmer_daily_sales')
+    op.drop_table('farmer_customers')
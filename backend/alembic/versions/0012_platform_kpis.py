@@ -0,0 +1,48 @@
+"""Platform KPI snapshots
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 03:27:15.660482
+
+Snapshot table for the admin dashboard KPIs, plus created_at indexes on orders
+and users and a day index on the farmer sales rollup, so each refresh only
+range-scans the KPI window.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('platform_kpi_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('as_of', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('window_days', sa.Integer(), nullable=False),
+    sa.Column('gmv', sa.Float(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('signups', sa.Integer(), nullable=False),
+    sa.Column('active_farmers', sa.Integer(), nullable=False),
+    sa.Column('total_users', sa.Integer(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('daily', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'], unique=False)
+    op.create_index('ix_users_created_at', 'users', ['created_at'], unique=False)
+    op.create_index('ix_farmer_daily_sales_day', 'farmer_daily_sales', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_farmer_daily_sales_day', table_name='farmer_daily_sales')
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_index('ix_orders_created_at', table_name='orders')
+    op.drop_table('platform_kpi_snapshots')
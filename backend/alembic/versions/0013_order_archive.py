@@ -0,0 +1,101 @@
+"""Order archive tables
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 04:12:48.207531
+
+archived_orders, archived_order_items and archived_farmer_orders receive
+finished orders from the archiver. inventory_movements.order_id loses its
+foreign key to orders, since the order it names may have been archived.
+Downgrading moves archived orders back into the hot tables.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Names SQLite's unnamed foreign keys so batch mode can drop the one to orders
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+ORDER_COLUMNS = (
+    "id, order_number, customer_id, total_amount, status, payment_status, delivery_type, "
+    "delivery_address, delivery_date, notes, created_at, updated_at"
+)
+ORDER_ITEM_COLUMNS = "id, order_id, product_id, quantity, unit_price, total_price"
+FARMER_ORDER_COLUMNS = "farmer_id, order_id, subtotal, item_count"
+
+
+def upgrade() -> None:
+    op.create_table('archived_orders',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_number', sa.String(length=50), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('payment_status', sa.String(length=50), nullable=True),
+    sa.Column('delivery_type', sa.String(length=50), nullable=False),
+    sa.Column('delivery_address', sa.Text(), nullable=True),
+    sa.Column('delivery_date', sa.DateTime(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archived_orders_customer_created_at_id', 'archived_orders',
+                    ['customer_id', 'created_at', 'id'], unique=False)
+    op.create_table('archived_order_items',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('unit_price', sa.Float(), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['archived_orders.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_order_items_order_id'), 'archived_order_items', ['order_id'], unique=False)
+    op.create_table('archived_farmer_orders',
+    sa.Column('farmer_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('subtotal', sa.Float(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['order_id'], ['archived_orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('farmer_id', 'order_id')
+    )
+    op.create_index(op.f('ix_archived_farmer_orders_order_id'), 'archived_farmer_orders', ['order_id'], unique=False)
+
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table('inventory_movements', naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint('fk_inventory_movements_order_id_orders', type_='foreignkey')
+    else:
+        op.drop_constraint('inventory_movements_order_id_fkey', 'inventory_movements', type_='foreignkey')
+
+
+def downgrade() -> None:
+    op.execute(f"INSERT INTO orders ({ORDER_COLUMNS}) SELECT {ORDER_COLUMNS} FROM archived_orders")
+    op.execute(f"INSERT INTO order_items ({ORDER_ITEM_COLUMNS}) SELECT {ORDER_ITEM_COLUMNS} FROM archived_order_items")
+    op.execute(
+        f"INSERT INTO farmer_orders ({FARMER_ORDER_COLUMNS}) SELECT {FARMER_ORDER_COLUMNS} FROM archived_farmer_orders"
+    )
+    with op.batch_alter_table('inventory_movements') as batch_op:
+        batch_op.create_foreign_key('fk_inventory_movements_order_id_orders', 'orders',
+                                    ['order_id'], ['id'], ondelete='SET NULL')
+
+    op.drop_index(op.f('ix_archived_farmer_orders_order_id'), table_name='archived_farmer_orders')
+    op.drop_table('archived_farmer_orders')
+    op.drop_index(op.f('ix_archived_order_items_order_id'), table_name='archived_order_items')
+    op.drop_table('archived_order_items')
+    op.drop_index('ix_archived_orders_customer_created_at_id', table_name='archived_orders')
+    op.drop_table('archived_orders')
@@ -0,0 +1,31 @@
+"""Product version for optimistic locking
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 05:02:31.846120
+
+Adds products.version, the optimistic-locking counter product edits check and
+bump (and take as If-Match). Existing products start at 1.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0014'
+down_revision: Union[str, None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('version')
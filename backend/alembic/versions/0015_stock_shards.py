@@ -0,0 +1,47 @@
+"""Sharded stock for high-contention products
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 05:48:10.392715
+
+Adds products.stock_shards (0 = off) and product_stock_shards, which holds the
+sellable stock of products in high-contention mode so checkouts don't all
+update the same products row.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0015'
+down_revision: Union[str, None] = '0014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('stock_shards', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('product_stock_shards',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'shard')
+    )
+
+
+def downgrade() -> None:
+    # Shard stock goes back onto the products row first
+    op.execute(
+        "UPDATE products SET quantity_available = quantity_reserved + "
+        "(SELECT COALESCE(SUM(quantity), 0) FROM product_stock_shards WHERE product_id = products.id) "
+        "WHERE stock_shards > 0"
+    )
+    op.drop_table('product_stock_shards')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_column('stock_shards')
@@ -0,0 +1,57 @@
+"""Per-movement folded flag for the inventory ledger
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19 09:12:44.501873
+
+Adds inventory_movements.folded, set by the compactor on each movement it adds
+to a snapshot, replacing the id watermark (snapshot last_movement_id), which a
+movement committed after higher ids could slip under. Movements at or below
+their product's last_movement_id are marked folded, so balances don't change.
+Partial indexes cover the unfolded tail.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0016'
+down_revision: Union[str, None] = '0015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+UNFOLDED_WHERE = {
+    "sqlite_where": sa.text("folded = 0"),
+    "postgresql_where": sa.text("NOT folded"),
+}
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('inventory_movements') as batch_op:
+        batch_op.add_column(sa.Column('folded', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    movements = sa.table('inventory_movements', sa.column('product_id'), sa.column('id'), sa.column('folded'))
+    snapshots = sa.table('inventory_snapshots', sa.column('product_id'), sa.column('last_movement_id'))
+    op.execute(
+        movements.update()
+        .where(movements.c.id <= sa.select(snapshots.c.last_movement_id)
+               .where(snapshots.c.product_id == movements.c.product_id)
+               .scalar_subquery())
+        .values(folded=sa.true())
+    )
+
+    op.create_index('ix_inventory_movements_unfolded_product_id', 'inventory_movements', ['product_id'],
+                    unique=False, **UNFOLDED_WHERE)
+    op.create_index('ix_inventory_movements_unfolded_id', 'inventory_movements', ['id'],
+                    unique=False, **UNFOLDED_WHERE)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_movements_unfolded_id', table_name='inventory_movements')
+    op.drop_index('ix_inventory_movements_unfolded_product_id', table_name='inventory_movements')
+    with op.batch_alter_table('inventory_movements') as batch_op:
+        batch_op.drop_column('folded')
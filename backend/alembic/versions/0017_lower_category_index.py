@@ -0,0 +1,33 @@
+"""Case-insensitive category index
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-19 09:41:03.227910
+
+The listing's category filter compares lower(category), so it gets a partial
+(lower(category), price) expression index over listable products alongside the
+(category, price) one the facet seeks use.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0017'
+down_revision: Union[str, None] = '0016'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_products_listable_lower_category_price', 'products', [sa.text('lower(category)'), 'price'],
+        unique=False, sqlite_where=sa.text("is_available = 1"), postgresql_where=sa.text("is_available"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_listable_lower_category_price', table_name='products')
@@ -0,0 +1,39 @@
+"""Payment status order history indexes
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-19 10:06:52.318604
+
+The buyer order history can filter on payment_status, which no index led
+with after customer_id, so the filter was applied row by row over the
+customer's whole history. Live and archived orders get a
+(customer_id, payment_status, created_at, id) index, like the status one.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0018'
+down_revision: Union[str, None] = '0017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_orders_customer_payment_status_created_at_id', 'orders',
+        ['customer_id', 'payment_status', 'created_at', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_archived_orders_customer_payment_status_created_at_id', 'archived_orders',
+        ['customer_id', 'payment_status', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_archived_orders_customer_payment_status_created_at_id', table_name='archived_orders')
+    op.drop_index('ix_orders_customer_payment_status_created_at_id', table_name='orders')
@@ -1,4 +1,6 @@
 # app/main.py
+import asyncio
+import os
 import sys
 from pathlib import Path
 
@@ -30,11 +32,19 @@ ALGORITHM = "HS256"
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-from app.database import engine, Base
-from app.routers import auth, products, orders
+from app.database import SessionLocal, run_migrations
+from app.routers import auth, products, orders, reservations, farmers, admin
+from app.utils.reservations import run_reservation_sweeper
+from app.utils.inventory import run_inventory_compactor
+from app.utils.platform_kpis import run_kpi_refresher
+from app.utils.order_archive import run_order_archiver
+from app.utils.stock_shards import run_stock_rebalancer
+from app.utils.query_counter import count_queries, QUERY_COUNT_WARNING
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Bring the schema up to date. Set RUN_MIGRATIONS=false when a deploy step
+# runs `alembic upgrade head` separately.
+if os.getenv("RUN_MIGRATIONS", "true").lower() == "true":
+    run_migrations()
 
 # ✅ CREATE ONLY ONE FastAPI APP
 app = FastAPI(
@@ -56,6 +66,9 @@ origins = [
     "http://127.0.0.1:5174",
 ]
 
+# Response headers the frontend reads; a "*" here is not honoured on credentialed requests
+EXPOSED_HEADERS = ["X-Next-Cursor", "ETag", "X-Query-Count"]
+
 # Custom middleware to add CORS headers to all responses
 class CORSMiddlewareHandler(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
@@ -96,9 +109,23 @@ class CORSMiddlewareHandler(BaseHTTPMiddleware):
             response.headers["Access-Control-Allow-Credentials"] = "true"
             response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
             response.headers["Access-Control-Allow-Headers"] = "*"
+            response.headers["Access-Control-Expose-Headers"] = ", ".join(EXPOSED_HEADERS)
         
         return response
 
+# Per-request SQL statement count, exposed so tests and profiling can catch N+1 queries
+class QueryCountMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        with count_queries() as counter:
+            response = await call_next(request)
+        response.headers["X-Query-Count"] = str(counter.count)
+        if counter.count > QUERY_COUNT_WARNING:
+            logger.warning(f"{request.method} {request.url.path} ran {counter.count} SQL queries")
+        return response
+
+
+app.add_middleware(QueryCountMiddleware)
+
 # Add custom CORS middleware first
 app.add_middleware(CORSMiddlewareHandler)
 
@@ -109,7 +136,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    expose_headers=EXPOSED_HEADERS,
 )
 
 # Global exception handler to ensure CORS headers are always sent
@@ -181,6 +208,84 @@ app.mount("/media", StaticFiles(directory=str(media_dir)), name="media")
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(products.router, prefix="/api/products", tags=["Products"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
+app.include_router(reservations.router, prefix="/api/reservations", tags=["Reservations"])
+app.include_router(farmers.router, prefix="/api/farmers", tags=["Farmers"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
+
+
+# Releases expired stock reservations in the background. Each worker runs one;
+# sweeps are set-based and safe to overlap. Disable with RESERVATION_SWEEPER=false.
+@app.on_event("startup")
+async def start_reservation_sweeper():
+    if os.getenv("RESERVATION_SWEEPER", "true").lower() == "true":
+        app.state.reservation_sweeper = asyncio.create_task(run_reservation_sweeper(SessionLocal))
+
+
+@app.on_event("shutdown")
+async def stop_reservation_sweeper():
+    sweeper = getattr(app.state, "reservation_sweeper", None)
+    if sweeper:
+        sweeper.cancel()
+
+
+# Folds the inventory ledger into per-product snapshots in the background.
+# Overlapping runs back off on their own. Disable with INVENTORY_COMPACTOR=false.
+@app.on_event("startup")
+async def start_inventory_compactor():
+    if os.getenv("INVENTORY_COMPACTOR", "true").lower() == "true":
+        app.state.inventory_compactor = asyncio.create_task(run_inventory_compactor(SessionLocal))
+
+
+@app.on_event("shutdown")
+async def stop_inventory_compactor():
+    compactor = getattr(app.state, "inventory_compactor", None)
+    if compactor:
+        compactor.cancel()
+
+
+# Recomputes the admin dashboard KPIs in the background so requests read them
+# from memory. Disable with KPI_REFRESHER=false (e.g. on all but one worker).
+@app.on_event("startup")
+async def start_kpi_refresher():
+    if os.getenv("KPI_REFRESHER", "true").lower() == "true":
+        app.state.kpi_refresher = asyncio.create_task(run_kpi_refresher(SessionLocal))
+
+
+@app.on_event("shutdown")
+async def stop_kpi_refresher():
+    refresher = getattr(app.state, "kpi_refresher", None)
+    if refresher:
+        refresher.cancel()
+
+
+# Moves finished orders past ORDER_ARCHIVE_AFTER_DAYS into the archive tables in
+# the background. Overlapping runs back off on their own. Disable with ORDER_ARCHIVER=false.
+@app.on_event("startup")
+async def start_order_archiver():
+    if os.getenv("ORDER_ARCHIVER", "true").lower() == "true":
+        app.state.order_archiver = asyncio.create_task(run_order_archiver(SessionLocal))
+
+
+@app.on_event("shutdown")
+async def stop_order_archiver():
+    archiver = getattr(app.state, "order_archiver", None)
+    if archiver:
+        archiver.cancel()
+
+
+# Evens out the stock shards of high-contention products and refreshes their
+# listed quantity. Safe to overlap. Disable with STOCK_REBALANCER=false.
+@app.on_event("startup")
+async def start_stock_rebalancer():
+    if os.getenv("STOCK_REBALANCER", "true").lower() == "true":
+        app.state.stock_rebalancer = asyncio.create_task(run_stock_rebalancer(SessionLocal))
+
+
+@app.on_event("shutdown")
+async def stop_stock_rebalancer():
+    rebalancer = getattr(app.state, "stock_rebalancer", None)
+    if rebalancer:
+        rebalancer.cancel()
 
 # ✅ HEALTH CHECK ENDPOINTS
 @app.get("/")
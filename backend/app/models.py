@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Float, Date, DateTime, Text, JSON, ForeignKey, Index, event, false, text, true
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -13,7 +13,7 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
-    phone = Column(String(20), nullable=False)
+    phone = Column(String(20), nullable=False, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     first_name = Column(String(100), nullable=False)
@@ -36,6 +36,9 @@ class User(Base):
 
     bio = Column(Text, nullable=True)
     location = Column(String(255), nullable=True)
+    # Farm coordinates; copied onto the farmer's products for "near me" search
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
 
     is_verified = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
@@ -53,6 +56,11 @@ class User(Base):
     profile_photo = Column(String(500), nullable=True)
     farm_photo = Column(String(500), nullable=True)
 
+    __table_args__ = (
+        # Recent signups for the platform KPI refresher
+        Index("ix_users_created_at", "created_at"),
+    )
+
 
 class FarmerProfile(Base):
     __tablename__ = "farmer_profiles"
@@ -90,7 +98,7 @@ class ProductImage(Base):
     __tablename__ = "product_images"
 
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     image_url = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -107,12 +115,25 @@ class Product(Base):
     price = Column(Float, nullable=False)
     category = Column(String(100), nullable=False)
     quantity_available = Column(Integer, default=0)
+    # Units held by unexpired reservations; kept in step by app.utils.stock
+    quantity_reserved = Column(Integer, nullable=False, default=0, server_default="0")
     unit = Column(String(50), nullable=False)
     min_order_quantity = Column(Integer, default=1)
-    is_available = Column(Boolean, default=True)
+    is_available = Column(Boolean, nullable=False, default=True, server_default=true())
     farmer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Denormalized from the farmer so radius searches don't join users
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)
+    # Bumped by every ORM update and checked by it (optimistic locking); sent as the
+    # ETag / If-Match of product edits. Stock changes are guarded UPDATEs of their
+    # own (app.utils.stock) and leave it alone.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # High-contention mode: > 0 keeps sellable stock in that many product_stock_shards
+    # rows (see app.utils.stock_shards) and quantity_available is a cached total
+    stock_shards = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     farmer = relationship("User", back_populates="products")
@@ -121,6 +142,38 @@ class Product(Base):
     # ✅ ADDED: Missing reviews relationship
     reviews = relationship("Review", back_populates="product")
 
+    @property
+    def quantity_sellable(self):
+        """Stock a new buyer can still order: what's on hand less what's reserved."""
+        return max((self.quantity_available or 0) - (self.quantity_reserved or 0), 0)
+
+    __table_args__ = (
+        # Partial indexes over listable products (is_available = true): keyset order
+        # for the catalog listing, and category + price range / facet min-max seeks
+        Index("ix_products_listable_created_at_id", "created_at", "id",
+              sqlite_where=text("is_available = 1"), postgresql_where=text("is_available")),
+        Index("ix_products_listable_category_price", "category", "price",
+              sqlite_where=text("is_available = 1"), postgresql_where=text("is_available")),
+        # The listing's case-insensitive category filter (lower(category) = ...) + price range
+        Index("ix_products_listable_lower_category_price", func.lower(category), "price",
+              sqlite_where=text("is_available = 1"), postgresql_where=text("is_available")),
+        # Geohash prefix ranges for "near me" searches
+        Index("ix_products_listable_geohash", "geohash",
+              sqlite_where=text("is_available = 1"), postgresql_where=text("is_available")),
+        # Farmer listings and ownership checks
+        Index("ix_products_farmer_created_at_id", "farmer_id", "created_at", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+class ProductStockShard(Base):
+    """One slice of a high-contention product's sellable stock; checkout takes from a random shard."""
+    __tablename__ = "product_stock_shards"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    quantity = Column(Integer, nullable=False)
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -141,13 +194,22 @@ class Order(Base):
     customer = relationship("User", foreign_keys=[customer_id], back_populates="orders_as_customer")
     order_items = relationship("OrderItem", back_populates="order")
 
+    __table_args__ = (
+        # Buyer order history, newest first, optionally by status or payment status; keyset on (created_at, id)
+        Index("ix_orders_customer_created_at_id", "customer_id", "created_at", "id"),
+        Index("ix_orders_customer_status_created_at_id", "customer_id", "status", "created_at", "id"),
+        Index("ix_orders_customer_payment_status_created_at_id", "customer_id", "payment_status", "created_at", "id"),
+        # Recent orders for the platform KPI refresher
+        Index("ix_orders_created_at", "created_at"),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
     quantity = Column(Float, nullable=False)
     unit_price = Column(Float, nullable=False)
     total_price = Column(Float, nullable=False)
@@ -155,6 +217,154 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="order_items")
     product = relationship("Product", back_populates="order_items")
 
+    @property
+    def product_name(self):
+        # Load `product` eagerly when serializing lists of items
+        return self.product.name if self.product else ""
+
+
+class FarmerOrder(Base):
+    """
+    One row per (farmer, order) the farmer has products on, with the farmer's share.
+    Written with the order, so the farmer inbox and ownership checks are single
+    primary-key lookups instead of a join through order_items and products.
+    """
+    __tablename__ = "farmer_orders"
+
+    farmer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True, index=True)
+    subtotal = Column(Float, nullable=False)
+    item_count = Column(Integer, nullable=False)
+
+    order = relationship("Order")
+
+
+class ArchivedOrder(Base):
+    """
+    A delivered or cancelled order moved out of `orders` by the archiver once it is
+    older than ORDER_ARCHIVE_AFTER_DAYS. Same columns and ids as the hot table, so
+    order reads fall through to it unchanged.
+    """
+    __tablename__ = "archived_orders"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_number = Column(String(50), nullable=False)
+    customer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    total_amount = Column(Float, nullable=False)
+    status = Column(String(50))
+    payment_status = Column(String(50))
+    delivery_type = Column(String(50), nullable=False)
+    delivery_address = Column(Text, nullable=True)
+    delivery_date = Column(DateTime, nullable=True)
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    customer = relationship("User", foreign_keys=[customer_id])
+    order_items = relationship("ArchivedOrderItem", back_populates="order")
+
+    __table_args__ = (
+        # Buyer order history once it reaches archived orders; keyset on (created_at, id)
+        Index("ix_archived_orders_customer_created_at_id", "customer_id", "created_at", "id"),
+        Index("ix_archived_orders_customer_payment_status_created_at_id",
+              "customer_id", "payment_status", "created_at", "id"),
+    )
+
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "archived_order_items"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, ForeignKey("archived_orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Float, nullable=False)
+    unit_price = Column(Float, nullable=False)
+    total_price = Column(Float, nullable=False)
+
+    order = relationship("ArchivedOrder", back_populates="order_items")
+    product = relationship("Product")
+
+    @property
+    def product_name(self):
+        return self.product.name if self.product else ""
+
+
+class ArchivedFarmerOrder(Base):
+    """farmer_orders rows of archived orders, for the farmer inbox and ownership checks."""
+    __tablename__ = "archived_farmer_orders"
+
+    farmer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    order_id = Column(Integer, ForeignKey("archived_orders.id", ondelete="CASCADE"), primary_key=True, index=True)
+    subtotal = Column(Float, nullable=False)
+    item_count = Column(Integer, nullable=False)
+
+    order = relationship("ArchivedOrder")
+
+
+class Reservation(Base):
+    """A buyer's time-boxed hold on stock, converted into an order or released when it expires."""
+    __tablename__ = "reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    buyer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    items = relationship("ReservationItem", back_populates="reservation")
+
+
+class ReservationItem(Base):
+    __tablename__ = "reservation_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reservation_id = Column(Integer, ForeignKey("reservations.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+    reservation = relationship("Reservation", back_populates="items")
+
+
+class InventoryMovement(Base):
+    """
+    Append-only stock ledger: one row per change to a product's quantity_available
+    (sale, cancel, restock or adjustment), with the signed change in `delta`.
+    """
+    __tablename__ = "inventory_movements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)
+    delta = Column(Integer, nullable=False)
+    # No foreign key: the order may since have moved to archived_orders
+    order_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set once the compactor has added the movement to its product's snapshot
+    folded = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    __table_args__ = (
+        # A product's history newest first
+        Index("ix_inventory_movements_product_id_id", "product_id", "id"),
+        # The unfolded tail: per product for ledger_stock, in id order for the compactor
+        Index("ix_inventory_movements_unfolded_product_id", "product_id",
+              sqlite_where=text("folded = 0"), postgresql_where=text("NOT folded")),
+        Index("ix_inventory_movements_unfolded_id", "id",
+              sqlite_where=text("folded = 0"), postgresql_where=text("NOT folded")),
+    )
+
+
+class InventorySnapshot(Base):
+    """
+    A product's stock as of the movements folded into it by the ledger compactor;
+    last_movement_id is the newest of them.
+    """
+    __tablename__ = "inventory_snapshots"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, nullable=False)
+    last_movement_id = Column(Integer, nullable=False)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now())
+
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -170,4 +380,178 @@ class Review(Base):
 
     user = relationship("User", foreign_keys=[user_id], back_populates="reviews_as_user")
     farmer = relationship("User", foreign_keys=[farmer_id], back_populates="reviews_as_farmer")
-    product = relationship("Product", back_populates="reviews")
\ No newline at end of file
+    product = relationship("Product", back_populates="reviews")
+
+
+class CategoryFacet(Base):
+    """Per-category listing summary, maintained incrementally by app.utils.facets."""
+    __tablename__ = "category_facets"
+
+    category = Column(String(100), primary_key=True)
+    available_count = Column(Integer, nullable=False, default=0)
+    min_price = Column(Float, nullable=True)
+    max_price = Column(Float, nullable=True)
+    median_price = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+
+class CategoryPriceBucket(Base):
+    """Count of available products per category and price bucket."""
+    __tablename__ = "category_price_buckets"
+
+    category = Column(String(100), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+
+
+class FarmerDailySales(Base):
+    """
+    A farmer's sales per order day, counting orders that weren't cancelled;
+    `earned` is the part of `revenue` from delivered orders. Maintained
+    incrementally by app.utils.analytics.
+    """
+    __tablename__ = "farmer_daily_sales"
+
+    farmer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    earned = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        # Farmers with recent sales, for the platform KPIs
+        Index("ix_farmer_daily_sales_day", "day"),
+    )
+
+
+class FarmerProductSales(Base):
+    """Units and revenue per product over all time, for the farmer's product performance."""
+    __tablename__ = "farmer_product_sales"
+
+    farmer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+class FarmerCustomer(Base):
+    """How many of a farmer's live orders each buyer placed; buyers at zero no longer count."""
+    __tablename__ = "farmer_customers"
+
+    farmer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    customer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+
+
+class PlatformKpiSnapshot(Base):
+    """
+    Platform KPIs over the last `window_days` days as of `as_of`, written by the
+    KPI refresher in app.utils.platform_kpis; only the newest row is kept.
+    """
+    __tablename__ = "platform_kpi_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    window_days = Column(Integer, nullable=False)
+    gmv = Column(Float, nullable=False)  # total_amount of the window's orders that weren't cancelled
+    order_count = Column(Integer, nullable=False)
+    signups = Column(Integer, nullable=False)
+    active_farmers = Column(Integer, nullable=False)  # farmers with sales in the window
+    total_users = Column(Integer, nullable=False)
+    last_user_id = Column(Integer, nullable=False)  # newest user counted in total_users
+    daily = Column(JSON, nullable=False)  # [{"day", "orders", "gmv", "signups"}], oldest first
+
+
+class ProductImportJob(Base):
+    """A bulk product upload and its outcome; polled by the farmer while it runs."""
+    __tablename__ = "product_import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    farmer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String(255), nullable=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, importing, completed, failed
+    total_rows = Column(Integer, nullable=False, default=0)
+    created_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=True)  # [{"row": n, "errors": [...]}], first IMPORT_MAX_REPORTED_ERRORS only
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class IdempotencyKey(Base):
+    """A client's Idempotency-Key and the response it produced; replayed on retries until it expires."""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)  # None while the first request is still running
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_user_key", "user_id", "key", unique=True),
+    )
+
+
+# ==============================
+# PRODUCT FULL-TEXT SEARCH INDEX
+# ==============================
+# SQLite: an external-content FTS5 table kept in sync by triggers.
+# PostgreSQL: a GIN expression index over the same tsvector the search query uses.
+PRODUCT_SEARCH_TSVECTOR = (
+    "to_tsvector('english', coalesce(name, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(category, ''))"
+)
+
+SQLITE_PRODUCT_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        content='products', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+]
+
+POSTGRES_PRODUCT_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN ({PRODUCT_SEARCH_TSVECTOR})",
+]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_product_search_index(target, connection, **kw):
+    """Creates the search index alongside the tables; safe to run on every create_all."""
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")
+        ).first()
+        for statement in SQLITE_PRODUCT_SEARCH_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            # Index rows that were written before the FTS table existed
+            connection.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRES_PRODUCT_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def drop_product_search_index(target, connection, **kw):
+    """Drops the FTS5 table with the products table so a recreate starts clean."""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS products_fts"))
@@ -1,41 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 from .. import models, schemas
 from ..database import get_db
 from .auth import get_current_user
+from ..utils.auth_utils import forget_principal
+from ..utils.cache import product_snapshot, invalidate_product
+from ..utils.conditional import version_etag, check_if_match, EDIT_CONFLICT_DETAIL
+from ..utils.inventory import ADJUSTMENT, record_movements
+from ..utils.stock import set_stock
+from ..utils.stock_shards import set_stock_shards, stock_levels
+from ..utils.facets import record_product_change
+from ..utils.platform_kpis import platform_kpis
  # import from above
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-# 👥 List all users
-@router.get("/users")
-def list_users(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    admin=Depends(get_current_user)):
-    query = db.query(models.User)
-    total = query.count()
-    users = query.offset((page - 1) * page_size).limit(page_size).all()
-
-    return {
-        "page": page,
-        "page_size": page_size,
-        "total": total,
-        "users": users
-    }
-
-# 🚫 Ban / deactivate user
-@router.put("/users/{user_id}/deactivate")
-def deactivate_user(user_id: int, db: Session = Depends(get_db), admin=Depends(get_current_user)):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user.is_active = False
-    db.commit()
-    return {"message": f"User {user.email} has been deactivated"}
-
 # 🛒 Admin create product
 @router.post("/products")
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db), admin=Depends(get_current_user)):
@@ -45,20 +28,6 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     db.refresh(new_product)
     return new_product
 
-# ✏️ Admin update product
-@router.put("/products/{product_id}")
-def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db), admin=Depends(get_current_user)):
-    db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if not db_product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    for key, value in product.dict(exclude_unset=True).items():
-        setattr(db_product, key, value)
-
-    db.commit()
-    db.refresh(db_product)
-    return db_product
-
 # ❌ Admin delete product
 @router.delete("/products/{product_id}")
 def delete_product(product_id: int, db: Session = Depends(get_db), admin=Depends(get_current_user)):
@@ -71,7 +40,7 @@ def delete_product(product_id: int, db: Session = Depends(get_db), admin=Depends
     return {"message": "Product deleted"}
 
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from .. import schemas, models
 from ..utils.auth_utils import get_current_user
@@ -81,7 +50,7 @@ router = APIRouter()
 
 
 # Make sure this line is correct - NO parentheses after get_current_user
-@router.get("/admin/dashboard")
+@router.get("/admin/dashboard", response_model=schemas.PlatformKpiResponse)
 async def admin_dashboard(
         admin: models.User = Depends(get_current_user),  # ← NO () here!
         db: Session = Depends(get_db)
@@ -90,5 +59,118 @@ async def admin_dashboard(
     if admin.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    # Admin dashboard logic here
-    return {"message": "Admin dashboard", "user": admin.email}
\ No newline at end of file
+    # Platform KPIs from memory, refreshed in the background; see as_of
+    try:
+        return platform_kpis(db)
+
+    except Exception as e:
+        print(f"❌ Error getting platform KPIs: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving platform KPIs")
+
+
+# 👥 List all users
+@router.get("/admin/users", response_model=schemas.AdminUserPage)
+async def list_users(
+        page: int = Query(1, ge=1),
+        page_size: int = Query(10, ge=1, le=100),
+        admin: models.User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    if admin.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    users = db.query(models.User).order_by(models.User.id).offset((page - 1) * page_size).limit(page_size).all()
+    kpis = platform_kpis(db)
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": kpis["total_users"],  # as of the latest KPI snapshot, not counted per page
+        "total_as_of": kpis["as_of"],
+        "users": users
+    }
+
+
+# 🚫 Ban / deactivate user
+@router.put("/admin/users/{user_id}/deactivate")
+async def deactivate_user(
+        user_id: int,
+        admin: models.User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    if admin.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user.is_active = False
+    db.commit()
+    # Tokens cached by other workers are refused once their entries expire (AUTH_CACHE_TTL)
+    forget_principal(user.id)
+    return {"message": f"User {user.email} has been deactivated"}
+
+
+# ✏️ Admin update product
+@router.put("/admin/products/{product_id}", response_model=schemas.ProductResponse)
+async def update_product(
+        product_id: int,
+        product_data: schemas.ProductUpdate,
+        response: Response,
+        if_match: Optional[str] = Header(None),
+        admin: models.User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """Update any farmer's product (Admin only).
+
+    Takes If-Match like the farmer's PUT /api/products/{id}: a stale version
+    gets 409, and the new version comes back as the ETag.
+    """
+    try:
+        if admin.role != "admin":
+            raise HTTPException(status_code=403, detail="Admin access required")
+
+        product = db.query(models.Product).filter(models.Product.id == product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        # An edit that raced ours after this check fails the version check on commit
+        check_if_match(if_match, version_etag(product.version))
+        before = product_snapshot(product)
+
+        update_data = product_data.dict(exclude_unset=True)
+        quantity = update_data.pop("quantity_available", None)
+        shards = update_data.pop("stock_shards", None)
+        for field, value in update_data.items():
+            if hasattr(product, field):
+                setattr(product, field, value)
+
+        # Stock is set against the current quantity, as in the farmer's edit
+        if quantity is not None:
+            current = stock_levels(db, [product.id])[product.id]
+            if quantity != current:
+                set_stock(db, product.id, current, quantity)
+                record_movements(db, ADJUSTMENT, {product.id: quantity - current})
+        if shards is not None and shards != product.stock_shards:
+            set_stock_shards(db, product.id, shards)
+
+        product.updated_at = datetime.utcnow()
+        after = product_snapshot(product)
+        record_product_change(db, before, after)
+        db.commit()
+        db.refresh(product)
+        invalidate_product(before, after)
+
+        response.headers["ETag"] = version_etag(product.version)
+        return product
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=EDIT_CONFLICT_DETAIL)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error updating product: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error updating product")
@@ -4,7 +4,7 @@ from fastapi import Form
 import uuid
 import os
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, status
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request, status
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import secrets
@@ -14,9 +14,12 @@ from typing import Optional
 import re
 
 from app.database import get_db
-from app.models import User, FarmerProfile, BusinessProfile
-from app.utils.auth_utils import hash_password, verify_password, create_access_token, get_current_user
+from app.models import User, FarmerProfile, BusinessProfile, Product
+from app.utils.auth_utils import hash_password, verify_password, create_access_token, get_current_user, forget_principal
 from app.utils.email_service import email_service
+from app.utils.conditional import render_json, make_etag, conditional_response
+from app.utils.geo import farm_location
+from app.utils.cache import invalidate_near_listings
 
 router = APIRouter()
 
@@ -145,6 +148,8 @@ class ProfileUpdate(BaseModel):
     business_reg_number: Optional[str] = None
     bio: Optional[str] = None
     location: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     # Make all validations more flexible
     @validator('*', pre=True)
@@ -186,6 +191,18 @@ class ProfileUpdate(BaseModel):
             raise ValueError('Invalid email format')
         return v
 
+    @validator('latitude')
+    def validate_latitude(cls, v):
+        if v is not None and not -90 <= v <= 90:
+            raise ValueError('Latitude must be between -90 and 90')
+        return v
+
+    @validator('longitude')
+    def validate_longitude(cls, v):
+        if v is not None and not -180 <= v <= 180:
+            raise ValueError('Longitude must be between -180 and 180')
+        return v
+
 
 def generate_reset_token(length=32):
     alphabet = string.ascii_letters + string.digits
@@ -542,13 +559,14 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
 # PROFILE ENDPOINTS - ✅ ONLY ONE VERSION OF EACH ENDPOINT
 @router.get("/profile")
 async def get_user_profile(
+        request: Request,
         current_user: User = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
-    """Get current user profile"""
+    """Get current user profile (answers 304 when the client's ETag is still current)"""
     try:
         print(f"Getting profile for user: {current_user.email}")
-        return {
+        profile = {
             "id": current_user.id,
             "email": current_user.email,
             "phone": current_user.phone,
@@ -570,9 +588,17 @@ async def get_user_profile(
             "business_reg_number": current_user.business_reg_number,
             "bio": current_user.bio,  # ✅ Added bio field
             "location": current_user.location,  # ✅ Added location field
+            "latitude": current_user.latitude,
+            "longitude": current_user.longitude,
             "is_verified": current_user.is_verified,
             "is_active": current_user.is_active
         }
+        body = render_json(profile)
+        return conditional_response(
+            request, body, make_etag(body), current_user.updated_at,
+            headers={"Vary": "Authorization"},
+            cache_control="private, no-cache"
+        )
     except Exception as e:
         print(f"Error getting profile: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving profile")
@@ -611,9 +637,21 @@ async def update_user_profile(
             else:
                 print(f"Field {field} does not exist in User model")
 
+        farm_moved = current_user.role == "farmer" and (
+            "latitude" in updated_fields or "longitude" in updated_fields
+        )
+        if farm_moved:
+            # Products carry the farm's coordinates for radius searches
+            db.query(Product).filter(Product.farmer_id == current_user.id).update(
+                farm_location(current_user), synchronize_session=False
+            )
+
         if updated_fields:
             db.commit()
             db.refresh(current_user)
+            forget_principal(current_user.id)
+            if farm_moved:
+                invalidate_near_listings()
             print(f"Profile updated successfully. Updated fields: {updated_fields}")
 
             return {
@@ -632,7 +670,9 @@ async def update_user_profile(
                     "state": current_user.state,
                     "address": current_user.address,
                     "bio": current_user.bio,  # ✅ Added bio field
-                    "location": current_user.location  # ✅ Added location field
+                    "location": current_user.location,  # ✅ Added location field
+                    "latitude": current_user.latitude,
+                    "longitude": current_user.longitude
                 }
             }
         else:
@@ -718,6 +758,7 @@ async def upload_profile_photo(
             current_user.farm_photo = f"/{file_path}"
 
         db.commit()
+        forget_principal(current_user.id)
 
         return {
             "message": f"{type} photo uploaded successfully",
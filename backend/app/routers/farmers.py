@@ -0,0 +1,31 @@
+# app/routers/farmers.py
+from fastapi import APIRouter, HTTPException, Depends, status
+from sqlalchemy.orm import Session
+
+from .. import schemas, models
+from ..utils.auth_utils import get_current_user
+from ..database import get_db
+from ..utils.analytics import farmer_analytics
+
+router = APIRouter()
+
+
+# Farmer dashboard analytics
+@router.get("/me/analytics", response_model=schemas.AnalyticsResponse)
+async def get_my_analytics(
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Get the current farmer's earnings, orders, customers and product performance"""
+    if current_user.role != "farmer":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only farmers can view farm analytics"
+        )
+
+    try:
+        return farmer_analytics(db, current_user.id)
+
+    except Exception as e:
+        print(f"❌ Error getting analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving analytics")
@@ -1,25 +1,48 @@
 # app/routers/orders.py
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, File, Header, Query, Response, UploadFile, status
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, contains_eager, selectinload
 from typing import List, Optional
 from datetime import datetime
-import uuid
+from collections import defaultdict
 
 from .. import schemas, models
 from ..utils.auth_utils import get_current_user
 from ..database import get_db
+from ..utils.analytics import record_deliveries, record_sales
+from ..utils.bulk_orders import BULK_ORDER_MAX_ROWS, group_orders, new_order_number, plan_orders, write_orders
+from ..utils.cache import invalidate_products
+from ..utils.conditional import as_utc
+from ..utils.facets import record_product_change
+from ..utils.farmer_orders import farmer_on_order, link_order_farmers
+from ..utils.idempotency import claim_key, complete_key, replay, request_fingerprint
+from ..utils.inventory import CANCEL, SALE, record_movements
+from ..utils.order_status import bulk_transition, check_status, check_transition
+from ..utils.product_import import parse_upload
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, split_id_page, split_keyset_page, timestamp_param
+from ..utils.reservations import claim_reservation
+from ..utils.stock import take_stock, return_stock
 
 router = APIRouter()
 
+# Loader options for serializing OrderResponse without a query per order or item
+ORDER_RESPONSE_LOADERS = (
+    selectinload(models.Order.order_items).selectinload(models.OrderItem.product),
+)
+ARCHIVED_ORDER_RESPONSE_LOADERS = (
+    selectinload(models.ArchivedOrder.order_items).selectinload(models.ArchivedOrderItem.product),
+)
+
 
 # Create new order
 @router.post("/", response_model=schemas.OrderResponse)
 async def create_order(
         order_data: schemas.OrderCreate,
+        idempotency_key: Optional[str] = Header(None),
         db: Session = Depends(get_db),
         current_user: models.User = Depends(get_current_user)
 ):
-    """Create a new order"""
+    """Create a new order. Retries that send the same Idempotency-Key get the first response back."""
     if current_user.role != "buyer":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -27,74 +50,81 @@ async def create_order(
         )
 
     try:
-        # Generate unique order number
-        order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
-
-        total_amount = 0
-        order_items = []
-
-        # Validate products and calculate total
-        for item in order_data.items:
-            product = db.query(models.Product).filter(
-                models.Product.id == item.product_id,
-                models.Product.is_available == True
-            ).first()
-
-            if not product:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Product {item.product_id} not found or unavailable"
-                )
-
-            if product.quantity_available < item.quantity:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Not enough stock for {product.name}. Available: {product.quantity_available}"
-                )
+        # The key row joins this transaction, so a concurrent retry waits for our commit
+        claimed = None
+        if idempotency_key is not None:
+            claimed, owned = claim_key(db, current_user.id, idempotency_key, request_fingerprint(order_data))
+            if not owned:
+                return replay(claimed)
 
-            item_total = product.price * item.quantity
-            total_amount += item_total
-
-            # Create order item
-            order_item = models.OrderItem(
-                product_id=item.product_id,
-                quantity=item.quantity,
-                unit_price=product.price,
-                total_price=item_total
-            )
-            order_items.append(order_item)
-
-            # Update product stock
-            product.quantity_available -= item.quantity
-            if product.quantity_available <= 0:
-                product.is_available = False
+        # Generate unique order number
+        order_number = new_order_number()
+
+        # One IN query reads (and locks) every product and one conditional UPDATE takes
+        # the stock; everything below commits (or rolls back) as one transaction.
+        if order_data.reservation_id is not None:
+            if order_data.items:
+                raise HTTPException(status_code=400, detail="Send either items or reservation_id, not both")
+            # The reservation's held units become the order
+            quantities = claim_reservation(db, order_data.reservation_id, current_user.id)
+            requested = list(quantities.items())
+            taken = take_stock(db, quantities, reserved=True)
+        else:
+            if not order_data.items:
+                raise HTTPException(status_code=400, detail="Order must contain at least one item")
+            quantities = defaultdict(int)
+            for item in order_data.items:
+                quantities[item.product_id] += item.quantity
+            requested = [(item.product_id, item.quantity) for item in order_data.items]
+            taken = take_stock(db, quantities)
+
+        lines = []
+        for product_id, quantity in requested:
+            price = taken[product_id][0].price
+            lines.append({
+                "product_id": product_id,
+                "quantity": quantity,
+                "unit_price": price,
+                "total_price": price * quantity,
+            })
 
         # Create order
         order = models.Order(
             order_number=order_number,
             customer_id=current_user.id,
-            total_amount=total_amount,
+            total_amount=sum(line["total_price"] for line in lines),
             status="pending",
             payment_status="pending",
             delivery_type="standard",
             delivery_address=order_data.delivery_address
         )
-
         db.add(order)
-        db.commit()
-        db.refresh(order)
-
-        # Add order items with order_id
-        for order_item in order_items:
-            order_item.order_id = order.id
-            db.add(order_item)
+        db.flush()
+        db.execute(insert(models.OrderItem), [{"order_id": order.id, **line} for line in lines])
+        link_order_farmers(db, order.id, [
+            (taken[line["product_id"]][0].farmer_id, line["total_price"]) for line in lines
+        ])
+        record_movements(db, SALE, {product_id: -quantity for product_id, quantity in quantities.items()}, order.id)
+
+        stock_changes = [(before, after) for _, before, after in taken.values()]
+        for before, after in stock_changes:
+            record_product_change(db, before, after)
+
+        # Serialized before commit so a replayable response is stored with the order
+        order = db.query(models.Order).options(*ORDER_RESPONSE_LOADERS).filter(
+            models.Order.id == order.id
+        ).one()
+        record_sales(db, [order])
+        response = schemas.OrderResponse.model_validate(order)
+        if claimed is not None:
+            complete_key(claimed, status.HTTP_200_OK, response.model_dump(mode="json"))
 
         db.commit()
-        db.refresh(order)
-
-        return order
+        invalidate_products(stock_changes)
+        return response
 
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
@@ -105,23 +135,110 @@ async def create_order(
         )
 
 
+# Submit many orders at once from a CSV file or JSON array (business buyers only)
+@router.post("/bulk", response_model=schemas.BulkOrderResponse)
+async def create_bulk_orders(
+        file: UploadFile = File(...),
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Create many orders, possibly with different farmers, from one upload.
+
+    A JSON array holds orders ({reference, delivery_address, items}); a CSV file
+    holds one line per row (reference, delivery_address, product_id, quantity)
+    and lines sharing a reference become one order. Every order is checked
+    against one batched product read and written in chunked transactions; each
+    gets its own result, so rejected orders don't hold back the rest.
+    """
+    if current_user.role != "buyer" or current_user.user_type != "business":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only business buyers can submit bulk orders"
+        )
+
+    try:
+        rows = parse_upload(file.filename, file.content_type, await file.read(),
+                            what="orders", max_rows=BULK_ORDER_MAX_ROWS)
+        orders, results = group_orders(rows)
+        accepted, rejected = plan_orders(db, orders)
+        results += rejected + write_orders(db, current_user, accepted)
+        results.sort(key=lambda result: result["index"])
+        created = sum(1 for result in results if result["result"] == "created")
+        return {
+            "total_orders": len(results),
+            "created": created,
+            "rejected": len(results) - created,
+            "results": results
+        }
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error creating bulk orders: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating bulk orders: {str(e)}"
+        )
+
+
+def _filter_order_history(db: Session, query, order_model, status_filter: Optional[str],
+                          payment_status: Optional[str], created_from: Optional[datetime],
+                          created_to: Optional[datetime]):
+    """
+    Applies the order-history filters shared by the buyer and farmer listings, on
+    `order_model` (models.Order or models.ArchivedOrder).
+    """
+    if status_filter:
+        query = query.filter(order_model.status == status_filter)
+    if payment_status:
+        query = query.filter(order_model.payment_status == payment_status)
+    # Stored timestamps are naive UTC
+    if created_from:
+        query = query.filter(
+            order_model.created_at >= timestamp_param(db, as_utc(created_from).replace(tzinfo=None))
+        )
+    if created_to:
+        query = query.filter(
+            order_model.created_at < timestamp_param(db, as_utc(created_to).replace(tzinfo=None))
+        )
+    return query
+
+
 # Get buyer's orders
 @router.get("/my-orders", response_model=List[schemas.OrderResponse])
 async def get_my_orders(
+        response: Response,
+        status_filter: Optional[str] = Query(None, alias="status", description="Only orders in this status"),
+        payment_status: Optional[str] = Query(None, description="Only orders with this payment status"),
+        created_from: Optional[datetime] = Query(None, description="Only orders placed at or after this time"),
+        created_to: Optional[datetime] = Query(None, description="Only orders placed before this time"),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
         db: Session = Depends(get_db),
         current_user: models.User = Depends(get_current_user)
 ):
-    """Get current user's orders"""
-    try:
-        print(f"🛒 Getting orders for buyer: {current_user.email} (ID: {current_user.id})")
-
-        orders = db.query(models.Order).filter(
-            models.Order.customer_id == current_user.id
-        ).order_by(models.Order.created_at.desc()).all()
+    """Get one page of the current user's orders, newest first, archived orders included.
 
-        print(f"📦 Found {len(orders)} orders for buyer {current_user.id}")
+    The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
+    """
+    try:
+        parts = []
+        for order_model, loaders in ((models.Order, ORDER_RESPONSE_LOADERS),
+                                     (models.ArchivedOrder, ARCHIVED_ORDER_RESPONSE_LOADERS)):
+            query = db.query(order_model).options(*loaders).filter(order_model.customer_id == current_user.id)
+            query = _filter_order_history(db, query, order_model, status_filter, payment_status,
+                                          created_from, created_to)
+            parts.append((query, order_model.created_at, order_model.id))
+        orders, next_cursor = split_keyset_page(db, parts, cursor, limit)
+
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return orders
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting orders: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving orders")
@@ -130,28 +247,97 @@ async def get_my_orders(
 # Get orders for farmer's products - ✅ FIXED WITH BETTER ERROR HANDLING
 @router.get("/farmer-orders", response_model=List[schemas.OrderResponse])
 async def get_farmer_orders(
+    response: Response,
+    status_filter: Optional[str] = Query(None, alias="status", description="Only orders in this status"),
+    payment_status: Optional[str] = Query(None, description="Only orders with this payment status"),
+    created_from: Optional[datetime] = Query(None, description="Only orders placed at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Only orders placed before this time"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get all orders for farmer's products"""
+    """Get one page of the orders containing the farmer's products, newest first, archived orders included.
+
+    The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
+    """
     try:
         if current_user.role != "farmer":
             raise HTTPException(status_code=403, detail="Only farmers can access this endpoint")
 
-        # Get orders that contain farmer's products
-        orders = db.query(models.Order).join(models.OrderItem).join(models.Product).filter(
-            models.Product.farmer_id == current_user.id
-        ).distinct().all()
-
-        # Add buyer name to response
-        for order in orders:
+        # The farmer's farmer_orders rows (then archived ones), newest order first along
+        # their primary key; the orders come back joined onto them with items, products
+        # and buyer preloaded
+        parts = []
+        for link_model, order_model, item_model in (
+            (models.FarmerOrder, models.Order, models.OrderItem),
+            (models.ArchivedFarmerOrder, models.ArchivedOrder, models.ArchivedOrderItem),
+        ):
+            linked_order = contains_eager(link_model.order)
+            query = db.query(link_model).join(link_model.order).options(
+                linked_order.selectinload(order_model.order_items).selectinload(item_model.product),
+                linked_order.selectinload(order_model.customer)
+            ).filter(link_model.farmer_id == current_user.id)
+            query = _filter_order_history(db, query, order_model, status_filter, payment_status,
+                                          created_from, created_to)
+            parts.append((query, link_model.order_id))
+        links, next_cursor = split_id_page(parts, cursor, limit)
+
+        # Add buyer name and the farmer's share to response
+        orders = []
+        for link in links:
+            order = link.order
             order.buyer_name = f"{order.customer.first_name} {order.customer.last_name}"
+            order.farmer_subtotal = link.subtotal
+            order.farmer_item_count = link.item_count
+            orders.append(order)
 
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return orders
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting farmer orders: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving orders")
+
+
+# Update many orders' status at once
+@router.patch("/status", response_model=schemas.OrderStatusBulkResponse)
+async def bulk_update_order_status(
+        status_data: schemas.OrderStatusBulkUpdate,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Move a batch of orders to one status; each order gets its own result"""
+    if current_user.role not in ("farmer", "admin"):
+        raise HTTPException(status_code=403, detail="Only farmers can update orders in bulk")
+    if status_data.status == "cancelled":
+        # Cancelling returns stock, which POST /{order_id}/cancel takes care of
+        raise HTTPException(status_code=400, detail="Orders must be cancelled one at a time")
+
+    try:
+        farmer_id = current_user.id if current_user.role == "farmer" else None
+        results = bulk_transition(db, status_data.order_ids, status_data.status, farmer_id)
+        if status_data.status == "delivered":
+            record_deliveries(db, [result["order_id"] for result in results if result["result"] == "updated"])
+        db.commit()
+        return {
+            "status": status_data.status,
+            "updated": sum(1 for result in results if result["result"] == "updated"),
+            "results": results
+        }
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error updating order statuses: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error updating order statuses")
+
+
 # Get single order
 @router.get("/{order_id}", response_model=schemas.OrderResponse)
 async def get_order(
@@ -161,7 +347,14 @@ async def get_order(
 ):
     """Get specific order"""
     try:
-        order = db.query(models.Order).filter(models.Order.id == order_id).first()
+        order = db.query(models.Order).options(*ORDER_RESPONSE_LOADERS).filter(
+            models.Order.id == order_id
+        ).first()
+        archived = order is None
+        if archived:
+            order = db.query(models.ArchivedOrder).options(*ARCHIVED_ORDER_RESPONSE_LOADERS).filter(
+                models.ArchivedOrder.id == order_id
+            ).first()
 
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
@@ -172,12 +365,7 @@ async def get_order(
 
         if current_user.role == "farmer":
             # Check if farmer has products in this order
-            farmer_products_in_order = db.query(models.OrderItem).join(models.Product).filter(
-                models.OrderItem.order_id == order_id,
-                models.Product.farmer_id == current_user.id
-            ).first()
-
-            if not farmer_products_in_order:
+            if not farmer_on_order(db, current_user.id, order_id, archived=archived):
                 raise HTTPException(status_code=403, detail="Not authorized to view this order")
 
         return order
@@ -208,12 +396,7 @@ async def update_order_status(
         if not new_status:
             raise HTTPException(status_code=400, detail="Status is required")
 
-        valid_statuses = ["pending", "confirmed", "shipped", "delivered", "cancelled"]
-        if new_status not in valid_statuses:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
-            )
+        check_status(new_status)
 
         # Authorization checks
         if current_user.role == "buyer":
@@ -229,17 +412,18 @@ async def update_order_status(
 
         elif current_user.role == "farmer":
             # Farmers can update status for orders containing their products
-            farmer_products_in_order = db.query(models.OrderItem).join(models.Product).filter(
-                models.OrderItem.order_id == order_id,
-                models.Product.farmer_id == current_user.id
-            ).first()
-
-            if not farmer_products_in_order:
+            if not farmer_on_order(db, current_user.id, order_id):
                 raise HTTPException(
                     status_code=403,
                     detail="Not authorized to update this order"
                 )
 
+        check_transition(order.status, new_status)
+        if new_status != order.status:
+            if new_status == "cancelled":
+                record_sales(db, [order], sign=-1)
+            elif new_status == "delivered":
+                record_deliveries(db, [order.id])
         order.status = new_status
         db.commit()
 
@@ -266,7 +450,9 @@ async def cancel_order(
 ):
     """Cancel an order"""
     try:
-        order = db.query(models.Order).filter(models.Order.id == order_id).first()
+        order = db.query(models.Order).options(*ORDER_RESPONSE_LOADERS).filter(
+            models.Order.id == order_id
+        ).first()
 
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
@@ -281,18 +467,19 @@ async def cancel_order(
             )
 
         # Restore product quantities
+        quantities = defaultdict(int)
         for order_item in order.order_items:
-            product = db.query(models.Product).filter(
-                models.Product.id == order_item.product_id
-            ).first()
-
-            if product:
-                product.quantity_available += order_item.quantity
-                if not product.is_available:
-                    product.is_available = True
+            quantities[order_item.product_id] += order_item.quantity
+        returned = return_stock(db, dict(quantities))
+        record_movements(db, CANCEL, {product_id: quantities[product_id] for product_id in returned}, order.id)
 
+        record_sales(db, [order], sign=-1)
         order.status = "cancelled"
+        stock_changes = list(returned.values())
+        for before, after in stock_changes:
+            record_product_change(db, before, after)
         db.commit()
+        invalidate_products(stock_changes)
 
         return {"message": "Order cancelled successfully", "order_id": order_id}
 
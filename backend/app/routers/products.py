@@ -1,6 +1,9 @@
 # app/routers/products.py
-from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, UploadFile, File, Request, Response, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
 from typing import List, Optional
 from datetime import datetime
 import os
@@ -9,6 +12,32 @@ import uuid
 
 from .. import schemas, models
 from ..utils.auth_utils import get_current_user
+from ..utils.pagination import (
+    keyset_page, id_page, score_page, encode_score_cursor, decode_score_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
+from ..utils.search import ranked_product_ids
+from ..utils.geo import (
+    parse_near, covering_cells, haversine_km, farm_location,
+    geohash_range_end, DEFAULT_RADIUS_KM, MAX_RADIUS_KM,
+)
+from ..utils.cache import (
+    catalog_cache,
+    CATEGORIES_KEY,
+    product_listing_filters,
+    product_listing_key,
+    product_snapshot,
+    invalidate_product,
+)
+from ..utils.facets import record_product_change, bucket_bounds
+from ..utils.inventory import ADJUSTMENT, RESTOCK, record_movements, ledger_stock
+from ..utils.stock import set_stock
+from ..utils.stock_shards import set_stock_shards, stock_levels
+from ..utils.conditional import (
+    render_json, make_etag, conditional_response,
+    version_etag, check_if_match, EDIT_CONFLICT_DETAIL,
+)
+from ..utils.export import iter_export_rows, ndjson_lines, csv_lines, buffered
+from ..utils.product_import import parse_upload, run_import_job, IMPORT_SYNC_ROWS
 from ..database import get_db
 
 router = APIRouter()
@@ -25,54 +54,138 @@ async def health_check():
 # Get all products with optional filtering
 @router.get("/", response_model=List[schemas.ProductResponse])
 async def get_products(
-        category: Optional[str] = Query(None, description="Filter by category"),
+        request: Request,
+        q: Optional[str] = Query(None, description="Full-text search over name, description and category"),
+        category: Optional[str] = Query(None, description="Filter by category name, ignoring case (see /categories/list)"),
         min_price: Optional[float] = Query(None, description="Minimum price"),
         max_price: Optional[float] = Query(None, description="Maximum price"),
         farmer_id: Optional[int] = Query(None, description="Filter by farmer ID"),
+        near: Optional[str] = Query(None, description="'latitude,longitude'; only farms within radius_km, nearest first"),
+        radius_km: float = Query(DEFAULT_RADIUS_KM, gt=0, le=MAX_RADIUS_KM, description="Search radius for near"),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
         db: Session = Depends(get_db)
 ):
-    """Get all products with optional filtering"""
+    """Get one page of available products, newest first (best match first when searching,
+    nearest first with a distance_km field when `near` is given).
+
+    The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
+    Pages are served from the catalog cache until a product write invalidates them, and
+    a matching If-None-Match / If-Modified-Since on a cached page gets a bare 304.
+    """
     try:
-        # Get all available products (is_available is True or None/not explicitly False)
-        from sqlalchemy import or_
-        query = db.query(models.Product).filter(
-            or_(
-                models.Product.is_available == True,
-                models.Product.is_available.is_(None)
-            )
+        filters = product_listing_filters(
+            q, category, min_price, max_price, farmer_id, parse_near(near), radius_km
         )
+        cache_key = product_listing_key(filters, cursor, limit)
+        page = catalog_cache.get(cache_key)
+        if page is None:
+            # Read first: a write invalidated while the page loads keeps it out of the cache
+            generation = catalog_cache.generation
+            page = _load_product_page(db, filters, cursor, limit)
+            catalog_cache.set(cache_key, page, meta=filters, generation=generation)
 
-        if category:
-            query = query.filter(models.Product.category.ilike(f"%{category}%"))
-        if min_price is not None:
-            query = query.filter(models.Product.price >= min_price)
-        if max_price is not None:
-            query = query.filter(models.Product.price <= max_price)
-        if farmer_id:
-            query = query.filter(models.Product.farmer_id == farmer_id)
-
-        products = query.order_by(models.Product.created_at.desc()).all()
-        return products
+        headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else None
+        return conditional_response(request, page["body"], page["etag"], page["last_modified"], headers)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error getting products: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving products")
 
 
-# Get single product by ID
-@router.get("/", response_model=List[schemas.ProductResponse])
-async def get_products(farmer_id: Optional[int] = None, db: Session = Depends(get_db)):
-    """Get all products (or products by farmer)"""
-    try:
-        query = db.query(models.Product)
-        if farmer_id:
-            query = query.filter(models.Product.farmer_id == farmer_id)
-        products = query.all()
-        return products
-    except Exception as e:
-        print(f"❌ Error getting products: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-
+def _load_product_page(db: Session, filters: dict, cursor: Optional[str], limit: int):
+    """Runs the listing query for normalized filters and serializes one page for the cache."""
+    # Written as `is_available = true` so the planner can use the listable-product partial indexes
+    query = db.query(models.Product).options(
+        selectinload(models.Product.images)
+    ).filter(models.Product.is_available == True)
+
+    if filters["category"]:
+        # Case-insensitive, along ix_products_listable_lower_category_price
+        query = query.filter(func.lower(models.Product.category) == filters["category"])
+    if filters["min_price"] is not None:
+        query = query.filter(models.Product.price >= filters["min_price"])
+    if filters["max_price"] is not None:
+        query = query.filter(models.Product.price <= filters["max_price"])
+    if filters["farmer_id"]:
+        query = query.filter(models.Product.farmer_id == filters["farmer_id"])
+
+    if filters["q"]:
+        ranked = ranked_product_ids(db, filters["q"])
+        if ranked is None:
+            return _render_page([], None)
+        query = query.join(ranked, ranked.c.product_id == models.Product.id)
+        if filters["near"]:
+            # Nearest first; the search only narrows the candidates
+            return _load_near_page(db, query, filters["near"], cursor, limit)
+        query = query.add_columns(ranked.c.score)
+        products, next_cursor = score_page(query, ranked.c.score, models.Product.id, cursor, limit)
+    elif filters["near"]:
+        return _load_near_page(db, query, filters["near"], cursor, limit)
+    else:
+        products, next_cursor = keyset_page(
+            db, query, models.Product.created_at, models.Product.id, cursor, limit
+        )
+    return _render_page(products, next_cursor)
+
+
+def _load_near_page(db: Session, query, near: tuple, cursor: Optional[str], limit: int):
+    """
+    Radius search: geohash prefix ranges over the partial index pick the candidate
+    rows (id and coordinates only), exact distances are computed for those alone,
+    and just the page's products are loaded. Pages by (distance, id).
+    """
+    latitude, longitude, radius_km = near
+    located = query.with_entities(models.Product.id, models.Product.latitude, models.Product.longitude)
+    # One range scan per cell; OR-ing the ranges lets the planner fall back to a full scan
+    cell_queries = []
+    for cell in covering_cells(latitude, longitude, radius_km):
+        in_cell = located.filter(models.Product.geohash >= cell)
+        end = geohash_range_end(cell)
+        cell_queries.append(in_cell.filter(models.Product.geohash < end) if end else in_cell)
+    candidates = cell_queries[0].union_all(*cell_queries[1:]).all()
+
+    matches = []
+    for product_id, product_lat, product_lng in candidates:
+        distance = haversine_km(latitude, longitude, product_lat, product_lng)
+        if distance <= radius_km:
+            matches.append((distance, product_id))
+    matches.sort()
+    if cursor:
+        position = decode_score_cursor(cursor)
+        matches = [match for match in matches if match > position]
+
+    next_cursor = encode_score_cursor(*matches[limit - 1]) if len(matches) > limit else None
+    matches = matches[:limit]
+    by_id = {
+        product.id: product
+        for product in db.query(models.Product).options(selectinload(models.Product.images))
+        .filter(models.Product.id.in_([product_id for _, product_id in matches]))
+    } if matches else {}
+    products = [by_id[product_id] for _, product_id in matches]
+    distances = [round(distance, 2) for distance, _ in matches]
+    return _render_page(products, next_cursor, distances)
+
+
+def _render_page(products, next_cursor: Optional[str], distances: Optional[List[float]] = None) -> dict:
+    """Serializes a page once, with the validators conditional requests are checked against."""
+    items = [
+        schemas.ProductResponse.model_validate(product).model_dump(mode="json")
+        for product in products
+    ]
+    if distances is not None:
+        for item, distance in zip(items, distances):
+            item["distance_km"] = distance
+    body = render_json(items)
+    timestamps = [p.updated_at or p.created_at for p in products if p.updated_at or p.created_at]
+    return {
+        "body": body,
+        "etag": make_etag(body),
+        "last_modified": max(timestamps) if timestamps else None,
+        "next_cursor": next_cursor,
+    }
 
 
 @router.post("/", response_model=schemas.ProductResponse)  # ✅ This should be ProductResponse, not ProductCreate
@@ -95,12 +208,17 @@ async def create_product(
             quantity_available=product.quantity_available,  # ✅ Fixed: Use quantity_available (matches schema and model)
             farmer_id=current_user.id,
             is_available=True,
-            min_order_quantity=1
+            min_order_quantity=1,
+            **farm_location(current_user)
         )
 
         db.add(db_product)
+        db.flush()
+        record_movements(db, RESTOCK, {db_product.id: db_product.quantity_available})
+        record_product_change(db, None, product_snapshot(db_product))
         db.commit()
         db.refresh(db_product)
+        invalidate_product(None, product_snapshot(db_product))
 
         print(f"✅ Product created: {db_product.name}")
 
@@ -119,14 +237,90 @@ async def create_product(
         #Update product (Farmer only)
 
 
+# Bulk product import from a CSV file or JSON array (Farmer only)
+@router.post("/import", response_model=schemas.ProductImportJobResponse)
+async def import_products(
+        response: Response,
+        background_tasks: BackgroundTasks,
+        file: UploadFile = File(...),
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Create many products from one upload.
+
+    Every row is validated against the single-product schema; valid rows are
+    inserted in one transaction and invalid ones are reported by row number.
+    Uploads over IMPORT_SYNC_ROWS rows return 202 with a job to poll at
+    GET /api/products/import/{job_id} instead of waiting for the import.
+    """
+    try:
+        if current_user.role != "farmer":
+            raise HTTPException(status_code=403, detail="Only farmers can import products")
+
+        rows = parse_upload(file.filename, file.content_type, await file.read())
+
+        job = models.ProductImportJob(
+            farmer_id=current_user.id,
+            filename=file.filename,
+            status="pending",
+            total_rows=len(rows),
+            created_count=0,
+            error_count=0,
+            errors=[],
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        # The job runs in its own session, since a background task outlives this request's
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+        if len(rows) > IMPORT_SYNC_ROWS:
+            background_tasks.add_task(run_import_job, session_factory, job.id, rows)
+            response.status_code = 202
+            return job
+
+        run_import_job(session_factory, job.id, rows)
+        db.refresh(job)
+        return job
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error importing products: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error importing products")
+
+
+@router.get("/import/{job_id}", response_model=schemas.ProductImportJobResponse)
+async def get_import_job(
+        job_id: int,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Get the status and per-row errors of a bulk import"""
+    job = db.query(models.ProductImportJob).filter(
+        models.ProductImportJob.id == job_id,
+        models.ProductImportJob.farmer_id == current_user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
 @router.put("/{product_id}", response_model=schemas.ProductResponse)
 async def update_product(
         product_id: int,
         product_data: schemas.ProductUpdate,
+        response: Response,
+        if_match: Optional[str] = Header(None),
         db: Session = Depends(get_db),
         current_user: models.User = Depends(get_current_user)
 ):
-    """Update product (Farmer only)"""
+    """Update product (Farmer only).
+
+    Send the product's version as If-Match (e.g. `"3"`) to get 409 instead of
+    overwriting someone else's edit; the new version comes back as the ETag.
+    """
     try:
         if current_user.role != "farmer":
             raise HTTPException(status_code=403, detail="Only farmers can update products")
@@ -139,26 +333,93 @@ async def update_product(
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
+        # An edit that raced ours after this check fails the version check on commit
+        check_if_match(if_match, version_etag(product.version))
+        before = product_snapshot(product)
+
         # Update only provided fields
         update_data = product_data.dict(exclude_unset=True)
+        quantity = update_data.pop("quantity_available", None)
+        shards = update_data.pop("stock_shards", None)
         for field, value in update_data.items():
             if hasattr(product, field):
                 setattr(product, field, value)
 
+        # Stock is set against the current quantity and logged as an adjustment
+        if quantity is not None:
+            current = stock_levels(db, [product.id])[product.id]
+            if quantity != current:
+                set_stock(db, product.id, current, quantity)
+                record_movements(db, ADJUSTMENT, {product.id: quantity - current})
+        if shards is not None and shards != product.stock_shards:
+            set_stock_shards(db, product.id, shards)
+
         product.updated_at = datetime.utcnow()  # ✅ Update timestamp
+        after = product_snapshot(product)
+        record_product_change(db, before, after)
         db.commit()
         db.refresh(product)
+        invalidate_product(before, after)
 
+        response.headers["ETag"] = version_etag(product.version)
         return product
 
     except HTTPException:
+        db.rollback()
         raise
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=EDIT_CONFLICT_DETAIL)
     except Exception as e:
         db.rollback()
         print(f"❌ Error updating product: {str(e)}")
         raise HTTPException(status_code=500, detail="Error updating product")
 
 
+# Stock history of a product (Farmer only)
+@router.get("/{product_id}/inventory", response_model=schemas.InventoryHistoryResponse)
+async def get_inventory_history(
+        product_id: int,
+        response: Response,
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Get one page of a product's stock movements, newest first, with its ledger balance.
+
+    The next page's cursor is returned in the X-Next-Cursor header (absent on the last page).
+    """
+    try:
+        product = db.query(models.Product).filter(
+            models.Product.id == product_id,
+            models.Product.farmer_id == current_user.id
+        ).first()
+
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        movements, next_cursor = id_page(
+            db.query(models.InventoryMovement).filter(models.InventoryMovement.product_id == product_id),
+            models.InventoryMovement.id, cursor, limit
+        )
+
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return {
+            "product_id": product_id,
+            "quantity_available": stock_levels(db, [product_id])[product_id],
+            "ledger_quantity": ledger_stock(db, [product_id])[product_id],
+            "movements": movements
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error getting inventory history: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving inventory history")
+
+
 # Delete product (Farmer only)
 @router.delete("/{product_id}")
 async def delete_product(
@@ -179,10 +440,15 @@ async def delete_product(
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
+        before = product_snapshot(product)
+
         # Soft delete
         product.is_available = False
         product.updated_at = datetime.utcnow()
+        after = product_snapshot(product)
+        record_product_change(db, before, after)
         db.commit()
+        invalidate_product(before, after)
 
         return {"message": "Product deleted successfully"}
 
@@ -194,19 +460,112 @@ async def delete_product(
         raise HTTPException(status_code=500, detail="Error deleting product")
 
 
+# Catalog cache counters, for sizing CATALOG_CACHE_SIZE / CATALOG_CACHE_TTL
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get catalog cache hit/miss/eviction counters"""
+    return catalog_cache.stats()
+
+
+# Category counts and price histograms for the storefront filters
+@router.get("/facets", response_model=List[schemas.CategoryFacetResponse])
+async def get_facets(db: Session = Depends(get_db)):
+    """Get per-category product counts and price buckets from the facet summary tables"""
+    try:
+        buckets = {}
+        for row in db.query(models.CategoryPriceBucket).filter(
+            models.CategoryPriceBucket.product_count > 0
+        ).order_by(models.CategoryPriceBucket.bucket):
+            min_price, max_price = bucket_bounds(row.bucket)
+            buckets.setdefault(row.category, []).append(
+                {"min_price": min_price, "max_price": max_price, "count": row.product_count}
+            )
+
+        facets = db.query(models.CategoryFacet).order_by(models.CategoryFacet.category).all()
+        return [
+            {
+                "category": facet.category,
+                "available_count": facet.available_count,
+                "min_price": facet.min_price,
+                "max_price": facet.max_price,
+                "median_price": facet.median_price,
+                "buckets": buckets.get(facet.category, []),
+            }
+            for facet in facets
+        ]
+
+    except Exception as e:
+        print(f"❌ Error getting facets: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving facets")
+
+
 # Get product categories
 @router.get("/categories/list")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, db: Session = Depends(get_db)):
     """Get all product categories"""
     try:
-        categories = db.query(models.Product.category).distinct().all()
-        return [category[0] for category in categories if category[0]]
+        page = catalog_cache.get(CATEGORIES_KEY)
+        if page is None:
+            generation = catalog_cache.generation
+            rows = db.query(
+                models.Product.category,
+                func.max(func.coalesce(models.Product.updated_at, models.Product.created_at))
+            ).group_by(models.Product.category).all()
+            body = render_json([category for category, _ in rows if category])
+            timestamps = [changed for _, changed in rows if changed]
+            page = {
+                "body": body,
+                "etag": make_etag(body),
+                "last_modified": max(timestamps) if timestamps else None,
+            }
+            catalog_cache.set(CATEGORIES_KEY, page, generation=generation)
+        return conditional_response(request, page["body"], page["etag"], page["last_modified"])
 
     except Exception as e:
         print(f"❌ Error getting categories: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving categories")
 
 
+# Full or incremental catalog export for partners and the search indexer
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_lines),
+    "csv": ("text/csv; charset=utf-8", csv_lines),
+}
+
+
+@router.get("/export")
+async def export_products(
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+        updated_since: Optional[datetime] = Query(
+            None, description="Only products created or changed at or after this time (UTC if no offset)"
+        ),
+        db: Session = Depends(get_db)
+):
+    """Stream the catalog one row at a time, without loading it into memory.
+
+    Pass the previous response's X-Export-Watermark as `updated_since` to pull only
+    what changed; incremental exports include withdrawn products (is_available false).
+    """
+    media_type, serialize = EXPORT_FORMATS[format]
+    watermark = datetime.utcnow().replace(microsecond=0)
+    # The stream outlives this handler, so it reads through its own session
+    bind = db.get_bind()
+
+    def stream():
+        with Session(bind=bind) as session:
+            try:
+                yield from buffered(serialize(iter_export_rows(session, updated_since)))
+            except Exception as e:
+                # Headers are already sent; the truncated body is all the client will see
+                print(f"❌ Error streaming product export: {str(e)}")
+                raise
+
+    return StreamingResponse(stream(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="products.{format}"',
+        "X-Export-Watermark": watermark.isoformat() + "Z",
+    })
+
+
 # ✅ UPLOAD MULTIPLE IMAGES - FIXED
 @router.post("/{product_id}/upload-images")
 async def upload_product_images(
@@ -267,7 +626,9 @@ async def upload_product_images(
             db.add(product_image)
             image_urls.append(image_url)
 
+        snapshot = product_snapshot(product)
         db.commit()
+        invalidate_product(snapshot, snapshot)
 
         print(f"✅ Successfully uploaded {len(image_urls)} images for product {product_id}")
         return {
@@ -321,7 +682,9 @@ async def delete_product_image(
 
         # Delete image record from database
         db.delete(product_image)
+        snapshot = product_snapshot(product)
         db.commit()
+        invalidate_product(snapshot, snapshot)
 
         return {"message": "Image deleted successfully"}
 
@@ -369,7 +732,9 @@ async def delete_all_product_images(
             models.ProductImage.product_id == product_id
         ).delete()
 
+        snapshot = product_snapshot(product)
         db.commit()
+        invalidate_product(snapshot, snapshot)
 
         return {"message": "All images deleted successfully"}
 
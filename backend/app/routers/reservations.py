@@ -0,0 +1,95 @@
+# app/routers/reservations.py
+from collections import defaultdict
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Depends, status
+from sqlalchemy.orm import Session, selectinload
+
+from .. import schemas, models
+from ..utils.auth_utils import get_current_user
+from ..database import get_db
+from ..utils.cache import invalidate_products
+from ..utils.reservations import create_reservation, release_reservation
+
+router = APIRouter()
+
+
+# Hold stock for checkout
+@router.post("/", response_model=schemas.ReservationResponse, status_code=status.HTTP_201_CREATED)
+async def reserve_stock(
+        reservation_data: schemas.ReservationCreate,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Hold stock for a while; order it with POST /api/orders/ and `reservation_id`"""
+    if current_user.role != "buyer":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only buyers can reserve stock"
+        )
+    if not reservation_data.items:
+        raise HTTPException(status_code=400, detail="Reservation must contain at least one item")
+
+    try:
+        quantities = defaultdict(int)
+        for item in reservation_data.items:
+            quantities[item.product_id] += item.quantity
+
+        reservation, stock_changes = create_reservation(db, current_user.id, dict(quantities))
+        response = schemas.ReservationResponse.model_validate(reservation)
+        db.commit()
+        invalidate_products(stock_changes)
+        return response
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reserving stock: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error reserving stock"
+        )
+
+
+# Get buyer's active reservations
+@router.get("/", response_model=List[schemas.ReservationResponse])
+async def get_my_reservations(
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Get current user's unexpired reservations"""
+    try:
+        return db.query(models.Reservation).options(selectinload(models.Reservation.items)).filter(
+            models.Reservation.buyer_id == current_user.id,
+            models.Reservation.expires_at > datetime.utcnow()
+        ).order_by(models.Reservation.expires_at).all()
+
+    except Exception as e:
+        print(f"❌ Error getting reservations: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving reservations")
+
+
+# Release a reservation
+@router.delete("/{reservation_id}")
+async def cancel_reservation(
+        reservation_id: int,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(get_current_user)
+):
+    """Give a reservation's stock back before it expires"""
+    try:
+        stock_changes = release_reservation(db, reservation_id, current_user.id)
+        db.commit()
+        invalidate_products(stock_changes)
+        return {"message": "Reservation released", "reservation_id": reservation_id}
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error releasing reservation: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error releasing reservation")
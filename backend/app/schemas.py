@@ -147,21 +147,80 @@ class ProductUpdate(BaseModel):
     is_available: Optional[bool] = None
     min_order_quantity: Optional[int] = None
     image_urls: Optional[List[str]] = None
+    # High-contention mode for flash sales: split stock over this many shards (0 turns it off)
+    stock_shards: Optional[int] = Field(None, ge=0, le=64)
 
 
 class ProductResponse(ProductBase):
     id: int
     farmer_id: int
+    quantity_reserved: int = 0
+    quantity_sellable: int  # quantity_available less what unexpired reservations hold
     is_available: bool
     min_order_quantity: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 1  # send back as If-Match when editing
+    stock_shards: int = 0  # > 0: quantity_available may lag sales by a few seconds
     images: List[ProductImageResponse] = Field(default_factory=list)
 
     class Config:
         from_attributes = True
 
 
+class PriceBucketCount(BaseModel):
+    min_price: float
+    max_price: Optional[float] = None  # None for the open-ended top bucket
+    count: int
+
+
+class CategoryFacetResponse(BaseModel):
+    category: str
+    available_count: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    median_price: Optional[float] = None  # estimated from the bucket counts
+    buckets: List[PriceBucketCount] = []
+
+
+class ProductImportRowError(BaseModel):
+    row: Optional[int] = None  # 1-based data row; None for errors about the whole import
+    errors: List[str]
+
+
+class ProductImportJobResponse(BaseModel):
+    id: int
+    status: str
+    filename: Optional[str] = None
+    total_rows: int
+    created_count: int
+    error_count: int
+    errors: List[ProductImportRowError] = []
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class InventoryMovementResponse(BaseModel):
+    id: int
+    kind: str  # sale, cancel, restock or adjustment
+    delta: int
+    order_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class InventoryHistoryResponse(BaseModel):
+    product_id: int
+    quantity_available: int
+    ledger_quantity: int  # snapshot plus later movements; matches quantity_available
+    movements: List[InventoryMovementResponse]
+
+
 # ==============================
 # ORDER SCHEMAS
 # ==============================
@@ -177,11 +236,35 @@ class OrderItemCreate(BaseModel):
 
 
 class OrderCreate(BaseModel):
-    items: List[OrderItemCreate]
+    items: List[OrderItemCreate] = []
+    reservation_id: Optional[int] = None  # order a reservation's held items instead of `items`
     delivery_address: str
     delivery_type: str = "standard"
 
 
+class BulkOrderCreate(BaseModel):
+    reference: Optional[str] = None  # the buyer's own purchase order number, echoed in the result
+    items: List[OrderItemCreate] = Field(..., min_length=1)
+    delivery_address: str
+
+
+class BulkOrderResult(BaseModel):
+    index: int  # 1-based position of the order in the upload
+    reference: Optional[str] = None
+    result: str  # created or rejected
+    order_id: Optional[int] = None
+    order_number: Optional[str] = None
+    total_amount: Optional[float] = None
+    errors: List[str] = []
+
+
+class BulkOrderResponse(BaseModel):
+    total_orders: int
+    created: int
+    rejected: int
+    results: List[BulkOrderResult]
+
+
 class OrderItemResponse(BaseModel):
     id: int
     product_id: int
@@ -207,6 +290,52 @@ class OrderResponse(BaseModel):
     updated_at: datetime
     order_items: List[OrderItemResponse] = []
     buyer_name: Optional[str] = None
+    # Farmer inbox only: the farmer's share of the order
+    farmer_subtotal: Optional[float] = None
+    farmer_item_count: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class OrderStatusBulkUpdate(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=500)
+    status: str
+
+
+class OrderStatusResult(BaseModel):
+    order_id: int
+    result: str  # updated, unchanged, not_found, forbidden or invalid_transition
+    status: Optional[str] = None  # the order's status afterwards, when visible
+    detail: Optional[str] = None
+
+
+class OrderStatusBulkResponse(BaseModel):
+    status: str
+    updated: int
+    results: List[OrderStatusResult]
+
+
+# ==============================
+# RESERVATION SCHEMAS
+# ==============================
+class ReservationCreate(BaseModel):
+    items: List[OrderItemCreate]
+
+
+class ReservationItemResponse(BaseModel):
+    product_id: int
+    quantity: int
+
+    class Config:
+        from_attributes = True
+
+
+class ReservationResponse(BaseModel):
+    id: int
+    created_at: datetime
+    expires_at: datetime
+    items: List[ReservationItemResponse] = []
 
     class Config:
         from_attributes = True
@@ -307,6 +436,32 @@ class AnalyticsResponse(BaseModel):
     customer_ratings: float
 
 
+class DailyKpi(BaseModel):
+    day: str
+    orders: int
+    gmv: float
+    signups: int
+
+
+class AdminUserPage(BaseModel):
+    page: int
+    page_size: int
+    total: int  # as of the latest KPI snapshot, not counted per page
+    total_as_of: datetime
+    users: List[UserResponse]
+
+
+class PlatformKpiResponse(BaseModel):
+    as_of: datetime
+    window_days: int
+    gmv: float
+    orders: int
+    new_signups: int
+    active_farmers: int
+    total_users: int
+    daily: List[DailyKpi]
+
+
 # ==============================
 # NOTIFICATION SCHEMA
 # ==============================
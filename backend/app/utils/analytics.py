@@ -0,0 +1,200 @@
+# app/utils/analytics.py
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Integer, case, cast, func, insert, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models import (
+    ArchivedOrder, ArchivedOrderItem, FarmerCustomer, FarmerDailySales, FarmerOrder, FarmerProductSales,
+    Order, OrderItem, Product, Review,
+)
+from app.utils.conditional import as_utc
+from app.utils.facets import upsert_insert
+
+# ============================================================
+# FARMER SALES ROLLUPS
+# ============================================================
+# Orders count towards a farmer's sales from creation until they are cancelled;
+# delivery moves the farmer's share into `earned`. Each event adds signed
+# amounts to the rollup rows with one upsert per table, in the caller's
+# transaction, so the dashboard reads rollups instead of orders.
+ANALYTICS_MONTHS = 12
+
+
+def record_sales(db: Session, orders: Iterable[Order], sign: int = 1) -> None:
+    """
+    Adds orders to the farmers' rollups (sign=-1 takes them back out, on
+    cancellation). Orders must have order_items and their products loaded.
+    """
+    daily = defaultdict(lambda: {"orders": set(), "units": 0, "revenue": 0.0})
+    products = defaultdict(lambda: {"units": 0, "revenue": 0.0})
+    customers = defaultdict(set)
+    for order in orders:
+        day = as_utc(order.created_at).date()
+        for item in order.order_items:
+            farmer_id = item.product.farmer_id
+            daily[(farmer_id, day)]["orders"].add(order.id)
+            daily[(farmer_id, day)]["units"] += item.quantity
+            daily[(farmer_id, day)]["revenue"] += item.total_price
+            products[(farmer_id, item.product_id)]["units"] += item.quantity
+            products[(farmer_id, item.product_id)]["revenue"] += item.total_price
+            customers[(farmer_id, order.customer_id)].add(order.id)
+
+    _add(db, FarmerDailySales, ["farmer_id", "day"], [
+        {"farmer_id": farmer_id, "day": day, "order_count": sign * len(totals["orders"]),
+         "units": sign * int(totals["units"]), "revenue": sign * totals["revenue"], "earned": 0.0}
+        for (farmer_id, day), totals in daily.items()
+    ])
+    _add(db, FarmerProductSales, ["farmer_id", "product_id"], [
+        {"farmer_id": farmer_id, "product_id": product_id,
+         "units": sign * int(totals["units"]), "revenue": sign * totals["revenue"]}
+        for (farmer_id, product_id), totals in products.items()
+    ])
+    _add(db, FarmerCustomer, ["farmer_id", "customer_id"], [
+        {"farmer_id": farmer_id, "customer_id": customer_id, "order_count": sign * len(order_ids)}
+        for (farmer_id, customer_id), order_ids in customers.items()
+    ])
+
+
+def record_deliveries(db: Session, order_ids: List[int]) -> None:
+    """Moves each farmer's share of newly delivered orders into `earned`, from farmer_orders."""
+    if not order_ids:
+        return
+    earned = defaultdict(float)
+    for farmer_id, created_at, subtotal in (
+        db.query(FarmerOrder.farmer_id, Order.created_at, FarmerOrder.subtotal)
+        .join(Order, Order.id == FarmerOrder.order_id)
+        .filter(FarmerOrder.order_id.in_(order_ids))
+    ):
+        earned[(farmer_id, as_utc(created_at).date())] += subtotal
+
+    _add(db, FarmerDailySales, ["farmer_id", "day"], [
+        {"farmer_id": farmer_id, "day": day, "order_count": 0, "units": 0, "revenue": 0.0, "earned": amount}
+        for (farmer_id, day), amount in earned.items()
+    ])
+
+
+def _add(db: Session, model, keys: List[str], rows: List[dict]) -> None:
+    """Upserts rows, adding their values onto existing ones; one executemany per table."""
+    if not rows:
+        return
+    statement = upsert_insert(db)(model)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            column: getattr(model, column) + getattr(statement.excluded, column)
+            for column in rows[0] if column not in keys
+        },
+    )
+    db.execute(statement, rows)
+
+
+# ============================================================
+# DASHBOARD
+# ============================================================
+def farmer_analytics(db: Session, farmer_id: int, today: Optional[date] = None) -> dict:
+    """
+    AnalyticsResponse for a farmer from the rollups: totals over their sales
+    days, the last ANALYTICS_MONTHS months of earnings, per-product totals,
+    live customers, plus listed products and the average review rating.
+    """
+    today = today or datetime.utcnow().date()
+    totals = db.query(
+        func.coalesce(func.sum(FarmerDailySales.earned), 0),
+        func.coalesce(func.sum(FarmerDailySales.order_count), 0),
+    ).filter(FarmerDailySales.farmer_id == farmer_id).one()
+
+    months = []
+    year, month = today.year, today.month
+    for _ in range(ANALYTICS_MONTHS):
+        months.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    months.reverse()
+    earned = defaultdict(float)
+    for day, amount in db.query(FarmerDailySales.day, FarmerDailySales.earned).filter(
+        FarmerDailySales.farmer_id == farmer_id,
+        FarmerDailySales.day >= date(*months[0], 1)
+    ):
+        earned[(day.year, day.month)] += amount
+
+    performance = db.query(Product.name, FarmerProductSales.revenue, FarmerProductSales.units).join(
+        Product, Product.id == FarmerProductSales.product_id
+    ).filter(
+        FarmerProductSales.farmer_id == farmer_id,
+        FarmerProductSales.units > 0
+    ).order_by(FarmerProductSales.revenue.desc()).all()
+
+    customers = db.query(func.count()).select_from(FarmerCustomer).filter(
+        FarmerCustomer.farmer_id == farmer_id,
+        FarmerCustomer.order_count > 0
+    ).scalar()
+    active_products = db.query(func.count(Product.id)).filter(
+        Product.farmer_id == farmer_id,
+        Product.is_available == True
+    ).scalar()
+    rating = db.query(func.avg(Review.rating)).outerjoin(Product, Product.id == Review.product_id).filter(
+        or_(Review.farmer_id == farmer_id, Product.farmer_id == farmer_id),
+        Review.is_approved == True
+    ).scalar()
+
+    return {
+        "total_earnings": totals[0],
+        "total_orders": totals[1],
+        "active_products": active_products,
+        "total_customers": customers,
+        "monthly_earnings": [
+            {"month": date(year, month, 1).strftime("%b %Y"), "earned": earned[(year, month)]}
+            for year, month in months
+        ],
+        "product_performance": [
+            {"product": name, "revenue": revenue, "sales": units} for name, revenue, units in performance
+        ],
+        "customer_ratings": round(rating or 0.0, 1),
+    }
+
+
+# ============================================================
+# FULL REBUILD
+# ============================================================
+def rebuild_farmer_rollups(db: Session) -> None:
+    """
+    Recomputes all three rollup tables from order_items and archived_order_items
+    with three GROUP BY INSERT ... SELECTs. Used to repair drift (e.g. after writes that bypassed the
+    API); the caller commits.
+    """
+    live = union_all(*[
+        select(item.order_id, item.product_id, item.quantity, item.total_price,
+               order.customer_id, order.created_at, order.status, Product.farmer_id)
+        .join(order, order.id == item.order_id)
+        .join(Product, Product.id == item.product_id)
+        .where(func.coalesce(order.status, "pending") != "cancelled")
+        for order, item in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem))
+    ]).subquery()
+    day = func.date(live.c.created_at)
+
+    db.query(FarmerDailySales).delete()
+    db.query(FarmerProductSales).delete()
+    db.query(FarmerCustomer).delete()
+    db.execute(insert(FarmerDailySales).from_select(
+        ["farmer_id", "day", "order_count", "units", "revenue", "earned"],
+        select(
+            live.c.farmer_id, day, func.count(live.c.order_id.distinct()),
+            cast(func.sum(live.c.quantity), Integer), func.sum(live.c.total_price),
+            func.sum(case((live.c.status == "delivered", live.c.total_price), else_=literal(0.0))),
+        ).group_by(live.c.farmer_id, day)
+    ))
+    db.execute(insert(FarmerProductSales).from_select(
+        ["farmer_id", "product_id", "units", "revenue"],
+        select(
+            live.c.farmer_id, live.c.product_id,
+            cast(func.sum(live.c.quantity), Integer), func.sum(live.c.total_price),
+        ).group_by(live.c.farmer_id, live.c.product_id)
+    ))
+    db.execute(insert(FarmerCustomer).from_select(
+        ["farmer_id", "customer_id", "order_count"],
+        select(
+            live.c.farmer_id, live.c.customer_id, func.count(live.c.order_id.distinct()),
+        ).group_by(live.c.farmer_id, live.c.customer_id)
+    ))
@@ -1,12 +1,15 @@
 # app/utils/auth_utils.py
+import os
+import time
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.database import get_db
 from app.models import User
+from app.utils.cache import LRUCache
 
 # ============================================================
 # SECURITY CONFIG
@@ -77,6 +80,33 @@ def verify_token(token: str):
         )
 
 
+# ============================================================
+# PRINCIPAL CACHE
+# ============================================================
+# Verified tokens map to their user's column values, so a repeat request skips
+# both jwt.decode and the users lookup. An entry lives until the token's exp,
+# capped at AUTH_CACHE_TTL seconds so edits made through another worker show up
+# within that time; edits in this process drop the user's entries at once.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 60))
+
+principal_cache = LRUCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+_USER_COLUMNS = [attr.key for attr in User.__mapper__.column_attrs]
+
+
+def forget_principal(user_id: int):
+    """Drops the cached principal behind every token of the user, e.g. after a profile edit or deactivation."""
+    principal_cache.invalidate(lambda token, cached_user_id: cached_user_id == user_id)
+
+
+def _cached_user(db: Session, values: dict) -> User:
+    # Attached without a SELECT, so handlers can still edit and lazy-load through it
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
 # ============================================================
 # CURRENT USER DEPENDENCY
 # ============================================================
@@ -86,8 +116,21 @@ def get_current_user(
 ):
     """
     Extracts the current user from the token and fetches them from the database.
-    Accepts both username or email as 'sub' claim in the token.
+    Accepts both username or email as 'sub' claim in the token. Tokens seen
+    before are answered from principal_cache without decoding or querying.
     """
+    deactivated_exception = HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Account has been deactivated",
+    )
+
+    cached = principal_cache.get(token)
+    if cached is not None:
+        if not cached["is_active"]:
+            raise deactivated_exception
+        return _cached_user(db, cached)
+    generation = principal_cache.generation
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -111,5 +154,12 @@ def get_current_user(
 
     if user is None:
         raise credentials_exception
+    if not user.is_active:
+        raise deactivated_exception
 
+    expires = payload.get("exp")
+    principal_cache.set(
+        token, {key: getattr(user, key) for key in _USER_COLUMNS}, meta=user.id,
+        ttl=expires - time.time() if expires is not None else None, generation=generation
+    )
     return user
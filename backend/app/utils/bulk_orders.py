@@ -0,0 +1,217 @@
+# app/utils/bulk_orders.py
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+
+from app.models import Order, OrderItem, Product, User
+from app.schemas import BulkOrderCreate
+from app.utils.analytics import record_sales
+from app.utils.cache import invalidate_products
+from app.utils.facets import record_product_change
+from app.utils.farmer_orders import link_orders_farmers
+from app.utils.inventory import SALE, record_movements
+from app.utils.stock import take_stock
+
+# ============================================================
+# BULK ORDER LIMITS
+# ============================================================
+BULK_ORDER_MAX_ROWS = 5000  # CSV lines or JSON entries per upload
+BULK_ORDER_CHUNK_SIZE = 100  # orders per transaction
+
+
+def new_order_number() -> str:
+    return f"ORD-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+
+
+def _rejected(index: int, reference, errors: List[str]) -> dict:
+    return {"index": index, "reference": reference, "result": "rejected", "errors": errors}
+
+
+# ============================================================
+# PARSING
+# ============================================================
+def group_orders(rows: List) -> Tuple[List[Tuple[int, BulkOrderCreate]], List[dict]]:
+    """
+    Turns uploaded rows into orders. A row with `items` is a whole order (JSON);
+    any other row is one line (reference, delivery_address, product_id,
+    quantity), and lines sharing a reference make up one order, as in a CSV
+    procurement file. Orders are numbered from 1 in order of first appearance.
+    Returns (valid, rejected results).
+    """
+    grouped, by_reference, errors = [], {}, defaultdict(list)
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            grouped.append({"_row": number})
+            errors[len(grouped)].append(f"Row {number}: each entry must be an object")
+            continue
+        if "items" in row:
+            grouped.append(row)
+            continue
+        reference = row.get("reference") or None
+        order = by_reference.get(reference) if reference else None
+        if order is None:
+            order = {"reference": reference, "delivery_address": row.get("delivery_address"), "items": []}
+            grouped.append(order)
+            if reference:
+                by_reference[reference] = order
+            order["_index"] = len(grouped)
+        elif row.get("delivery_address") not in (None, "", order["delivery_address"]):
+            errors[order["_index"]].append(f"Row {number}: delivery_address differs from the order's first line")
+        order["items"].append({"product_id": row.get("product_id"), "quantity": row.get("quantity")})
+
+    valid, rejected = [], []
+    for index, order in enumerate(grouped, start=1):
+        reference = order.get("reference")
+        if errors[index]:
+            rejected.append(_rejected(index, reference, errors[index]))
+            continue
+        try:
+            valid.append((index, BulkOrderCreate.model_validate(
+                {key: value for key, value in order.items() if not key.startswith("_")}
+            )))
+        except ValidationError as e:
+            rejected.append(_rejected(index, reference, [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            ]))
+    return valid, rejected
+
+
+# ============================================================
+# VALIDATION
+# ============================================================
+def plan_orders(db: Session, orders: List[Tuple[int, BulkOrderCreate]]
+                ) -> Tuple[List[Tuple[int, BulkOrderCreate]], List[dict]]:
+    """
+    Checks every order against one IN query over all of their products, in
+    upload order, so an order is rejected when the products are gone or when
+    the orders before it in the upload have already used up the stock.
+    Returns (accepted, rejected results). The stock is only taken in
+    write_orders, which checks it again.
+    """
+    product_ids = {item.product_id for _, order in orders for item in order.items}
+    remaining = {
+        row.id: row
+        for row in db.query(
+            Product.id, Product.name, (Product.quantity_available - Product.quantity_reserved).label("available")
+        ).filter(Product.id.in_(product_ids), Product.is_available == True)
+    }
+    left = {product_id: row.available for product_id, row in remaining.items()}
+
+    accepted, rejected = [], []
+    for index, order in orders:
+        quantities = defaultdict(int)
+        for item in order.items:
+            quantities[item.product_id] += item.quantity
+        errors = []
+        for product_id, quantity in quantities.items():
+            if product_id not in remaining:
+                errors.append(f"Product {product_id} not found or unavailable")
+            elif left[product_id] < quantity:
+                errors.append(f"Not enough stock for {remaining[product_id].name}. Available: {max(left[product_id], 0)}")
+        if errors:
+            rejected.append(_rejected(index, order.reference, errors))
+            continue
+        for product_id, quantity in quantities.items():
+            left[product_id] -= quantity
+        accepted.append((index, order))
+    return accepted, rejected
+
+
+# ============================================================
+# WRITING
+# ============================================================
+def write_orders(db: Session, buyer: User, orders: List[Tuple[int, BulkOrderCreate]]) -> List[dict]:
+    """
+    Creates the orders BULK_ORDER_CHUNK_SIZE at a time, one transaction per
+    chunk. Should a chunk fail the stock check (another checkout got there
+    first) it is rolled back and its orders retried one per transaction, so
+    only the orders that are now short are rejected. Chunks already written
+    stay committed if a later one fails unexpectedly.
+    """
+    results = []
+    for start in range(0, len(orders), BULK_ORDER_CHUNK_SIZE):
+        chunk = orders[start:start + BULK_ORDER_CHUNK_SIZE]
+        try:
+            results += _write_chunk(db, buyer, chunk)
+        except HTTPException:
+            db.rollback()
+            for index, order in chunk:
+                try:
+                    results += _write_chunk(db, buyer, [(index, order)])
+                except HTTPException as e:
+                    db.rollback()
+                    results.append(_rejected(index, order.reference, [e.detail]))
+    return results
+
+
+def _write_chunk(db: Session, buyer: User, chunk: List[Tuple[int, BulkOrderCreate]]) -> List[dict]:
+    """
+    Writes one chunk of orders as create_order would, in one transaction: one
+    take_stock for all of the chunk's lines, then one INSERT each for the
+    orders, their items and their farmer_orders rows.
+    """
+    quantities = defaultdict(int)
+    for _, order in chunk:
+        for item in order.items:
+            quantities[item.product_id] += item.quantity
+    taken = take_stock(db, dict(quantities))
+
+    values, lines = [], []
+    for _, order in chunk:
+        order_lines = []
+        for item in order.items:
+            price = taken[item.product_id][0].price
+            order_lines.append({
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "unit_price": price,
+                "total_price": price * item.quantity,
+            })
+        lines.append(order_lines)
+        values.append({
+            "order_number": new_order_number(),
+            "customer_id": buyer.id,
+            "total_amount": sum(line["total_price"] for line in order_lines),
+            "status": "pending",
+            "payment_status": "pending",
+            "delivery_type": "standard",
+            "delivery_address": order.delivery_address,
+        })
+    created = db.execute(
+        insert(Order).returning(Order.id, sort_by_parameter_order=True), values
+    ).scalars().all()
+
+    db.execute(insert(OrderItem), [
+        {"order_id": order_id, **line} for order_id, order_lines in zip(created, lines) for line in order_lines
+    ])
+    link_orders_farmers(db, {
+        order_id: [(taken[line["product_id"]][0].farmer_id, line["total_price"]) for line in order_lines]
+        for order_id, order_lines in zip(created, lines)
+    })
+    for order_id, order_lines in zip(created, lines):
+        deltas = defaultdict(int)
+        for line in order_lines:
+            deltas[line["product_id"]] -= line["quantity"]
+        record_movements(db, SALE, deltas, order_id)
+
+    stock_changes = [(before, after) for _, before, after in taken.values()]
+    for before, after in stock_changes:
+        record_product_change(db, before, after)
+    record_sales(db, db.query(Order).options(
+        selectinload(Order.order_items).selectinload(OrderItem.product)
+    ).filter(Order.id.in_(created)).all())
+
+    db.commit()
+    invalidate_products(stock_changes)
+    return [
+        {"index": index, "reference": order.reference, "result": "created", "order_id": order_id,
+         "order_number": value["order_number"], "total_amount": value["total_amount"], "errors": []}
+        for (index, order), order_id, value in zip(chunk, created, values)
+    ]
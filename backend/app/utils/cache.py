@@ -0,0 +1,199 @@
+# app/utils/cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================================================
+# CACHE CONFIG
+# ============================================================
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 1024))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 300))
+
+
+# ============================================================
+# LRU + TTL CACHE
+# ============================================================
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache whose entries also expire after `ttl` seconds.
+    Each entry carries a `meta` value that invalidate() predicates can inspect,
+    so writers can drop exactly the entries their change affects.
+
+    Every invalidate() bumps `generation`. A read-through caller reads it before
+    loading and passes it to set(), which then skips the fill if a write was
+    invalidated in the meantime, since the loaded value may predate that write.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.generation = 0
+        self.stale_fills = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, meta, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, meta: Any = None, ttl: Optional[float] = None,
+            generation: Optional[int] = None):
+        """
+        Stores `value`, expiring after `ttl` seconds when that is sooner than the
+        cache's. With `generation`, nothing is stored if an invalidation has run since.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_fills += 1
+                return
+            self._entries[key] = (value, meta, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drops every entry for which predicate(key, meta) is true."""
+        with self._lock:
+            self.generation += 1
+            stale = [key for key, (_, meta, _) in self._entries.items() if predicate(key, meta)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills,
+            }
+
+
+catalog_cache = LRUCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_TTL)
+
+
+# ============================================================
+# CATALOG KEYS AND INVALIDATION
+# ============================================================
+CATEGORIES_KEY = ("categories",)
+
+
+def product_listing_filters(q=None, category=None, min_price=None, max_price=None, farmer_id=None,
+                            near=None, radius_km=None) -> dict:
+    """
+    Normalizes listing filters so equivalent requests share one cache entry.
+    `near` is a parsed (latitude, longitude), rounded to ~1m.
+    """
+    return {
+        "q": " ".join(q.lower().split()) if q else None,
+        "category": category.strip().lower() if category else None,
+        "min_price": float(min_price) if min_price is not None else None,
+        "max_price": float(max_price) if max_price is not None else None,
+        "farmer_id": farmer_id or None,
+        "near": (round(near[0], 5), round(near[1], 5), float(radius_km)) if near else None,
+    }
+
+
+def product_listing_key(filters: dict, cursor: Optional[str], limit: int) -> tuple:
+    return ("products",) + tuple(sorted(filters.items())) + (("cursor", cursor), ("limit", limit))
+
+
+def product_snapshot(product) -> dict:
+    """Captures the fields listing filters select on, before or after a change."""
+    return {
+        "id": product.id,
+        "category": product.category,
+        "price": product.price,
+        "farmer_id": product.farmer_id,
+        "is_available": product.is_available,
+    }
+
+
+def _listing_includes(filters: dict, snapshot: dict) -> bool:
+    if snapshot["is_available"] is False:
+        return False
+    if filters["category"] and filters["category"] != (snapshot["category"] or "").lower():
+        return False
+    if filters["min_price"] is not None and snapshot["price"] < filters["min_price"]:
+        return False
+    if filters["max_price"] is not None and snapshot["price"] > filters["max_price"]:
+        return False
+    if filters["farmer_id"] and snapshot["farmer_id"] != filters["farmer_id"]:
+        return False
+    # Text and distance matches aren't re-evaluated here; a search that
+    # passes the other filters is treated as affected.
+    return True
+
+
+def invalidate_product(before: Optional[dict], after: Optional[dict]):
+    """
+    Drops cached listings that showed the product before the change or would
+    show it afterwards. Pass None for `before` on create and `after` on delete.
+    Every page of an affected filter set is dropped, since the change can shift
+    rows across page boundaries.
+    """
+    invalidate_products([(before, after)])
+
+
+def invalidate_products(changes: List[Tuple[Optional[dict], Optional[dict]]]):
+    """invalidate_product for many (before, after) pairs in one pass over the cache."""
+    # Bulk writes repeat the same listing-relevant fields many times over
+    snapshots = list({
+        (s["category"], s["price"], s["farmer_id"], s["is_available"]): s
+        for change in changes for s in change if s is not None
+    }.values())
+    categories_changed = any(
+        before is None or after is None or before["category"] != after["category"]
+        for before, after in changes
+    )
+
+    def affected(key, meta):
+        if key == CATEGORIES_KEY:
+            return categories_changed
+        return any(_listing_includes(meta, s) for s in snapshots)
+
+    catalog_cache.invalidate(affected)
+
+
+def invalidate_near_listings():
+    """Drops every "near me" listing, e.g. after a farm moves and its products with it."""
+    catalog_cache.invalidate(lambda key, meta: bool(meta and meta.get("near")))
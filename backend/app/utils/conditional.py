@@ -0,0 +1,105 @@
+# app/utils/conditional.py
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from starlette.responses import Response
+
+
+# ============================================================
+# VALIDATORS
+# ============================================================
+def render_json(payload) -> bytes:
+    """Renders a payload exactly as JSONResponse would, so the bytes can be hashed and cached."""
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag over the exact response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Database timestamps are stored as UTC, but SQLite hands them back naive."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+EDIT_CONFLICT_DETAIL = "Changed by someone else since you loaded it, reload and retry"
+
+
+def version_etag(version: int) -> str:
+    """Strong ETag for a row's optimistic-locking version."""
+    return f'"{version}"'
+
+
+# ============================================================
+# CONDITIONAL REQUESTS
+# ============================================================
+def check_if_match(if_match: Optional[str], etag: str) -> None:
+    """
+    Raises 409 unless If-Match (when sent) names `etag`. Unlike If-None-Match it
+    uses the strong comparison, so weak tags never match (RFC 7232 section 3.1).
+    """
+    if if_match is None or if_match.strip() == "*":
+        return
+    if etag not in [tag.strip() for tag in if_match.split(",")]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=EDIT_CONFLICT_DETAIL
+        )
+
+
+# ============================================================
+# CONDITIONAL RESPONSES
+# ============================================================
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Evaluates If-None-Match, falling back to If-Modified-Since only when the
+    client sent no entity tags (RFC 7232 section 6).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # GET uses the weak comparison, so a W/ prefix added by a proxy still matches
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def conditional_response(request: Request, body: bytes, etag: str,
+                         last_modified: Optional[datetime] = None,
+                         headers: Optional[dict] = None,
+                         cache_control: str = "no-cache") -> Response:
+    """
+    Returns 304 with no body when the client's copy is current, otherwise the
+    pre-rendered JSON body. Both carry the validators so clients can revalidate.
+    """
+    response_headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        response_headers["Last-Modified"] = format_datetime(as_utc(last_modified), usegmt=True)
+    if headers:
+        response_headers.update(headers)
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,114 @@
+# app/utils/export.py
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Product, ProductImage
+from app.utils.conditional import as_utc
+from app.utils.pagination import timestamp_param
+
+# ============================================================
+# EXPORT CONFIG
+# ============================================================
+EXPORT_COLUMNS = [
+    "id", "name", "description", "price", "category", "unit", "quantity_available",
+    "min_order_quantity", "is_available", "farmer_id", "created_at", "updated_at",
+]
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_BUFFER_BYTES = 64 * 1024
+
+
+# ============================================================
+# ROW SOURCE
+# ============================================================
+def iter_export_rows(db: Session, updated_since: Optional[datetime] = None,
+                     chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yields one plain dict per product in id order, reading `chunk_size` rows at a
+    time through a server-side cursor. Image URLs are fetched once per chunk.
+
+    A full export covers listable products only. An incremental export
+    (`updated_since`) also covers products that were withdrawn since then, so
+    consumers can see `is_available: false` and drop them.
+    """
+    statement = select(*[getattr(Product, column) for column in EXPORT_COLUMNS]).order_by(Product.id)
+    if updated_since is not None:
+        since = as_utc(updated_since).replace(tzinfo=None)
+        changed = func.coalesce(Product.updated_at, Product.created_at)
+        statement = statement.where(changed >= timestamp_param(db, since))
+    else:
+        statement = statement.where(Product.is_available == True)
+
+    result = db.execute(statement, execution_options={"yield_per": chunk_size})
+    for chunk in result.partitions():
+        image_urls = defaultdict(list)
+        for product_id, image_url in db.execute(
+            select(ProductImage.product_id, ProductImage.image_url)
+            .where(ProductImage.product_id.in_([row.id for row in chunk]))
+            .order_by(ProductImage.id)
+        ):
+            image_urls[product_id].append(image_url)
+
+        for row in chunk:
+            record = row._asdict()
+            record["image_urls"] = image_urls.get(row.id, [])
+            yield record
+
+
+# ============================================================
+# SERIALIZERS
+# ============================================================
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def ndjson_lines(records: Iterable[dict]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def csv_lines(records: Iterable[dict]) -> Iterator[str]:
+    """CSV with a header row; image URLs are joined with spaces in one column."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS + ["image_urls"])
+    for record in records:
+        writer.writerow(
+            [_csv_value(record[column]) for column in EXPORT_COLUMNS]
+            + [" ".join(record["image_urls"])]
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def buffered(lines: Iterable[str], size: int = EXPORT_BUFFER_BYTES) -> Iterator[str]:
+    """Groups small lines into ~`size` chunks so each body message isn't a single row."""
+    pending = []
+    pending_size = 0
+    for line in lines:
+        pending.append(line)
+        pending_size += len(line)
+        if pending_size >= size:
+            yield "".join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield "".join(pending)
@@ -0,0 +1,206 @@
+# app/utils/facets.py
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models import Product, CategoryFacet, CategoryPriceBucket
+
+# ============================================================
+# PRICE BUCKETS
+# ============================================================
+# Lower edges in Naira; the last bucket is open-ended.
+PRICE_BUCKET_EDGES = [0, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+
+
+def bucket_index(price: float) -> int:
+    for index in range(len(PRICE_BUCKET_EDGES) - 1, -1, -1):
+        if price >= PRICE_BUCKET_EDGES[index]:
+            return index
+    return 0
+
+
+def bucket_bounds(index: int):
+    upper = PRICE_BUCKET_EDGES[index + 1] if index + 1 < len(PRICE_BUCKET_EDGES) else None
+    return PRICE_BUCKET_EDGES[index], upper
+
+
+def _listable():
+    # Same predicate as the product listing, matching the listable-product partial indexes
+    return Product.is_available == True
+
+
+def _is_listed(snapshot: Optional[dict]) -> bool:
+    return snapshot is not None and snapshot["is_available"] is not False
+
+
+def upsert_insert(db: Session):
+    """The dialect's insert(), which supports on_conflict_do_update on SQLite and PostgreSQL."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def estimate_median(counts: Dict[int, int], min_price: Optional[float], max_price: Optional[float]):
+    """Interpolates the median from bucket counts, clamped to the category's real price range."""
+    total = sum(counts.values())
+    if total <= 0 or min_price is None:
+        return None
+    target = total / 2
+    seen = 0
+    for index in sorted(counts):
+        count = counts[index]
+        if count <= 0:
+            continue
+        if seen + count >= target:
+            lower, upper = bucket_bounds(index)
+            lower = max(lower, min_price)
+            upper = min(upper, max_price) if upper is not None else max_price
+            return round(lower + (upper - lower) * (target - seen) / count, 2)
+        seen += count
+    return max_price
+
+
+# ============================================================
+# INCREMENTAL MAINTENANCE
+# ============================================================
+def record_product_change(db: Session, before: Optional[dict], after: Optional[dict]):
+    """
+    Applies one product change to the facet tables inside the caller's transaction.
+    `before`/`after` are product snapshots (None on create/hard delete). Stock-only
+    changes that leave the product listed at the same price are a no-op.
+    """
+    old = before if _is_listed(before) else None
+    new = after if _is_listed(after) else None
+    if old is None and new is None:
+        return
+    if old and new and old["category"] == new["category"] and old["price"] == new["price"]:
+        return
+
+    db.flush()
+    touched = set()
+    if old:
+        _adjust_bucket(db, old["category"], bucket_index(old["price"]), -1)
+        touched.add(old["category"])
+    if new:
+        _adjust_bucket(db, new["category"], bucket_index(new["price"]), 1)
+        touched.add(new["category"])
+    for category in touched:
+        _refresh_summary(db, category)
+
+
+def record_products_created(db: Session, snapshots: List[dict]):
+    """
+    record_product_change for a batch of new products: one bucket upsert per
+    (category, bucket) and one summary refresh per category, however many rows.
+    """
+    deltas = Counter(
+        (snapshot["category"], bucket_index(snapshot["price"]))
+        for snapshot in snapshots if _is_listed(snapshot)
+    )
+    if not deltas:
+        return
+
+    db.flush()
+    for (category, bucket), count in deltas.items():
+        _adjust_bucket(db, category, bucket, count)
+    for category in {category for category, _ in deltas}:
+        _refresh_summary(db, category)
+
+
+def _adjust_bucket(db: Session, category: str, bucket: int, delta: int):
+    insert = upsert_insert(db)
+    statement = insert(CategoryPriceBucket).values(
+        category=category, bucket=bucket, product_count=max(delta, 0)
+    ).on_conflict_do_update(
+        index_elements=["category", "bucket"],
+        set_={"product_count": CategoryPriceBucket.product_count + delta},
+    )
+    db.execute(statement)
+
+
+def _refresh_summary(db: Session, category: str):
+    """Recomputes one category's summary row from its buckets plus two index seeks for min/max."""
+    counts = dict(
+        db.query(CategoryPriceBucket.bucket, CategoryPriceBucket.product_count)
+        .filter(CategoryPriceBucket.category == category)
+        .all()
+    )
+    available = sum(counts.values())
+    if available <= 0:
+        db.query(CategoryFacet).filter(CategoryFacet.category == category).delete()
+        db.query(CategoryPriceBucket).filter(CategoryPriceBucket.category == category).delete()
+        return
+
+    listed = db.query(Product.price).filter(Product.category == category, _listable())
+    min_price = listed.order_by(Product.price.asc()).limit(1).scalar()
+    max_price = listed.order_by(Product.price.desc()).limit(1).scalar()
+    _upsert_summary(db, category, available, min_price, max_price, estimate_median(counts, min_price, max_price))
+
+
+def _upsert_summary(db: Session, category, available, min_price, max_price, median_price):
+    insert = upsert_insert(db)
+    values = {
+        "available_count": available,
+        "min_price": min_price,
+        "max_price": max_price,
+        "median_price": median_price,
+        "updated_at": func.now(),
+    }
+    db.execute(
+        insert(CategoryFacet).values(category=category, **values)
+        .on_conflict_do_update(index_elements=["category"], set_=values)
+    )
+
+
+# ============================================================
+# FULL REBUILD
+# ============================================================
+def rebuild_category_facets(db: Session) -> int:
+    """
+    Recomputes both facet tables from products with two GROUP BY queries.
+    Used to repair drift (e.g. after writes that bypassed the API); the caller commits.
+    Returns the number of categories written.
+    """
+    bucket_expr = case(
+        *[(Product.price < edge, index - 1) for index, edge in enumerate(PRICE_BUCKET_EDGES) if index > 0],
+        else_=len(PRICE_BUCKET_EDGES) - 1,
+    )
+    bucket_rows = (
+        db.query(Product.category, bucket_expr.label("bucket"), func.count(Product.id))
+        .filter(_listable())
+        .group_by(Product.category, bucket_expr)
+        .all()
+    )
+    ranges = dict(
+        (category, (low, high))
+        for category, low, high in db.query(Product.category, func.min(Product.price), func.max(Product.price))
+        .filter(_listable())
+        .group_by(Product.category)
+        .all()
+    )
+
+    counts = defaultdict(dict)
+    for category, bucket, count in bucket_rows:
+        counts[category][bucket] = count
+
+    db.query(CategoryPriceBucket).delete()
+    db.query(CategoryFacet).delete()
+    for category, category_counts in counts.items():
+        min_price, max_price = ranges[category]
+        db.add_all(
+            CategoryPriceBucket(category=category, bucket=bucket, product_count=count)
+            for bucket, count in category_counts.items()
+        )
+        db.add(CategoryFacet(
+            category=category,
+            available_count=sum(category_counts.values()),
+            min_price=min_price,
+            max_price=max_price,
+            median_price=estimate_median(category_counts, min_price, max_price),
+        ))
+    db.flush()
+    return len(counts)
@@ -0,0 +1,42 @@
+# app/utils/farmer_orders.py
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import ArchivedFarmerOrder, FarmerOrder
+
+
+def link_order_farmers(db: Session, order_id: int, lines: Iterable[Tuple[int, float]]) -> None:
+    """
+    Records which farmers are on an order, in the caller's transaction, from its
+    lines as (farmer_id, line_total): one farmer_orders row per farmer with their
+    subtotal and line count, inserted in one statement.
+    """
+    link_orders_farmers(db, {order_id: lines})
+
+
+def link_orders_farmers(db: Session, lines_by_order: Dict[int, Iterable[Tuple[int, float]]]) -> None:
+    """link_order_farmers for many orders at once, given {order_id: lines}, still in one INSERT."""
+    rows = []
+    for order_id, lines in lines_by_order.items():
+        shares = defaultdict(lambda: [0.0, 0])
+        for farmer_id, line_total in lines:
+            shares[farmer_id][0] += line_total
+            shares[farmer_id][1] += 1
+        rows += [
+            {"farmer_id": farmer_id, "order_id": order_id, "subtotal": subtotal, "item_count": count}
+            for farmer_id, (subtotal, count) in shares.items()
+        ]
+    if rows:
+        db.execute(insert(FarmerOrder), rows)
+
+
+def farmer_on_order(db: Session, farmer_id: int, order_id: int, archived: bool = False) -> bool:
+    """Whether the farmer has products on the order (an archived one with `archived`): one primary-key lookup."""
+    link = ArchivedFarmerOrder if archived else FarmerOrder
+    return db.query(link.order_id).filter(
+        link.farmer_id == farmer_id,
+        link.order_id == order_id
+    ).first() is not None
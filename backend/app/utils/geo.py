@@ -0,0 +1,142 @@
+# app/utils/geo.py
+import math
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+# ============================================================
+# GEOHASH
+# ============================================================
+# Products store a precision-9 geohash (~5m cells) of their farm. Any shorter
+# prefix is the enclosing coarser cell, so a radius search becomes a handful
+# of index range scans over `products.geohash`.
+GEOHASH_PRECISION = 9
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+DEFAULT_RADIUS_KM = 25.0
+MAX_RADIUS_KM = 500.0
+# Upper bound on prefix ranges per search; picks how coarse the covering cells are
+MAX_COVERING_CELLS = 16
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lng_range[0] = mid
+            else:
+                value <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_range_end(cell: str) -> Optional[str]:
+    """
+    Exclusive upper bound of the geohashes inside `cell`: the next cell of the
+    same precision, carrying past "z" into earlier characters; None after the
+    last cell. Built from geohash characters only, so [cell, end) holds under
+    any collation that sorts digits before letters, not just byte order.
+    """
+    chars = list(cell)
+    while chars:
+        position = GEOHASH_ALPHABET.index(chars.pop())
+        if position + 1 < len(GEOHASH_ALPHABET):
+            return "".join(chars) + GEOHASH_ALPHABET[position + 1]
+    return None
+
+
+def cell_size_degrees(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell at `precision`."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """
+    Geohash prefixes whose cells together contain the circle's bounding box,
+    at the finest precision that needs no more than MAX_COVERING_CELLS cells.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    south, north = max(-90.0, latitude - lat_delta), min(90.0, latitude + lat_delta)
+    west, east = longitude - lng_delta, longitude + lng_delta
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size_degrees(precision)
+        rows = range(math.floor((south + 90) / height), math.floor((north + 90) / height) + 1)
+        cols = range(math.floor((west + 180) / width), math.floor((east + 180) / width) + 1)
+        if len(rows) * len(cols) <= MAX_COVERING_CELLS or precision == 1:
+            break
+
+    cells = {
+        geohash_encode(
+            min(90.0, -90.0 + (row + 0.5) * height),
+            (-180.0 + (col + 0.5) * width + 180.0) % 360.0 - 180.0,
+            precision,
+        )
+        for row in rows
+        for col in cols
+    }
+    return sorted(cells)
+
+
+def farm_location(farmer) -> dict:
+    """The location columns a farmer's products carry; all None until the farm is placed."""
+    if farmer.latitude is None or farmer.longitude is None:
+        return {"latitude": None, "longitude": None, "geohash": None}
+    return {
+        "latitude": farmer.latitude,
+        "longitude": farmer.longitude,
+        "geohash": geohash_encode(farmer.latitude, farmer.longitude),
+    }
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# ============================================================
+# REQUEST PARSING
+# ============================================================
+def parse_near(near: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Parses a `lat,lng` query value, raising 400 if it isn't a valid coordinate pair."""
+    if not near:
+        return None
+    try:
+        lat_text, lng_text = near.split(",")
+        latitude, longitude = float(lat_text), float(lng_text)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="near must be 'latitude,longitude'")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise HTTPException(status_code=400, detail="near is out of range")
+    return latitude, longitude
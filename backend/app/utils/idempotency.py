@@ -0,0 +1,100 @@
+# app/utils/idempotency.py
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import IdempotencyKey
+
+# ============================================================
+# IDEMPOTENCY KEYS
+# ============================================================
+# A retried request carrying the same Idempotency-Key gets the first response
+# replayed instead of running again. Keys are scoped to the user and kept for
+# IDEMPOTENCY_TTL. The key row is written in the same transaction as the work
+# it guards, so a concurrent duplicate blocks on the unique index (row/table
+# lock) until the first request commits, then replays its response; if the
+# first request fails, its key rolls back with it and the duplicate runs.
+IDEMPOTENCY_TTL = timedelta(hours=24)
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(payload: BaseModel) -> str:
+    """Hash of the request body, so a key reused for a different request is refused."""
+    return hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def claim_key(db: Session, user_id: int, key: str, request_hash: str) -> Tuple[IdempotencyKey, bool]:
+    """
+    Claims `key` inside the caller's transaction. Returns (record, True) when the
+    caller should run the request and complete_key() the record before committing,
+    or (record, False) with an earlier response to replay().
+    """
+    if not key or len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_MAX_KEY_LENGTH} characters"
+        )
+
+    # Twice at most: a duplicate committed between our read and our insert is
+    # visible on the second pass
+    for _ in range(2):
+        existing = _find_key(db, user_id, key)
+        if existing is not None:
+            if existing.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            return existing, False
+
+        # The user's expired keys go first, which also frees this key if it lapsed
+        now = datetime.utcnow()
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.expires_at <= now
+        ).delete(synchronize_session=False)
+
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            expires_at=now + IDEMPOTENCY_TTL,
+        )
+        db.add(record)
+        try:
+            # Blocks while a concurrent request holding the same key is uncommitted
+            db.flush()
+            return record, True
+        except IntegrityError:
+            db.rollback()
+
+    raise HTTPException(status_code=409, detail="Idempotency-Key is in use, please retry")
+
+
+def _find_key(db: Session, user_id: int, key: str) -> Optional[IdempotencyKey]:
+    return db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at > datetime.utcnow()
+    ).first()
+
+
+def complete_key(record: IdempotencyKey, status_code: int, body) -> None:
+    """Stores the response on the claimed record; commits with the caller's transaction."""
+    record.status_code = status_code
+    record.response_body = body
+
+
+def replay(record: IdempotencyKey) -> JSONResponse:
+    return JSONResponse(
+        status_code=record.status_code,
+        content=record.response_body,
+        headers={REPLAY_HEADER: "true"},
+    )
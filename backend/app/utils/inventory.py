@@ -0,0 +1,155 @@
+# app/utils/inventory.py
+import asyncio
+import os
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import case, false, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import InventoryMovement, InventorySnapshot, Product
+
+load_dotenv()
+
+# ============================================================
+# INVENTORY LEDGER
+# ============================================================
+# Every change to Product.quantity_available is also appended to
+# inventory_movements in the same transaction, giving each product an auditable
+# stock history. quantity_available stays the guarded running balance that
+# checkout decrements (see app.utils.stock); the ledger's balance is the
+# product's snapshot plus the movements after it, and the two should agree.
+SALE = "sale"
+CANCEL = "cancel"
+RESTOCK = "restock"
+ADJUSTMENT = "adjustment"
+
+INVENTORY_SNAPSHOT_INTERVAL = float(os.getenv("INVENTORY_SNAPSHOT_INTERVAL", 300))
+INVENTORY_SNAPSHOT_BATCH = 5000  # movements folded into snapshots per transaction
+
+
+def record_movements(db: Session, kind: str, deltas: Dict[int, int],
+                     order_id: Optional[int] = None) -> None:
+    """Appends one movement per product from {product_id: signed change}, in one INSERT."""
+    rows = [
+        {"product_id": product_id, "kind": kind, "delta": int(delta), "order_id": order_id}
+        for product_id, delta in deltas.items()
+        if delta
+    ]
+    if rows:
+        db.execute(insert(InventoryMovement), rows)
+
+
+def ledger_stock(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Each product's stock according to the ledger: its snapshot plus the movements
+    not yet folded into it, summed along ix_inventory_movements_unfolded_product_id.
+    """
+    since = select(func.coalesce(func.sum(InventoryMovement.delta), 0)).where(
+        InventoryMovement.product_id == Product.id,
+        InventoryMovement.folded == false()
+    ).scalar_subquery()
+    return {
+        row.id: row.quantity
+        for row in db.query(Product.id, (func.coalesce(InventorySnapshot.quantity, 0) + since).label("quantity"))
+        .outerjoin(InventorySnapshot, InventorySnapshot.product_id == Product.id)
+        .filter(Product.id.in_(list(product_ids)))
+    }
+
+
+# ============================================================
+# SNAPSHOTS
+# ============================================================
+def compact_inventory(session_factory: Callable[[], Session], batch_size: int = INVENTORY_SNAPSHOT_BATCH) -> int:
+    """
+    Folds movements into the per-product snapshots so ledger_stock only sums a
+    short tail. Unfolded movements are taken in id order, batch_size at a time;
+    each batch is marked folded and its per-product totals added to the
+    snapshots with one UPDATE (amounts from a CASE) and one INSERT for first
+    snapshots, all in one commit. Movements are kept as history. Returns the
+    number of movements folded.
+
+    Each movement carries its own folded flag rather than sitting under an id
+    watermark, since ids aren't handed out in commit order on PostgreSQL: one
+    committed after higher ids were folded is still counted by ledger_stock and
+    folded by a later pass. Marking is guarded on the flag, so an overlapping
+    run (another worker) that already folded part of the batch makes this one
+    roll back.
+    """
+    folded = 0
+    while True:
+        with session_factory() as db:
+            batch = db.execute(
+                select(InventoryMovement.id, InventoryMovement.product_id, InventoryMovement.delta)
+                .where(InventoryMovement.folded == false())
+                .order_by(InventoryMovement.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                return folded
+
+            ids = [movement.id for movement in batch]
+            marked = db.execute(
+                update(InventoryMovement)
+                .where(InventoryMovement.id.in_(ids), InventoryMovement.folded == false())
+                .values(folded=True)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if marked != len(ids):
+                db.rollback()
+                return folded
+
+            totals = defaultdict(int)
+            for movement in batch:
+                totals[movement.product_id] += movement.delta
+            upto = max(ids)
+            existing = set(db.execute(
+                select(InventorySnapshot.product_id).where(InventorySnapshot.product_id.in_(list(totals)))
+            ).scalars())
+
+            if existing:
+                db.execute(
+                    update(InventorySnapshot)
+                    .where(InventorySnapshot.product_id.in_(list(existing)))
+                    .values(
+                        quantity=InventorySnapshot.quantity + case(
+                            {product_id: totals[product_id] for product_id in existing},
+                            value=InventorySnapshot.product_id
+                        ),
+                        last_movement_id=case(
+                            (InventorySnapshot.last_movement_id < upto, upto),
+                            else_=InventorySnapshot.last_movement_id
+                        ),
+                        taken_at=func.now(),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            new = [product_id for product_id in totals if product_id not in existing]
+            try:
+                if new:
+                    db.execute(insert(InventorySnapshot), [
+                        {"product_id": product_id, "quantity": totals[product_id], "last_movement_id": upto}
+                        for product_id in new
+                    ])
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return folded
+            folded += len(ids)
+            if len(ids) < batch_size:
+                return folded
+
+
+async def run_inventory_compactor(session_factory: Callable[[], Session]):
+    """Compacts the ledger every INVENTORY_SNAPSHOT_INTERVAL seconds for the life of the app."""
+    while True:
+        await asyncio.sleep(INVENTORY_SNAPSHOT_INTERVAL)
+        try:
+            folded = await run_in_threadpool(compact_inventory, session_factory)
+            if folded:
+                print(f"✅ Folded {folded} inventory movements into snapshots")
+        except Exception as e:
+            print(f"❌ Error compacting inventory ledger: {str(e)}")
@@ -0,0 +1,92 @@
+# app/utils/order_archive.py
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import ArchivedFarmerOrder, ArchivedOrder, ArchivedOrderItem, FarmerOrder, Order, OrderItem
+from app.utils.pagination import timestamp_param
+
+load_dotenv()
+
+# ============================================================
+# ORDER ARCHIVE CONFIG
+# ============================================================
+# Delivered and cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS move, with
+# their items and farmer_orders rows, into the archived_* tables, keeping their
+# ids. The hot tables (and their indexes) then only hold recent and open orders;
+# the order read endpoints fall through to the archive for older pages. Keep
+# ORDER_ARCHIVE_AFTER_DAYS above KPI_WINDOW_DAYS: the KPI refresher only scans
+# the hot table.
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", 180))
+ORDER_ARCHIVE_INTERVAL = float(os.getenv("ORDER_ARCHIVE_INTERVAL", 3600))
+ORDER_ARCHIVE_BATCH = 1000  # orders moved per transaction
+ARCHIVABLE_STATUSES = ("delivered", "cancelled")
+
+# (hot table, archive table, the column holding the order id)
+_ARCHIVED_TABLES = (
+    (Order, ArchivedOrder, "id"),
+    (OrderItem, ArchivedOrderItem, "order_id"),
+    (FarmerOrder, ArchivedFarmerOrder, "order_id"),
+)
+
+
+# ============================================================
+# ARCHIVER
+# ============================================================
+def archive_orders(session_factory: Callable[[], Session], older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS,
+                   batch_size: int = ORDER_ARCHIVE_BATCH, now: Optional[datetime] = None) -> int:
+    """
+    Moves finished orders placed before the cutoff into the archive, oldest first,
+    batch_size orders per transaction: one INSERT ... SELECT and one DELETE per
+    table. Returns the number of orders moved.
+
+    An overlapping run (another worker) that already moved a batch makes this
+    one's inserts collide on the archive primary keys, and it rolls back.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    moved = 0
+    while True:
+        with session_factory() as db:
+            order_ids = db.execute(
+                select(Order.id)
+                .where(Order.created_at < timestamp_param(db, cutoff), Order.status.in_(ARCHIVABLE_STATUSES))
+                .order_by(Order.created_at, Order.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not order_ids:
+                return moved
+
+            try:
+                for hot, cold, order_column in _ARCHIVED_TABLES:
+                    columns = [column.name for column in hot.__table__.columns]
+                    db.execute(insert(cold).from_select(
+                        columns,
+                        select(*[hot.__table__.c[name] for name in columns])
+                        .where(hot.__table__.c[order_column].in_(order_ids))
+                    ))
+                for hot, _, order_column in reversed(_ARCHIVED_TABLES):
+                    db.execute(delete(hot).where(hot.__table__.c[order_column].in_(order_ids)))
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return moved
+            moved += len(order_ids)
+
+
+async def run_order_archiver(session_factory: Callable[[], Session]):
+    """Archives finished orders every ORDER_ARCHIVE_INTERVAL seconds for the life of the app."""
+    while True:
+        await asyncio.sleep(ORDER_ARCHIVE_INTERVAL)
+        try:
+            moved = await run_in_threadpool(archive_orders, session_factory)
+            if moved:
+                print(f"✅ Archived {moved} orders")
+        except Exception as e:
+            print(f"❌ Error archiving orders: {str(e)}")
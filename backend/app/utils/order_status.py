@@ -0,0 +1,103 @@
+# app/utils/order_status.py
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, exists, update
+from sqlalchemy.orm import Session
+
+from app.models import FarmerOrder, Order
+
+# ============================================================
+# ORDER STATE MACHINE
+# ============================================================
+# The statuses an order can move to from each status. Setting an order to the
+# status it already has is a no-op, not a transition.
+ORDER_TRANSITIONS: Dict[str, frozenset] = {
+    "pending": frozenset({"confirmed", "cancelled"}),
+    "confirmed": frozenset({"shipped", "cancelled"}),
+    "shipped": frozenset({"delivered"}),
+    "delivered": frozenset(),
+    "cancelled": frozenset(),
+}
+ORDER_STATUSES = tuple(ORDER_TRANSITIONS)
+
+
+def check_status(new_status: str) -> None:
+    if new_status not in ORDER_TRANSITIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid status. Must be one of: {', '.join(ORDER_STATUSES)}"
+        )
+
+
+def can_transition(current: str, new_status: str) -> bool:
+    return current == new_status or new_status in ORDER_TRANSITIONS.get(current, ())
+
+
+def check_transition(current: str, new_status: str) -> None:
+    """Raises 400 unless an order in `current` may be set to `new_status`."""
+    check_status(new_status)
+    if not can_transition(current, new_status):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot change order from {current} to {new_status}"
+        )
+
+
+# ============================================================
+# BULK TRANSITIONS
+# ============================================================
+def bulk_transition(db: Session, order_ids: Iterable[int], new_status: str,
+                    farmer_id: Optional[int] = None) -> List[dict]:
+    """
+    Moves the given orders to `new_status` in the caller's transaction and returns
+    one result per distinct order id, in request order. With `farmer_id`, only
+    orders the farmer has products on are touched.
+
+    One UPDATE ... RETURNING does the work, with the allowed source statuses and
+    the farmer_orders ownership check in its WHERE clause, so an order changed
+    concurrently is never moved along an invalid edge. Orders it skipped are
+    classified with one more query (not_found, forbidden, unchanged or
+    invalid_transition).
+    """
+    check_status(new_status)
+    order_ids = list(dict.fromkeys(order_ids))
+    sources = [status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets]
+
+    statement = update(Order).where(Order.id.in_(order_ids), Order.status.in_(sources))
+    if farmer_id is not None:
+        statement = statement.where(exists().where(
+            FarmerOrder.farmer_id == farmer_id,
+            FarmerOrder.order_id == Order.id
+        ))
+    updated = set(db.execute(
+        statement.values(status=new_status).returning(Order.id),
+        execution_options={"synchronize_session": False}
+    ).scalars())
+
+    skipped = {}
+    remaining = [order_id for order_id in order_ids if order_id not in updated]
+    if remaining:
+        query = db.query(Order.id, Order.status)
+        if farmer_id is not None:
+            query = query.add_columns(FarmerOrder.order_id.isnot(None).label("owned")).outerjoin(
+                FarmerOrder, and_(FarmerOrder.order_id == Order.id, FarmerOrder.farmer_id == farmer_id)
+            )
+        skipped = {row.id: row for row in query.filter(Order.id.in_(remaining))}
+
+    results = []
+    for order_id in order_ids:
+        row = skipped.get(order_id)
+        if order_id in updated:
+            results.append({"order_id": order_id, "result": "updated", "status": new_status})
+        elif row is None:
+            results.append({"order_id": order_id, "result": "not_found", "detail": "Order not found"})
+        elif farmer_id is not None and not row.owned:
+            results.append({"order_id": order_id, "result": "forbidden",
+                            "detail": "Not authorized to update this order"})
+        elif row.status == new_status:
+            results.append({"order_id": order_id, "result": "unchanged", "status": row.status})
+        else:
+            results.append({"order_id": order_id, "result": "invalid_transition", "status": row.status,
+                            "detail": f"Cannot change order from {row.status} to {new_status}"})
+    return results
@@ -0,0 +1,198 @@
+# app/utils/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Query, Session
+
+from app.utils.conditional import as_utc
+
+# ============================================================
+# PAGE SIZE LIMITS
+# ============================================================
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+# ============================================================
+# CURSOR ENCODING
+# ============================================================
+def _pack(values: list) -> str:
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _unpack(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encodes a (created_at, id) position as an opaque URL-safe token."""
+    return _pack([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodes a token produced by encode_cursor, raising 400 if it was tampered with."""
+    try:
+        created_at, row_id = _unpack(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_score_cursor(score: float, row_id: int) -> str:
+    """Encodes a (score, id) position for relevance-ordered listings."""
+    return _pack([score, row_id])
+
+
+def decode_score_cursor(cursor: str) -> Tuple[float, int]:
+    """Decodes a token produced by encode_score_cursor, raising 400 if it was tampered with."""
+    try:
+        score, row_id = _unpack(cursor)
+        return float(score), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_id_cursor(row_id: int) -> str:
+    """Encodes an id position for listings ordered by id alone."""
+    return _pack([row_id])
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Decodes a token produced by encode_id_cursor, raising 400 if it was tampered with."""
+    try:
+        (row_id,) = _unpack(cursor)
+        return int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# ============================================================
+# KEYSET QUERIES
+# ============================================================
+def timestamp_param(db: Session, value: datetime):
+    """
+    Binds a timestamp so it compares equal to the stored column value.
+    SQLite keeps DateTime as text and server-side defaults are written without
+    microseconds, so the bound value has to use the same layout there.
+    """
+    if db.bind is not None and db.bind.dialect.name == "sqlite":
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S"
+        return literal(value.strftime(fmt))
+    return value
+
+
+def keyset_page(db: Session, query: Query, created_col, id_col,
+                cursor: Optional[str], limit: int):
+    """
+    Returns (rows, next_cursor) for the page after `cursor`, newest first.
+    Rows are ordered by (created_at DESC, id DESC) and the cursor seeks past
+    the last row seen, so every page costs one index range scan regardless
+    of how deep into the listing it is.
+    """
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        bound = timestamp_param(db, created_at)
+        # Row-value comparison lets both SQLite and PostgreSQL seek the
+        # (created_at, id) index; the equivalent OR expression falls back to a scan.
+        query = query.filter(tuple_(created_col, id_col) < tuple_(bound, last_id))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def id_page(query: Query, id_col, cursor: Optional[str], limit: int):
+    """
+    Returns (rows, next_cursor) for a query ordered by `id_col` descending, i.e.
+    newest first for autoincrement ids. For listings whose index ends in the id,
+    where a (created_at, id) keyset would need another index.
+    """
+    if cursor:
+        query = query.filter(id_col < decode_id_cursor(cursor))
+
+    rows = query.order_by(id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_id_cursor(getattr(rows[-1], id_col.key))
+    return rows, next_cursor
+
+
+def split_keyset_page(db: Session, parts: List[Tuple[Query, object, object]],
+                      cursor: Optional[str], limit: int):
+    """
+    keyset_page over one listing stored in several tables (orders and their
+    archive). `parts` is [(query, created_col, id_col)], hot table first; the
+    cursor is the same as keyset_page's. Each later table is only asked for rows
+    newer than the oldest row the page could still keep, so while the page is
+    served from the hot table the archive costs one empty index seek.
+    """
+    rows = []
+    for query, created_col, id_col in parts:
+        def position(row):
+            return getattr(row, created_col.key), getattr(row, id_col.key)
+
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = query.filter(tuple_(created_col, id_col) < tuple_(timestamp_param(db, created_at), last_id))
+        if len(rows) > limit:
+            created_at, last_id = position(rows[-1])
+            query = query.filter(tuple_(created_col, id_col) > tuple_(timestamp_param(db, created_at), last_id))
+        rows += query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+        rows = sorted(rows, key=lambda row: (as_utc(position(row)[0]), position(row)[1]), reverse=True)[:limit + 1]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*position(rows[-1]))
+    return rows, next_cursor
+
+
+def split_id_page(parts: List[Tuple[Query, object]], cursor: Optional[str], limit: int):
+    """id_page over one listing stored in several tables; `parts` is [(query, id_col)], hot table first."""
+    rows = []
+    for query, id_col in parts:
+        if cursor:
+            query = query.filter(id_col < decode_id_cursor(cursor))
+        if len(rows) > limit:
+            query = query.filter(id_col > getattr(rows[-1], id_col.key))
+        rows += query.order_by(id_col.desc()).limit(limit + 1).all()
+        rows = sorted(rows, key=lambda row: getattr(row, id_col.key), reverse=True)[:limit + 1]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_id_cursor(getattr(rows[-1], id_col.key))
+    return rows, next_cursor
+
+
+def score_page(query: Query, score_col, id_col, cursor: Optional[str], limit: int):
+    """
+    Returns (rows, next_cursor) for a query ordered by ascending score, then id.
+    `query` must select the ORM entity followed by `score_col`; the rows
+    returned are the bare entities.
+    """
+    if cursor:
+        last_score, last_id = decode_score_cursor(cursor)
+        query = query.filter(tuple_(score_col, id_col) > tuple_(last_score, last_id))
+
+    rows = query.order_by(score_col, id_col).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_entity, last_score = rows[-1]
+        next_cursor = encode_score_cursor(last_score, getattr(last_entity, id_col.key))
+    return [entity for entity, _ in rows], next_cursor
@@ -0,0 +1,166 @@
+# app/utils/platform_kpis.py
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, time as day_start, timedelta
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import FarmerDailySales, Order, PlatformKpiSnapshot, User
+from app.utils.conditional import as_utc
+from app.utils.pagination import timestamp_param
+
+load_dotenv()
+
+# ============================================================
+# PLATFORM KPI CONFIG
+# ============================================================
+# The admin dashboard reads KPIs from memory. A background refresher writes a
+# new platform_kpi_snapshots row every KPI_REFRESH_INTERVAL seconds from range
+# scans over the last KPI_WINDOW_DAYS days (orders and users by created_at,
+# farmers from the sales rollups), never whole tables; workers without a
+# refresher pick the row up once their copy is older than the interval.
+KPI_REFRESH_INTERVAL = float(os.getenv("KPI_REFRESH_INTERVAL", 60))
+KPI_WINDOW_DAYS = int(os.getenv("KPI_WINDOW_DAYS", 30))
+
+_latest = None  # (snapshot dict, time.monotonic() when loaded)
+_latest_lock = threading.Lock()
+
+
+# ============================================================
+# SNAPSHOTS
+# ============================================================
+def take_kpi_snapshot(db: Session, now: Optional[datetime] = None) -> PlatformKpiSnapshot:
+    """Computes the KPIs and stores them as the only snapshot row, in the caller's transaction."""
+    now = now or datetime.utcnow()
+    days = [(now - timedelta(days=offset)).date() for offset in range(KPI_WINDOW_DAYS - 1, -1, -1)]
+    since = timestamp_param(db, datetime.combine(days[0], day_start.min))
+
+    order_day = func.date(Order.created_at)
+    orders = {
+        str(day)[:10]: (count, gmv or 0.0)
+        for day, count, gmv in db.query(
+            order_day,
+            func.count(Order.id),
+            func.sum(case((func.coalesce(Order.status, "pending") != "cancelled", Order.total_amount), else_=0.0)),
+        ).filter(Order.created_at >= since).group_by(order_day)
+    }
+    signup_day = func.date(User.created_at)
+    signups = {
+        str(day)[:10]: count
+        for day, count in db.query(signup_day, func.count(User.id))
+        .filter(User.created_at >= since)
+        .group_by(signup_day)
+    }
+    active_farmers = db.query(func.count(FarmerDailySales.farmer_id.distinct())).filter(
+        FarmerDailySales.day >= days[0],
+        FarmerDailySales.order_count > 0
+    ).scalar()
+
+    # The user total is recounted on the first snapshot of each day (which also
+    # corrects for deleted users) and otherwise carried forward with the users
+    # added since the previous snapshot, a primary-key range
+    previous = db.query(PlatformKpiSnapshot).order_by(PlatformKpiSnapshot.id.desc()).first()
+    if previous is not None and as_utc(previous.as_of).date() == now.date():
+        added, last_user_id = db.query(func.count(User.id), func.max(User.id)).filter(
+            User.id > previous.last_user_id
+        ).one()
+        total_users = previous.total_users + added
+        last_user_id = last_user_id or previous.last_user_id
+    else:
+        total_users, last_user_id = db.query(func.count(User.id), func.max(User.id)).one()
+        last_user_id = last_user_id or 0
+
+    daily = [
+        {
+            "day": day.isoformat(),
+            "orders": orders.get(day.isoformat(), (0, 0.0))[0],
+            "gmv": orders.get(day.isoformat(), (0, 0.0))[1],
+            "signups": signups.get(day.isoformat(), 0),
+        }
+        for day in days
+    ]
+    snapshot = PlatformKpiSnapshot(
+        as_of=now,
+        window_days=KPI_WINDOW_DAYS,
+        gmv=sum(entry["gmv"] for entry in daily),
+        order_count=sum(entry["orders"] for entry in daily),
+        signups=sum(entry["signups"] for entry in daily),
+        active_farmers=active_farmers,
+        total_users=total_users,
+        last_user_id=last_user_id,
+        daily=daily,
+    )
+    db.add(snapshot)
+    db.flush()
+    db.query(PlatformKpiSnapshot).filter(PlatformKpiSnapshot.id < snapshot.id).delete(synchronize_session=False)
+    return snapshot
+
+
+def _as_dict(snapshot: PlatformKpiSnapshot) -> dict:
+    return {
+        "as_of": as_utc(snapshot.as_of),
+        "window_days": snapshot.window_days,
+        "gmv": snapshot.gmv,
+        "orders": snapshot.order_count,
+        "new_signups": snapshot.signups,
+        "active_farmers": snapshot.active_farmers,
+        "total_users": snapshot.total_users,
+        "daily": snapshot.daily,
+    }
+
+
+def _remember(kpis: dict) -> dict:
+    global _latest
+    with _latest_lock:
+        _latest = (kpis, time.monotonic())
+    return kpis
+
+
+def platform_kpis(db: Session) -> dict:
+    """
+    The latest KPIs: from memory while younger than KPI_REFRESH_INTERVAL, else
+    from the snapshot row (taking the first one if there is none yet).
+    """
+    with _latest_lock:
+        latest = _latest
+    if latest is not None and time.monotonic() - latest[1] < KPI_REFRESH_INTERVAL:
+        return latest[0]
+
+    snapshot = db.query(PlatformKpiSnapshot).order_by(PlatformKpiSnapshot.id.desc()).first()
+    if snapshot is not None:
+        return _remember(_as_dict(snapshot))
+    kpis = _as_dict(take_kpi_snapshot(db))
+    db.commit()
+    return _remember(kpis)
+
+
+def forget_platform_kpis() -> None:
+    global _latest
+    with _latest_lock:
+        _latest = None
+
+
+# ============================================================
+# REFRESHER
+# ============================================================
+def refresh_platform_kpis(session_factory: Callable[[], Session]) -> dict:
+    with session_factory() as db:
+        kpis = _as_dict(take_kpi_snapshot(db))
+        db.commit()
+        return _remember(kpis)
+
+
+async def run_kpi_refresher(session_factory: Callable[[], Session]):
+    """Refreshes the KPIs every KPI_REFRESH_INTERVAL seconds for the life of the app."""
+    while True:
+        try:
+            await run_in_threadpool(refresh_platform_kpis, session_factory)
+        except Exception as e:
+            print(f"❌ Error refreshing platform KPIs: {str(e)}")
+        await asyncio.sleep(KPI_REFRESH_INTERVAL)
@@ -0,0 +1,171 @@
+# app/utils/product_import.py
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import Product, ProductImportJob, User
+from app.schemas import ProductCreate
+from app.utils.cache import invalidate_products
+from app.utils.facets import record_products_created
+from app.utils.geo import farm_location
+from app.utils.inventory import RESTOCK, record_movements
+
+# ============================================================
+# IMPORT LIMITS
+# ============================================================
+IMPORT_MAX_ROWS = 50_000
+IMPORT_SYNC_ROWS = 500  # larger uploads run as a background job
+IMPORT_BATCH_SIZE = 1000  # rows per executemany
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+
+# ============================================================
+# PARSING
+# ============================================================
+def parse_upload(filename: str, content_type: str, content: bytes,
+                 what: str = "products", max_rows: int = IMPORT_MAX_ROWS) -> List:
+    """
+    Reads a CSV file (header row of field names, e.g. ProductCreate's) or a JSON
+    array of objects. `what` names the rows in error messages.
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+
+    name = (filename or "").lower()
+    if name.endswith(".json") or "json" in (content_type or ""):
+        try:
+            rows = json.loads(text)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail=f"JSON upload must be an array of {what}")
+    elif name.endswith(".csv") or "csv" in (content_type or ""):
+        rows = [
+            {key.strip(): (value.strip() if isinstance(value, str) else value)
+             for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    else:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .json file")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail=f"File contains no {what}")
+    if len(rows) > max_rows:
+        raise HTTPException(status_code=400, detail=f"At most {max_rows} {what} per upload")
+    return rows
+
+
+def validate_rows(rows: List) -> Tuple[List[Tuple[int, ProductCreate]], List[dict]]:
+    """
+    Validates every row against ProductCreate in one pass.
+    Returns (valid, errors) where valid is [(row_number, product)] and errors is
+    [{"row": n, "errors": [...]}]; rows are numbered from 1, excluding any CSV header.
+    """
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": ["Each product must be an object"]})
+            continue
+        try:
+            valid.append((number, ProductCreate.model_validate(row)))
+        except ValidationError as e:
+            errors.append({
+                "row": number,
+                "errors": [
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                    for error in e.errors()
+                ],
+            })
+    return valid, errors
+
+
+# ============================================================
+# IMPORT
+# ============================================================
+def insert_products(db: Session, farmer: User, products: List[ProductCreate]) -> List[dict]:
+    """
+    Inserts products in IMPORT_BATCH_SIZE executemany batches inside the caller's
+    transaction, logs their opening stock in the inventory ledger and applies them
+    to the facet tables. Returns listing snapshots.
+    """
+    location = farm_location(farmer)
+    values = [
+        {
+            "name": product.name,
+            "description": product.description,
+            "price": product.price,
+            "category": product.category,
+            "unit": product.unit,
+            "quantity_available": product.quantity_available,
+            "farmer_id": farmer.id,
+            "is_available": True,
+            "min_order_quantity": 1,
+            **location,
+        }
+        for product in products
+    ]
+    for start in range(0, len(values), IMPORT_BATCH_SIZE):
+        inserted = db.execute(
+            insert(Product).returning(Product.id, Product.quantity_available),
+            values[start:start + IMPORT_BATCH_SIZE]
+        )
+        record_movements(db, RESTOCK, dict(inserted.all()))
+
+    snapshots = [
+        {
+            "id": None,
+            "category": value["category"],
+            "price": value["price"],
+            "farmer_id": farmer.id,
+            "is_available": True,
+        }
+        for value in values
+    ]
+    record_products_created(db, snapshots)
+    return snapshots
+
+
+def run_import_job(session_factory: Callable[[], Session], job_id: int, rows: List):
+    """
+    Validates and imports an upload for an existing ProductImportJob. All valid
+    rows go in one transaction together with the job's final status, so a
+    failed import leaves no partial catalog behind. Runs inline for small
+    uploads and as a background task for large ones.
+    """
+    with session_factory() as db:
+        job = db.get(ProductImportJob, job_id)
+        job.status = "importing"
+        db.commit()
+
+        valid, errors = validate_rows(rows)
+        try:
+            snapshots = insert_products(db, db.get(User, job.farmer_id), [product for _, product in valid])
+            job.status = "completed"
+            job.created_count = len(snapshots)
+            job.error_count = len(errors)
+            job.errors = errors[:IMPORT_MAX_REPORTED_ERRORS]
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            invalidate_products([(None, snapshot) for snapshot in snapshots])
+            print(f"✅ Import job {job_id}: {len(snapshots)} products created, {len(errors)} rows rejected")
+
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Import job {job_id} failed: {str(e)}")
+            job = db.get(ProductImportJob, job_id)
+            job.status = "failed"
+            job.error_count = len(errors)
+            job.errors = errors[:IMPORT_MAX_REPORTED_ERRORS] + [
+                {"row": None, "errors": ["Import failed; no products were created"]}
+            ]
+            job.finished_at = datetime.utcnow()
+            db.commit()
@@ -0,0 +1,41 @@
+# app/utils/query_counter.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Requests issuing more statements than this are logged as likely N+1 regressions
+QUERY_COUNT_WARNING = 20
+
+
+class QueryCounter:
+    """Counts SQL statements executed while it is active."""
+
+    def __init__(self):
+        self.count = 0
+
+
+_active_counter: ContextVar[Optional[QueryCounter]] = ContextVar("active_query_counter", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _active_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts every statement run on any engine inside the block, including work
+    done in threadpool dependencies, which inherit the request's context.
+    """
+    counter = QueryCounter()
+    token = _active_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _active_counter.reset(token)
@@ -0,0 +1,136 @@
+# app/utils/reservations.py
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import Reservation, ReservationItem
+from app.utils.cache import invalidate_products
+from app.utils.stock import hold_stock, release_holds
+
+load_dotenv()
+
+# ============================================================
+# RESERVATION CONFIG
+# ============================================================
+RESERVATION_TTL_SECONDS = int(os.getenv("RESERVATION_TTL_SECONDS", 900))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", 60))
+RESERVATION_SWEEP_BATCH = 500  # reservations released per statement batch
+
+
+# ============================================================
+# HOLDS
+# ============================================================
+def create_reservation(db: Session, buyer_id: int,
+                       quantities: Dict[int, int]) -> Tuple[Reservation, List[Tuple[dict, dict]]]:
+    """
+    Holds {product_id: quantity} for the buyer for RESERVATION_TTL_SECONDS, in the
+    caller's transaction. Returns the reservation and the stock changes, for the
+    caller to invalidate cached listings with once it commits.
+    """
+    stock_changes = list(hold_stock(db, quantities).values())
+    reservation = Reservation(
+        buyer_id=buyer_id,
+        expires_at=datetime.utcnow() + timedelta(seconds=RESERVATION_TTL_SECONDS),
+        items=[
+            ReservationItem(product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+        ],
+    )
+    db.add(reservation)
+    db.flush()
+    return reservation, stock_changes
+
+
+def claim_reservation(db: Session, reservation_id: int, buyer_id: int) -> Dict[int, int]:
+    """
+    Removes an unexpired reservation of the buyer's and returns its held
+    {product_id: quantity}, for the caller to convert with take_stock(reserved=True)
+    in the same transaction. Items are deleted with RETURNING, so the reservation
+    can be claimed (or swept) only once even under concurrency.
+    """
+    reservation = db.query(Reservation.id, (Reservation.expires_at > datetime.utcnow()).label("active")).filter(
+        Reservation.id == reservation_id,
+        Reservation.buyer_id == buyer_id
+    ).first()
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    if not reservation.active:
+        raise HTTPException(status_code=410, detail="Reservation has expired")
+
+    held = _delete_items(db, [reservation_id])
+    db.query(Reservation).filter(Reservation.id == reservation_id).delete(synchronize_session=False)
+    if not held:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    return held
+
+
+def release_reservation(db: Session, reservation_id: int, buyer_id: int) -> List[Tuple[dict, dict]]:
+    """
+    Cancels a buyer's reservation and gives its units back, in the caller's
+    transaction. Returns the stock changes, as create_reservation does.
+    """
+    return list(release_holds(db, claim_reservation(db, reservation_id, buyer_id)).values())
+
+
+def _delete_items(db: Session, reservation_ids) -> Dict[int, int]:
+    """Deletes the reservations' items and totals what they held per product."""
+    held = Counter()
+    for product_id, quantity in db.execute(
+        delete(ReservationItem)
+        .where(ReservationItem.reservation_id.in_(reservation_ids))
+        .returning(ReservationItem.product_id, ReservationItem.quantity)
+    ):
+        held[product_id] += quantity
+    return dict(held)
+
+
+# ============================================================
+# SWEEPER
+# ============================================================
+def sweep_expired_reservations(session_factory: Callable[[], Session],
+                               batch_size: int = RESERVATION_SWEEP_BATCH) -> int:
+    """
+    Releases expired reservations in batches: per batch one DELETE ... RETURNING
+    of their items, one UPDATE giving the held units back per product, and one
+    DELETE of the reservations, committed together, after which cached listings
+    of the products are dropped. Returns reservations released.
+    """
+    released = 0
+    while True:
+        with session_factory() as db:
+            expired = db.execute(
+                select(Reservation.id)
+                .where(Reservation.expires_at <= datetime.utcnow())
+                .order_by(Reservation.expires_at)
+                .limit(batch_size)
+            ).scalars().all()
+            if not expired:
+                return released
+
+            stock_changes = list(release_holds(db, _delete_items(db, expired)).values())
+            db.execute(delete(Reservation).where(Reservation.id.in_(expired)))
+            db.commit()
+            invalidate_products(stock_changes)
+            released += len(expired)
+            if len(expired) < batch_size:
+                return released
+
+
+async def run_reservation_sweeper(session_factory: Callable[[], Session]):
+    """Sweeps every RESERVATION_SWEEP_INTERVAL seconds for the life of the app."""
+    while True:
+        await asyncio.sleep(RESERVATION_SWEEP_INTERVAL)
+        try:
+            released = await run_in_threadpool(sweep_expired_reservations, session_factory)
+            if released:
+                print(f"✅ Released {released} expired reservations")
+        except Exception as e:
+            print(f"❌ Error sweeping reservations: {str(e)}")
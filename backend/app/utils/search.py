@@ -0,0 +1,53 @@
+# app/utils/search.py
+import re
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models import Product, PRODUCT_SEARCH_TSVECTOR
+
+# Relative weight of name, description and category matches in SQLite's bm25()
+SQLITE_BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+products_fts = table("products_fts", column("rowid"))
+
+
+def search_terms(q: str):
+    """Splits a free-text query into plain word tokens, dropping search operators."""
+    return re.findall(r"\w+", q.lower())
+
+
+def ranked_product_ids(db: Session, q: str):
+    """
+    Returns a subquery of (product_id, score) for products matching `q`,
+    or None if the query has no searchable words.
+    Lower scores are better on every backend so callers can sort ascending.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    if db.bind.dialect.name == "sqlite":
+        # Quote each term so user input can't inject FTS5 syntax; the trailing *
+        # gives prefix matching for as-you-type search.
+        match = " ".join(f'"{term}"*' for term in terms)
+        weights = ", ".join(str(w) for w in SQLITE_BM25_WEIGHTS)
+        return (
+            select(
+                products_fts.c.rowid.label("product_id"),
+                literal_column(f"bm25(products_fts, {weights})").label("score"),
+            )
+            .where(text("products_fts MATCH :match").bindparams(match=match))
+            .subquery("ranked")
+        )
+
+    tsquery = func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+    tsvector = literal_column(PRODUCT_SEARCH_TSVECTOR)
+    return (
+        select(
+            Product.id.label("product_id"),
+            (-func.ts_rank(tsvector, tsquery)).label("score"),
+        )
+        .where(tsvector.op("@@")(tsquery))
+        .subquery("ranked")
+    )
@@ -0,0 +1,266 @@
+# app/utils/stock.py
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, false, true, update
+from sqlalchemy.orm import Session
+
+from app.models import Product
+from app.utils.stock_shards import add_to_shards, sell_out, set_sharded_stock, sharded_products, take_from_shards
+
+# Columns a stock change hands back: enough to price an order line and to
+# build the before/after listing snapshots without reloading the product.
+STOCK_RETURNING = (
+    Product.id, Product.name, Product.price, Product.category,
+    Product.farmer_id, Product.quantity_available, Product.quantity_reserved, Product.is_available,
+)
+
+
+def _snapshot(row, is_available: bool) -> dict:
+    return {
+        "id": row.id,
+        "category": row.category,
+        "price": row.price,
+        "farmer_id": row.farmer_id,
+        "is_available": is_available,
+    }
+
+
+def take_stock(db: Session, quantities: Dict[int, float],
+               reserved: bool = False) -> Dict[int, Tuple[object, dict, dict]]:
+    """
+    Atomically takes stock for every line of an order, given {product_id: quantity}.
+    All products are read with one IN query (locked FOR UPDATE where supported)
+    and validated in memory, then decremented by a single conditional UPDATE
+    whose per-product amounts come from a CASE, so concurrent checkouts can't
+    both pass the stock check. Products that reach zero are taken off the
+    listing in the same statement. Returns {product_id: (row, before, after)}
+    where row carries STOCK_RETURNING; raises 404/400 when a product is gone or
+    short, leaving the caller to roll back.
+
+    Without `reserved` only unreserved stock can be taken. With it the units
+    come out of the caller's own holds (see hold_stock), which the caller has
+    already removed from its reservation.
+
+    Unreserved units of products in high-contention mode come out of their
+    stock shards instead, leaving the products row unlocked and unwritten
+    unless the sale sells the product out.
+    """
+    taken = {}
+    if not reserved:
+        shards = sharded_products(db, quantities)
+        if shards:
+            taken = _take_sharded(db, {product_id: quantities[product_id] for product_id in shards}, shards)
+            quantities = {product_id: quantity for product_id, quantity in quantities.items()
+                          if product_id not in shards}
+            if not quantities:
+                return taken
+
+    needed = case(quantities, value=Product.id)
+    if reserved:
+        guard = (Product.quantity_available >= needed, Product.quantity_reserved >= needed)
+        values = {"quantity_reserved": Product.quantity_reserved - needed}
+    else:
+        guard = (Product.quantity_available - Product.quantity_reserved >= needed,)
+        values = {}
+    remaining = Product.quantity_available - needed
+    values.update(
+        quantity_available=remaining,
+        is_available=case((remaining <= 0, false()), else_=true()),
+    )
+
+    updated = _guarded_update(db, quantities, guard, values, check_reserved=not reserved)
+    taken.update({
+        product_id: (row, _snapshot(row, True), _snapshot(row, row.is_available))
+        for product_id, row in updated.items()
+    })
+    return taken
+
+
+def _take_sharded(db: Session, quantities: Dict[int, float], shards: Dict[int, int]):
+    """take_stock for sharded products: an unlocked read for prices, then one shard UPDATE per product."""
+    current = {
+        row.id: row
+        for row in db.query(*STOCK_RETURNING).filter(Product.id.in_(list(quantities)), Product.is_available == True)
+    }
+    taken = {}
+    for product_id in sorted(quantities):
+        row = current.get(product_id)
+        if row is None:
+            raise _stock_error(row, product_id, quantities[product_id])
+        took, left = take_from_shards(db, product_id, shards[product_id], quantities[product_id])
+        if not took:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Not enough stock for {row.name}. Available: {left}"
+            )
+        # Short of selling out, the products row (and so the listed quantity) is
+        # left for the rebalancer to refresh
+        listed = not (left == 0 and sell_out(db, product_id))
+        taken[product_id] = (row, _snapshot(row, True), _snapshot(row, listed))
+    return taken
+
+
+def hold_stock(db: Session, quantities: Dict[int, float]) -> Dict[int, Tuple[dict, dict]]:
+    """
+    Reserves {product_id: quantity} of unreserved stock by raising each product's
+    quantity_reserved, with the same one-read, one-UPDATE shape as take_stock.
+    Listings change only in their sellable quantity; returns {product_id: (before,
+    after)} snapshots for invalidating them. Products in high-contention mode
+    can't be held.
+    """
+    sharded = sharded_products(db, quantities)
+    if sharded:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Product {min(sharded)} is selling fast and can't be reserved, order it directly"
+        )
+    needed = case(quantities, value=Product.id)
+    held = _guarded_update(
+        db, quantities,
+        (Product.quantity_available - Product.quantity_reserved >= needed,),
+        {"quantity_reserved": Product.quantity_reserved + needed},
+        check_reserved=True,
+    )
+    return {product_id: _unchanged(row) for product_id, row in held.items()}
+
+
+def release_holds(db: Session, quantities: Dict[int, float]) -> Dict[int, Tuple[dict, dict]]:
+    """
+    Gives back held units, e.g. from cancelled or expired reservations, in one
+    UPDATE. Units of products since put in high-contention mode go into their shards.
+    Returns {product_id: (before, after)} like hold_stock, skipping products that
+    no longer exist.
+    """
+    if not quantities:
+        return {}
+    rows = db.execute(
+        update(Product)
+        .where(Product.id.in_(list(quantities)))
+        .values(quantity_reserved=Product.quantity_reserved - case(quantities, value=Product.id))
+        .returning(*STOCK_RETURNING)
+        .execution_options(synchronize_session=False)
+    ).all()
+    add_to_shards(db, quantities, sharded_products(db, quantities))
+    return {row.id: _unchanged(row) for row in rows}
+
+
+def _unchanged(row) -> Tuple[dict, dict]:
+    # A hold or release leaves every field listings filter on as it was
+    snapshot = _snapshot(row, row.is_available)
+    return snapshot, snapshot
+
+
+def _guarded_update(db: Session, quantities: Dict[int, float], guard: tuple, values: dict,
+                    check_reserved: bool) -> Dict[int, object]:
+    product_ids = sorted(quantities)
+    current = {
+        row.id: row
+        for row in db.query(*STOCK_RETURNING)
+        .filter(Product.id.in_(product_ids), Product.is_available == True)
+        .order_by(Product.id)
+        .with_for_update()
+    }
+
+    for product_id in product_ids:
+        error = _stock_error(current.get(product_id), product_id, quantities[product_id], check_reserved)
+        if error:
+            raise error
+
+    rows = db.execute(
+        update(Product)
+        .where(Product.id.in_(product_ids), Product.is_available == True, *guard)
+        .values(**values)
+        .returning(*STOCK_RETURNING)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    updated = {row.id: row for row in rows}
+    missing = [product_id for product_id in product_ids if product_id not in updated]
+    if missing:
+        # Without row locks (SQLite) another checkout can win between the read and
+        # the UPDATE; report the first line it left short.
+        latest = {
+            row.id: row
+            for row in db.query(*STOCK_RETURNING)
+            .filter(Product.id.in_(missing), Product.is_available == True)
+        }
+        product_id = missing[0]
+        raise _stock_error(latest.get(product_id), product_id, quantities[product_id], check_reserved) or HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Stock for product {product_id} changed during checkout, please retry"
+        )
+    return updated
+
+
+def _stock_error(row, product_id: int, quantity: float, check_reserved: bool = True) -> Optional[HTTPException]:
+    if row is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {product_id} not found or unavailable"
+        )
+    available = row.quantity_available - (row.quantity_reserved if check_reserved else 0)
+    if available < quantity:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Not enough stock for {row.name}. Available: {max(available, 0)}"
+        )
+    return None
+
+
+def return_stock(db: Session, quantities: Dict[int, float]) -> Dict[int, Tuple[dict, dict]]:
+    """
+    Puts units back for {product_id: quantity} (e.g. on cancellation) and relists
+    the products: one locked read (FOR UPDATE where supported) so the before
+    snapshots match what the increment applies to, then one UPDATE whose amounts
+    come from a CASE. Returns {product_id: (before, after)}, skipping products
+    that no longer exist. Sharded products also get the units back in a shard.
+    """
+    current = {
+        row.id: row
+        for row in db.query(*STOCK_RETURNING)
+        .filter(Product.id.in_(sorted(quantities)))
+        .order_by(Product.id)
+        .with_for_update()
+    }
+    if not current:
+        return {}
+
+    rows = db.execute(
+        update(Product)
+        .where(Product.id.in_(list(current)))
+        .values(
+            quantity_available=Product.quantity_available + case(quantities, value=Product.id),
+            is_available=True,
+        )
+        .returning(*STOCK_RETURNING)
+        .execution_options(synchronize_session=False)
+    ).all()
+    add_to_shards(db, quantities, sharded_products(db, current))
+    return {
+        row.id: (_snapshot(current[row.id], current[row.id].is_available), _snapshot(row, row.is_available))
+        for row in rows
+    }
+
+
+def set_stock(db: Session, product_id: int, expected: int, quantity: int) -> None:
+    """
+    Sets a product's quantity_available to `quantity` provided it is still
+    `expected`, so the adjustment recorded for it is exact even if a checkout
+    landed in between; raises 409 otherwise. For a sharded product `expected`
+    is its stock_levels total.
+    """
+    if sharded_products(db, [product_id]):
+        set_sharded_stock(db, product_id, expected, quantity)
+        return
+    result = db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.quantity_available == expected)
+        .values(quantity_available=quantity)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock changed while you were editing, please retry"
+        )
@@ -0,0 +1,274 @@
+# app/utils/stock_shards.py
+import asyncio
+import os
+import random
+from typing import Callable, Dict, Iterable, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from sqlalchemy import case, delete, false, func, insert, select, true, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models import Product, ProductStockShard
+from app.utils.cache import invalidate_product, product_snapshot
+from app.utils.facets import record_product_change
+
+load_dotenv()
+
+# ============================================================
+# SHARDED STOCK
+# ============================================================
+# A product in high-contention mode (stock_shards > 0) keeps its sellable units
+# in that many product_stock_shards rows. Checkout decrements one random shard,
+# so concurrent buyers of the product mostly lock different rows instead of
+# queueing on its products row. Held units stay in quantity_reserved, so the
+# product's stock is its shards plus quantity_reserved (see stock_levels).
+# products.quantity_available is kept as a cached copy of that, refreshed by
+# every other stock write and by the rebalancer, which also evens the shards
+# out every STOCK_REBALANCE_INTERVAL seconds. Between passes listings show the
+# quantity as of the last refresh, except that the sale which empties the last
+# shard delists the product itself (sell_out).
+MAX_STOCK_SHARDS = 64
+STOCK_REBALANCE_INTERVAL = float(os.getenv("STOCK_REBALANCE_INTERVAL", 5))
+
+
+def sharded_products(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    """{product_id: shard count} for the given products that are in high-contention mode."""
+    return dict(db.query(Product.id, Product.stock_shards).filter(
+        Product.id.in_(list(product_ids)),
+        Product.stock_shards > 0
+    ).all())
+
+
+def stock_levels(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    """Each product's current quantity_available, summing the shards of sharded products."""
+    in_shards = select(func.coalesce(func.sum(ProductStockShard.quantity), 0)).where(
+        ProductStockShard.product_id == Product.id
+    ).scalar_subquery()
+    return dict(db.query(
+        Product.id,
+        case((Product.stock_shards > 0, Product.quantity_reserved + in_shards), else_=Product.quantity_available),
+    ).filter(Product.id.in_(list(product_ids))).all())
+
+
+def _locked_shards(db: Session, product_id: int) -> Dict[int, int]:
+    return dict(db.query(ProductStockShard.shard, ProductStockShard.quantity).filter(
+        ProductStockShard.product_id == product_id
+    ).order_by(ProductStockShard.shard).with_for_update().all())
+
+
+def _even_split(total: int, shards: int) -> Dict[int, int]:
+    return {shard: total // shards + (1 if shard < total % shards else 0) for shard in range(shards)}
+
+
+def _spread(db: Session, product_id: int, total: int, shards: int, current: Dict[int, int]) -> None:
+    """
+    Shares `total` units evenly over `shards` shard rows, given the product's
+    locked `current` shards: updated in place when the shard count is unchanged,
+    otherwise replaced.
+    """
+    split = _even_split(max(total, 0), shards) if shards else {}
+    if split and set(current) == set(split):
+        db.execute(
+            update(ProductStockShard)
+            .where(ProductStockShard.product_id == product_id)
+            .values(quantity=case(split, value=ProductStockShard.shard))
+            .execution_options(synchronize_session=False)
+        )
+        return
+    db.execute(delete(ProductStockShard).where(ProductStockShard.product_id == product_id))
+    if split:
+        db.execute(insert(ProductStockShard), [
+            {"product_id": product_id, "shard": shard, "quantity": quantity} for shard, quantity in split.items()
+        ])
+
+
+# ============================================================
+# STOCK CHANGES
+# ============================================================
+def take_from_shards(db: Session, product_id: int, shards: int, quantity: int) -> Tuple[bool, int]:
+    """
+    Takes `quantity` units of a sharded product. Normally one guarded UPDATE of a
+    random shard; when that shard is short, every shard is locked and drained
+    largest first. Returns (True, left) on success, where left is 0 only if the
+    take may have sold the product out (see sell_out), or (False, available)
+    with nothing taken when there isn't enough stock.
+    """
+    left = db.execute(
+        update(ProductStockShard)
+        .where(
+            ProductStockShard.product_id == product_id,
+            ProductStockShard.shard == random.randrange(shards),
+            ProductStockShard.quantity >= quantity
+        )
+        .values(quantity=ProductStockShard.quantity - quantity)
+        .returning(ProductStockShard.quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if left is not None:
+        return True, left
+
+    current = _locked_shards(db, product_id)
+    if sum(current.values()) < quantity:
+        return False, sum(current.values())
+    amounts, remaining = {}, quantity
+    for shard, available in sorted(current.items(), key=lambda item: -item[1]):
+        amounts[shard] = min(available, remaining)
+        remaining -= amounts[shard]
+        if not remaining:
+            break
+    db.execute(
+        update(ProductStockShard)
+        .where(ProductStockShard.product_id == product_id, ProductStockShard.shard.in_(list(amounts)))
+        .values(quantity=ProductStockShard.quantity - case(amounts, value=ProductStockShard.shard))
+        .execution_options(synchronize_session=False)
+    )
+    return True, sum(current.values()) - quantity
+
+
+def sell_out(db: Session, product_id: int) -> bool:
+    """
+    Called in the checkout's transaction when a take emptied a shard: if every
+    shard is now empty, sets the cached quantity_available and takes the product
+    off the listing (unless units are still held) there and then, rather than at
+    the next rebalance. Returns whether the product was delisted.
+    """
+    # The products row and then every shard row are locked before the shards are
+    # summed, so no take, restock or edit can change the total between the sum
+    # and the delist. The locks are taken with SKIP LOCKED and never waited on:
+    # this checkout already holds its own shard's lock, while the rebalancer and
+    # stock edits lock the products row and then every shard, so waiting here
+    # could deadlock with them or with another checkout doing the same. A
+    # skipped row means another writer is mid-change; the product is then left
+    # listed and the rebalancer settles it on its next pass.
+    shard_count = db.query(Product.stock_shards).filter(
+        Product.id == product_id, Product.stock_shards > 0
+    ).with_for_update(skip_locked=True).scalar()
+    if not shard_count:
+        return False
+    shards = db.query(ProductStockShard.quantity).filter(
+        ProductStockShard.product_id == product_id
+    ).with_for_update(skip_locked=True).all()
+    if len(shards) < shard_count or any(quantity for (quantity,) in shards):
+        return False
+    listed = db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(
+            quantity_available=Product.quantity_reserved,
+            is_available=case((Product.quantity_reserved > 0, true()), else_=false()),
+        )
+        .returning(Product.is_available)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    return listed is False
+
+
+def add_to_shards(db: Session, quantities: Dict[int, int], shards: Dict[int, int]) -> None:
+    """Puts {product_id: quantity} units back into one random shard of each sharded product."""
+    for product_id, quantity in quantities.items():
+        if product_id in shards and quantity:
+            db.execute(
+                update(ProductStockShard)
+                .where(ProductStockShard.product_id == product_id,
+                       ProductStockShard.shard == random.randrange(shards[product_id]))
+                .values(quantity=ProductStockShard.quantity + quantity)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def set_sharded_stock(db: Session, product_id: int, expected: int, quantity: int) -> None:
+    """set_stock for a sharded product: compares against the shard total, then re-spreads."""
+    row = db.query(Product.quantity_reserved, Product.stock_shards).filter(
+        Product.id == product_id
+    ).with_for_update().one()
+    current = _locked_shards(db, product_id)
+    if sum(current.values()) + row.quantity_reserved != expected:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock changed while you were editing, please retry"
+        )
+    _spread(db, product_id, quantity - row.quantity_reserved, row.stock_shards, current)
+    db.execute(
+        update(Product).where(Product.id == product_id).values(quantity_available=quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def set_stock_shards(db: Session, product_id: int, shards: int) -> None:
+    """
+    Turns high-contention mode on with `shards` shards (or off with 0), in the
+    caller's transaction. Sellable units move into the new shards, or back onto
+    the products row when turning it off; the product's stock is unchanged.
+    """
+    if not 0 <= shards <= MAX_STOCK_SHARDS:
+        raise HTTPException(status_code=400, detail=f"stock_shards must be between 0 and {MAX_STOCK_SHARDS}")
+    row = db.query(Product.quantity_available, Product.quantity_reserved, Product.stock_shards).filter(
+        Product.id == product_id
+    ).with_for_update().one()
+    current = _locked_shards(db, product_id)
+    if row.stock_shards:
+        quantity = sum(current.values()) + row.quantity_reserved
+    else:
+        quantity = row.quantity_available or 0
+    _spread(db, product_id, quantity - row.quantity_reserved, shards, current)
+    db.execute(
+        update(Product).where(Product.id == product_id).values(quantity_available=quantity, stock_shards=shards)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# ============================================================
+# REBALANCER
+# ============================================================
+def rebalance_stock_shards(session_factory: Callable[[], Session]) -> int:
+    """
+    Evens out each sharded product's shards and refreshes its cached
+    quantity_available, one product per transaction; a product that sold out
+    is taken off the listing. Returns the number of products whose stock had
+    changed since the last pass.
+    """
+    changed = 0
+    with session_factory() as db:
+        product_ids = [product_id for (product_id,) in db.query(Product.id).filter(Product.stock_shards > 0)]
+    for product_id in product_ids:
+        with session_factory() as db:
+            product = db.query(Product).filter(
+                Product.id == product_id, Product.stock_shards > 0
+            ).with_for_update().first()
+            if product is None:
+                continue
+            current = _locked_shards(db, product_id)
+            total = sum(current.values())
+            if current != _even_split(total, product.stock_shards):
+                _spread(db, product_id, total, product.stock_shards, current)
+
+            quantity = total + product.quantity_reserved
+            if quantity == product.quantity_available:
+                db.commit()
+                continue
+            before = product_snapshot(product)
+            values = {"quantity_available": quantity}
+            if quantity <= 0:
+                values["is_available"] = False
+            db.execute(
+                update(Product).where(Product.id == product_id).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            after = {**before, "is_available": before["is_available"] and quantity > 0}
+            record_product_change(db, before, after)
+            db.commit()
+            invalidate_product(before, after)
+            changed += 1
+    return changed
+
+
+async def run_stock_rebalancer(session_factory: Callable[[], Session]):
+    """Rebalances sharded stock every STOCK_REBALANCE_INTERVAL seconds for the life of the app."""
+    while True:
+        await asyncio.sleep(STOCK_REBALANCE_INTERVAL)
+        try:
+            await run_in_threadpool(rebalance_stock_shards, session_factory)
+        except Exception as e:
+            print(f"❌ Error rebalancing stock shards: {str(e)}")
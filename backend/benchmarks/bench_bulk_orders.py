@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark a bulk procurement upload against posting the same orders one by one.
+
+Seeds a throwaway SQLite database with several farmers' catalogs and a
+business buyer, builds a CSV procurement file of --lines lines (--lines-per-order
+lines per order, products spread across the farmers) and times, in-process,
+POST /api/orders/bulk with the file and then POST /api/orders/ once per order,
+reporting wall time and SQL statements for each.
+
+Usage: python benchmarks/bench_bulk_orders.py [--lines 1000] [--lines-per-order 5]
+       [--farmers 10] [--products 200]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def seed(farmers, products, stock):
+    from sqlalchemy import insert
+    from app.database import SessionLocal, run_migrations
+    from app import models
+    from app.utils.auth_utils import create_access_token
+
+    run_migrations()
+    db = SessionLocal()
+
+    def user(name, role, user_type="individual"):
+        return models.User(
+            email=f"{name}@example.com", phone="+2348000000000", username=name, password_hash="x",
+            first_name=name, last_name="Bench", address="-", city="Ibadan", state="Oyo",
+            role=role, user_type=user_type, is_verified=True, is_active=True,
+        )
+
+    growers = [user(f"farmer{i}", "farmer") for i in range(farmers)]
+    buyer = user("shop", "buyer", "business")
+    db.add_all(growers + [buyer])
+    db.flush()
+    db.execute(insert(models.Product), [
+        {
+            "name": f"Crop {i}", "description": "bench", "price": 100 + i, "category": "Vegetables",
+            "unit": "kg", "quantity_available": stock, "is_available": True,
+            "min_order_quantity": 1, "farmer_id": growers[i % farmers].id,
+        }
+        for i in range(products)
+    ])
+    db.commit()
+    product_ids = [p.id for p in db.query(models.Product.id).order_by(models.Product.id)]
+    token = create_access_token({"sub": buyer.email})
+    db.close()
+    return product_ids, token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--lines-per-order", type=int, default=5)
+    parser.add_argument("--farmers", type=int, default=10)
+    parser.add_argument("--products", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.database opens ./farmconnect.db relative to the working directory
+        os.chdir(workdir)
+        os.environ["RUN_MIGRATIONS"] = "false"
+        product_ids, token = seed(args.farmers, args.products, stock=args.lines * 2)
+
+        from fastapi.testclient import TestClient
+        from sqlalchemy import event
+        from app.database import engine
+        from app.main import app
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        logging.getLogger("app.main").setLevel(logging.ERROR)
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+        orders = {}
+        for line in range(args.lines):
+            orders.setdefault(f"PO-{line // args.lines_per_order}", []).append(
+                (product_ids[line % len(product_ids)], 1)
+            )
+        procurement = "reference,delivery_address,product_id,quantity\n" + "".join(
+            f"{reference},1 Market Street,{product_id},{quantity}\n"
+            for reference, lines in orders.items() for product_id, quantity in lines
+        )
+
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"lines={args.lines} orders={len(orders)} farmers={args.farmers} products={args.products}")
+        print(f"{'mode':>10}  {'seconds':>8}  {'statements':>10}")
+        with TestClient(app) as client:
+            statements.clear()
+            started = time.perf_counter()
+            response = client.post("/api/orders/bulk", headers=headers,
+                                   files={"file": ("procurement.csv", procurement, "text/csv")})
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200 and response.json()["created"] == len(orders), response.text
+            print(f"{'bulk':>10}  {elapsed:>8.2f}  {len(statements):>10}")
+
+            statements.clear()
+            started = time.perf_counter()
+            for lines in orders.values():
+                response = client.post("/api/orders/", headers=headers, json={
+                    "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in lines],
+                    "delivery_address": "1 Market Street",
+                })
+                assert response.status_code == 200, response.text
+            elapsed = time.perf_counter() - started
+            print(f"{'one-by-one':>10}  {elapsed:>8.2f}  {len(statements):>10}")
+
+        engine.dispose()
+        os.chdir(BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
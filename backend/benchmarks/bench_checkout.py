@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for checkout: N buyers race to order one product.
+
+Starts the API under uvicorn with several worker processes against a
+throwaway SQLite database, fires every buyer's POST /api/orders/ at once,
+then checks that exactly the available stock was sold (no oversell, no
+undersell) and reports successful orders per second.
+
+With --retries N every buyer sends its order N times at once under one
+Idempotency-Key, as a client retrying on a flaky network would; the
+duplicates must replay the first response rather than order again.
+
+Usage: python benchmarks/bench_checkout.py [--buyers 200] [--stock 100] [--workers 4] [--retries 1]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+
+def seed(buyers, stock):
+    """Creates the schema and data in the current directory's farmconnect.db."""
+    from app.database import SessionLocal, run_migrations
+    from app import models
+    from app.utils.auth_utils import create_access_token
+
+    run_migrations()
+    db = SessionLocal()
+
+    def user(name, role):
+        return models.User(
+            email=f"{name}@example.com", phone="+2348000000000", username=name, password_hash="x",
+            first_name=name, last_name="Bench", address="-", city="Ibadan", state="Oyo",
+            role=role, user_type="individual", is_verified=True, is_active=True,
+        )
+
+    farmer = user("farmer", "farmer")
+    customers = [user(f"buyer{i}", "buyer") for i in range(buyers)]
+    db.add_all([farmer, *customers])
+    db.flush()
+    product = models.Product(
+        name="Rice", description="Bench rice", price=1000, category="Grains", unit="bag",
+        quantity_available=stock, farmer_id=farmer.id, is_available=True, min_order_quantity=1,
+    )
+    db.add(product)
+    db.commit()
+    tokens = [create_access_token({"sub": customer.email}) for customer in customers]
+    product_id = product.id
+    db.close()
+    return product_id, tokens
+
+
+def final_state(product_id):
+    from app.database import SessionLocal
+    from app import models
+
+    db = SessionLocal()
+    try:
+        product = db.get(models.Product, product_id)
+        ordered = sum(item.quantity for item in db.query(models.OrderItem).filter(
+            models.OrderItem.product_id == product_id
+        ))
+        return product.quantity_available, ordered, db.query(models.Order).count()
+    finally:
+        db.close()
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/products/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.database opens ./farmconnect.db relative to the working directory
+        os.chdir(workdir)
+        product_id, tokens = seed(args.buyers, args.stock)
+
+        env = {**os.environ, "RUN_MIGRATIONS": "false", "PYTHONPATH": BACKEND_DIR}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_up(base_url)
+
+            # One shared client: building a client per thread costs more than the checkout
+            client = httpx.Client(
+                base_url=base_url, timeout=60,
+                limits=httpx.Limits(
+                    max_connections=args.buyers * args.retries,
+                    max_keepalive_connections=args.buyers * args.retries,
+                ),
+            )
+
+            def checkout(attempt):
+                token, key = attempt
+                response = client.post("/api/orders/", headers={
+                    "Authorization": f"Bearer {token}", "Idempotency-Key": key,
+                }, json={
+                    "items": [{"product_id": product_id, "quantity": 1}],
+                    "delivery_address": "1 Market Street",
+                })
+                return response.status_code
+
+            started = time.perf_counter()
+            attempts = [(token, f"checkout-{i}") for i, token in enumerate(tokens) for _ in range(args.retries)]
+            with ThreadPoolExecutor(max_workers=len(attempts)) as pool:
+                statuses = Counter(pool.map(checkout, attempts))
+            elapsed = time.perf_counter() - started
+            client.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+        remaining, ordered, orders = final_state(product_id)
+        print(f"buyers={args.buyers} stock={args.stock} workers={args.workers} retries={args.retries}")
+        print(f"responses: {dict(sorted(statuses.items()))}")
+        print(f"orders created: {orders}, units ordered: {ordered:g}, stock left: {remaining}")
+        print(f"oversold units: {max(0, ordered - args.stock):g}")
+        print(f"elapsed: {elapsed:.2f}s, successful orders/sec: {orders / elapsed:.1f}")
+        os.chdir(BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
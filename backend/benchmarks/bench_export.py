@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of the streaming catalog export against loading the
+whole catalog as ORM objects and Pydantic models.
+
+Seeds throwaway SQLite databases of increasing size and measures the
+tracemalloc peak while producing the full NDJSON body each way.
+
+Usage: python benchmarks/bench_export.py [--sizes 10000 50000 200000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, selectinload
+
+from app.database import Base
+from app import models, schemas
+from app.utils.export import iter_export_rows, ndjson_lines, buffered
+
+
+def seed(session, total):
+    farmer = models.User(
+        email="bench@example.com", phone="+2348000000000", username="bench",
+        password_hash="x", first_name="Bench", last_name="Farmer", address="-",
+        city="Ibadan", state="Oyo", role="farmer", user_type="individual",
+    )
+    session.add(farmer)
+    session.commit()
+
+    start = datetime(2024, 1, 1)
+    for offset in range(0, total, 10_000):
+        count = min(10_000, total - offset)
+        session.execute(insert(models.Product), [
+            {
+                "name": f"Product {i}", "description": "Fresh produce from the bench farm " * 3,
+                "price": 100 + i % 900, "category": "Vegetables", "unit": "kg",
+                "quantity_available": 10, "is_available": True, "min_order_quantity": 1,
+                "farmer_id": farmer.id, "created_at": start + timedelta(seconds=i),
+            }
+            for i in range(offset, offset + count)
+        ])
+        session.execute(insert(models.ProductImage), [
+            {"product_id": i + 1, "image_url": f"/media/products/{i}.jpg"}
+            for i in range(offset, offset + count)
+        ])
+    session.commit()
+
+
+def export_streaming(session):
+    written = 0
+    for chunk in buffered(ndjson_lines(iter_export_rows(session))):
+        written += len(chunk)
+    return written
+
+
+def export_materialized(session):
+    products = session.query(models.Product).options(selectinload(models.Product.images)).all()
+    models_ = [schemas.ProductResponse.model_validate(product) for product in products]
+    return sum(len(model.model_dump_json()) + 1 for model in models_)
+
+
+def measure(engine, export):
+    with Session(engine) as session:
+        tracemalloc.start()
+        started = time.perf_counter()
+        written = export(session)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return written, peak / (1024 * 1024), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    args = parser.parse_args()
+
+    print(f"{'products':>9}  {'streaming peak':>15}  {'materialized peak':>18}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+            Base.metadata.create_all(engine)
+            with Session(engine) as session:
+                seed(session, size)
+
+            _, streaming_peak, streaming_time = measure(engine, export_streaming)
+            _, materialized_peak, materialized_time = measure(engine, export_materialized)
+            print(
+                f"{size:>9,}  {streaming_peak:>8.1f} MB {streaming_time:>4.1f}s"
+                f"  {materialized_peak:>10.1f} MB {materialized_time:>5.1f}s"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
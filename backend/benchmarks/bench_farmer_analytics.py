@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark the farmer analytics dashboard against sales history length.
+
+Seeds a throwaway SQLite database where one farmer has --orders orders spread
+over the past three years, builds the sales rollups from order_items and times
+GET /api/farmers/me/analytics in-process. Run it at a few sizes to compare.
+
+Usage: python benchmarks/bench_farmer_analytics.py [--orders 10000] [--repeat 20]
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+STATUSES = ["pending", "confirmed", "shipped", "delivered", "delivered", "delivered", "cancelled"]
+
+
+def seed(orders):
+    from sqlalchemy import insert
+    from app.database import SessionLocal, run_migrations
+    from app import models
+    from app.utils.analytics import rebuild_farmer_rollups
+    from app.utils.auth_utils import create_access_token
+
+    run_migrations()
+    db = SessionLocal()
+    rng = random.Random(7)
+
+    def user(name, role):
+        return models.User(
+            email=f"{name}@example.com", phone="+2348000000000", username=name, password_hash="x",
+            first_name=name, last_name="Bench", address="-", city="Ibadan", state="Oyo",
+            role=role, user_type="individual", is_verified=True, is_active=True,
+        )
+
+    farmer = user("farmer", "farmer")
+    buyers = [user(f"buyer{i}", "buyer") for i in range(200)]
+    db.add_all([farmer, *buyers])
+    db.flush()
+    db.execute(insert(models.Product), [
+        {"name": f"Crop {i}", "description": "bench", "price": 100 + i, "category": "Grains", "unit": "kg",
+         "quantity_available": 10, "is_available": True, "min_order_quantity": 1, "farmer_id": farmer.id}
+        for i in range(30)
+    ])
+    product_ids = [p.id for p in db.query(models.Product.id)]
+
+    now = datetime.utcnow()
+    order_rows, item_rows = [], []
+    for order_id in range(1, orders + 1):
+        placed = now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))
+        order_rows.append({
+            "id": order_id, "order_number": f"ORD-BENCH-{order_id}", "customer_id": rng.choice(buyers).id,
+            "total_amount": 300, "status": rng.choice(STATUSES), "payment_status": "pending",
+            "delivery_type": "standard", "delivery_address": "-", "created_at": placed, "updated_at": placed,
+        })
+        for product_id in rng.sample(product_ids, 3):
+            item_rows.append({"order_id": order_id, "product_id": product_id, "quantity": 1,
+                              "unit_price": 100, "total_price": 100})
+    for offset in range(0, len(order_rows), 10_000):
+        db.execute(insert(models.Order), order_rows[offset:offset + 10_000])
+    for offset in range(0, len(item_rows), 10_000):
+        db.execute(insert(models.OrderItem), item_rows[offset:offset + 10_000])
+    rebuild_farmer_rollups(db)
+    db.commit()
+    token = create_access_token({"sub": farmer.email})
+    db.close()
+    return token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.database opens ./farmconnect.db relative to the working directory
+        os.chdir(workdir)
+        os.environ["RUN_MIGRATIONS"] = "false"
+        os.environ["RESERVATION_SWEEPER"] = "false"
+        os.environ["INVENTORY_COMPACTOR"] = "false"
+        print(f"Seeding {args.orders:,} orders...")
+        token = seed(args.orders)
+
+        from fastapi.testclient import TestClient
+        from app.database import engine
+        from app.main import app
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        headers = {"Authorization": f"Bearer {token}"}
+        timings = []
+        with TestClient(app) as client:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = client.get("/api/farmers/me/analytics", headers=headers)
+                timings.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.text
+        print(f"GET /api/farmers/me/analytics: {statistics.median(timings):.2f} ms median")
+
+        engine.dispose()
+        os.chdir(BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
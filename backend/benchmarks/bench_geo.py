@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark "near me" product search against computing every distance.
+
+Seeds a throwaway SQLite database with farms scattered over Nigeria's
+bounding box, then times the listing endpoint's radius search (geohash
+index + distances for candidates only) against a scan that joins users and
+computes the distance to every available product.
+
+Usage: python benchmarks/bench_geo.py [--farms 30000] [--products-per-farm 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app import models
+from app.routers.products import _load_product_page
+from app.utils.cache import product_listing_filters
+from app.utils.geo import farm_location, haversine_km
+
+# Roughly Nigeria's extent
+LAT_RANGE = (4.3, 13.9)
+LNG_RANGE = (2.7, 14.6)
+
+# Lagos, Abuja, Kano, Port Harcourt
+CENTERS = [(6.5244, 3.3792), (9.0765, 7.3986), (12.0022, 8.5920), (4.8156, 7.0498)]
+
+
+def seed(session, farms, products_per_farm):
+    rng = random.Random(3)
+    users = []
+    for i in range(farms):
+        users.append({
+            "email": f"farm{i}@example.com", "phone": f"+2348{i:09d}", "username": f"farm{i}",
+            "password_hash": "x", "first_name": "Bench", "last_name": "Farmer", "address": "-",
+            "city": "-", "state": "-", "role": "farmer", "user_type": "individual",
+            "latitude": rng.uniform(*LAT_RANGE), "longitude": rng.uniform(*LNG_RANGE),
+        })
+    session.execute(insert(models.User), users)
+
+    class Farm:
+        pass
+
+    rows = []
+    for farmer_id, user in enumerate(users, start=1):
+        farm = Farm()
+        farm.latitude, farm.longitude = user["latitude"], user["longitude"]
+        location = farm_location(farm)
+        for j in range(products_per_farm):
+            rows.append({
+                "name": f"Product {farmer_id}-{j}", "description": "bench", "price": rng.randint(100, 5000),
+                "category": "Vegetables", "unit": "kg", "quantity_available": 10,
+                "is_available": True, "min_order_quantity": 1, "farmer_id": farmer_id, **location,
+            })
+    for start in range(0, len(rows), 10_000):
+        session.execute(insert(models.Product), rows[start:start + 10_000])
+    session.commit()
+
+
+def scan_all(session, latitude, longitude, radius_km, limit):
+    """What the query would cost without the index: join users and measure every product."""
+    rows = (
+        session.query(models.Product.id, models.User.latitude, models.User.longitude)
+        .join(models.User, models.User.id == models.Product.farmer_id)
+        .filter(models.Product.is_available == True, models.User.latitude.isnot(None))
+        .all()
+    )
+    matches = sorted(
+        (haversine_km(latitude, longitude, lat, lng), product_id)
+        for product_id, lat, lng in rows
+    )
+    return [m for m in matches if m[0] <= radius_km][:limit]
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--farms", type=int, default=30_000)
+    parser.add_argument("--products-per-farm", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            print(f"Seeding {args.farms:,} farms x {args.products_per_farm} products...")
+            seed(session, args.farms, args.products_per_farm)
+
+            print(f"{'radius':>8}  {'indexed':>10}  {'full scan':>10}  {'results':>8}")
+            for radius in (10, 25, 50, 100):
+                indexed, scanned, found = [], [], 0
+                for latitude, longitude in CENTERS:
+                    filters = product_listing_filters(near=(latitude, longitude), radius_km=radius)
+                    indexed.append(timed(lambda: _load_product_page(session, filters, None, 50), args.repeat))
+                    scanned.append(timed(lambda: scan_all(session, latitude, longitude, radius, 50), args.repeat))
+                    found += len(scan_all(session, latitude, longitude, radius, 50))
+                print(
+                    f"{radius:>5} km  {statistics.mean(indexed):>7.2f} ms  "
+                    f"{statistics.mean(scanned):>7.2f} ms  {found / len(CENTERS):>8.1f}"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark the API's hot queries before and after the 0002 index migration.
+
+Builds a throwaway SQLite database at the baseline revision (0001), seeds a
+catalog and order history, prints the query plan and median latency of each
+hot-path query, then upgrades to head and repeats.
+
+Usage: python benchmarks/bench_indexes.py [--products 100000] [--orders 50000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIES = [f"Category {i}" for i in range(30)]
+
+# The statements the routers issue, with representative parameters
+QUERIES = {
+    "catalog page": (
+        "SELECT id FROM products WHERE is_available = 1 "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        {},
+    ),
+    "category + price range": (
+        "SELECT id FROM products WHERE is_available = 1 AND lower(category) = :category "
+        "AND price >= :low AND price <= :high ORDER BY created_at DESC, id DESC LIMIT 51",
+        {"category": "category 7", "low": 200, "high": 400},
+    ),
+    "facet min price": (
+        "SELECT price FROM products WHERE category = :category AND is_available = 1 "
+        "ORDER BY price ASC LIMIT 1",
+        {"category": "Category 7"},
+    ),
+    "farmer products": (
+        "SELECT id FROM products WHERE farmer_id = :farmer_id ORDER BY created_at DESC, id DESC",
+        {"farmer_id": 5},
+    ),
+    "order items (selectin)": (
+        "SELECT id FROM order_items WHERE order_id IN (:a, :b, :c, :d, :e)",
+        {"a": 11, "b": 222, "c": 3333, "d": 4444, "e": 5555},
+    ),
+    "items for a product": (
+        "SELECT order_id FROM order_items WHERE product_id = :product_id",
+        {"product_id": 777},
+    ),
+    "buyer order history": (
+        "SELECT id FROM orders WHERE customer_id = :customer_id ORDER BY created_at DESC",
+        {"customer_id": 40},
+    ),
+    "buyer orders by payment": (
+        "SELECT id FROM orders WHERE customer_id = :customer_id AND payment_status = :payment_status "
+        "ORDER BY created_at DESC, id DESC LIMIT 51",
+        {"customer_id": 400, "payment_status": "pending"},
+    ),
+    "user by phone": (
+        "SELECT id FROM users WHERE phone = :phone",
+        {"phone": "+2348000000040"},
+    ),
+}
+
+
+def alembic_config(connection):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.attributes["configure_logger"] = False
+    config.attributes["connection"] = connection
+    return config
+
+
+def seed(connection, products, orders):
+    rng = random.Random(7)
+    users = [
+        {
+            "email": f"user{i}@example.com", "phone": f"+2348{i:09d}", "username": f"user{i}",
+            "password_hash": "x", "first_name": "Bench", "last_name": "User", "address": "-",
+            "city": "Ibadan", "state": "Oyo", "role": "farmer" if i <= 50 else "buyer",
+            "user_type": "individual",
+        }
+        for i in range(1, 1001)
+    ]
+    connection.execute(text(
+        "INSERT INTO users (email, phone, username, password_hash, first_name, last_name, address, "
+        "city, state, role, user_type) VALUES (:email, :phone, :username, :password_hash, "
+        ":first_name, :last_name, :address, :city, :state, :role, :user_type)"
+    ), users)
+
+    start = datetime(2024, 1, 1)
+    connection.execute(text(
+        "INSERT INTO products (name, price, category, unit, quantity_available, is_available, "
+        "farmer_id, created_at) VALUES (:name, :price, :category, 'kg', 100, :is_available, "
+        ":farmer_id, :created_at)"
+    ), [
+        {
+            "name": f"Product {i}", "price": rng.randint(50, 5000),
+            "category": rng.choice(CATEGORIES), "is_available": rng.random() > 0.1,
+            "farmer_id": rng.randint(1, 50), "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(products)
+    ])
+
+    connection.execute(text(
+        "INSERT INTO orders (order_number, customer_id, total_amount, status, payment_status, delivery_type, "
+        "created_at) VALUES (:order_number, :customer_id, 1000, 'pending', :payment_status, 'standard', :created_at)"
+    ), [
+        {"order_number": f"ORD-{i}", "customer_id": rng.randint(51, 1000),
+         "payment_status": rng.choice(["pending", "paid"]), "created_at": start + timedelta(minutes=i)}
+        for i in range(orders)
+    ])
+    connection.execute(text(
+        "INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price) "
+        "VALUES (:order_id, :product_id, 1, 500, 500)"
+    ), [
+        {"order_id": order_id, "product_id": rng.randint(1, products)}
+        for order_id in range(1, orders + 1)
+        for _ in range(3)
+    ])
+
+
+def measure(connection, label, repeat):
+    print(f"\n=== {label} ===")
+    connection.execute(text("ANALYZE"))
+    for name, (sql, params) in QUERIES.items():
+        plan = connection.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            connection.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<26} {statistics.median(timings):8.3f} ms   {' | '.join(row[-1] for row in plan)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        with engine.begin() as connection:
+            command.upgrade(alembic_config(connection), "0001")
+            print(f"Seeding {args.products:,} products and {args.orders:,} orders...")
+            seed(connection, args.products, args.orders)
+
+        with engine.connect() as connection:
+            measure(connection, "baseline (0001)", args.repeat)
+
+        with engine.begin() as connection:
+            command.upgrade(alembic_config(connection), "head")
+
+        with engine.connect() as connection:
+            measure(connection, "head", args.repeat)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark the first page of buyer and farmer order histories.
+
+Seeds a throwaway SQLite database where one farmer and one buyer have a long
+history (--orders orders) alongside a new farmer and buyer with a handful,
+then times the first page and a filtered page of GET /api/orders/my-orders
+and /api/orders/farmer-orders in-process for each.
+
+Usage: python benchmarks/bench_order_history.py [--orders 50000] [--repeat 20]
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+STATUSES = ["pending", "confirmed", "shipped", "delivered", "cancelled"]
+
+
+def seed(orders):
+    from sqlalchemy import insert
+    from app.database import SessionLocal, run_migrations
+    from app import models
+    from app.utils.auth_utils import create_access_token
+
+    run_migrations()
+    db = SessionLocal()
+    rng = random.Random(5)
+
+    def user(name, role):
+        return models.User(
+            email=f"{name}@example.com", phone="+2348000000000", username=name, password_hash="x",
+            first_name=name, last_name="Bench", address="-", city="Ibadan", state="Oyo",
+            role=role, user_type="individual", is_verified=True, is_active=True,
+        )
+
+    users = {name: user(name, role) for name, role in [
+        ("old_farmer", "farmer"), ("new_farmer", "farmer"), ("old_buyer", "buyer"), ("new_buyer", "buyer"),
+    ]}
+    db.add_all(users.values())
+    db.flush()
+    products = {}
+    for name in ("old_farmer", "new_farmer"):
+        rows = [
+            {"name": f"{name} crop {i}", "description": "bench", "price": 100, "category": "Grains",
+             "unit": "kg", "quantity_available": 10, "is_available": True, "min_order_quantity": 1,
+             "farmer_id": users[name].id}
+            for i in range(20)
+        ]
+        db.execute(insert(models.Product), rows)
+        products[name] = [p.id for p in db.query(models.Product.id).filter(
+            models.Product.farmer_id == users[name].id)]
+
+    start = datetime(2020, 1, 1)
+    order_rows, item_rows, link_rows = [], [], []
+    plan = [("old_buyer", "old_farmer")] * orders + [("new_buyer", "new_farmer")] * 5
+    for order_id, (buyer, farmer) in enumerate(plan, start=1):
+        order_rows.append({
+            "id": order_id, "order_number": f"ORD-BENCH-{order_id}", "customer_id": users[buyer].id,
+            "total_amount": 100, "status": rng.choice(STATUSES), "payment_status": "pending",
+            "delivery_type": "standard", "delivery_address": "-",
+            "created_at": start + timedelta(minutes=order_id), "updated_at": start + timedelta(minutes=order_id),
+        })
+        for product_id in rng.sample(products[farmer], 2):
+            item_rows.append({"order_id": order_id, "product_id": product_id, "quantity": 1,
+                              "unit_price": 100, "total_price": 100})
+        link_rows.append({"farmer_id": users[farmer].id, "order_id": order_id, "subtotal": 200, "item_count": 2})
+    for offset in range(0, len(order_rows), 10_000):
+        db.execute(insert(models.Order), order_rows[offset:offset + 10_000])
+    for offset in range(0, len(item_rows), 10_000):
+        db.execute(insert(models.OrderItem), item_rows[offset:offset + 10_000])
+    for offset in range(0, len(link_rows), 10_000):
+        db.execute(insert(models.FarmerOrder), link_rows[offset:offset + 10_000])
+    db.commit()
+    tokens = {name: create_access_token({"sub": u.email}) for name, u in users.items()}
+    db.close()
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.database opens ./farmconnect.db relative to the working directory
+        os.chdir(workdir)
+        os.environ["RUN_MIGRATIONS"] = "false"
+        os.environ["RESERVATION_SWEEPER"] = "false"
+        print(f"Seeding {args.orders:,} orders...")
+        tokens = seed(args.orders)
+
+        from fastapi.testclient import TestClient
+        from app.database import engine
+        from app.main import app
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        print(f"{'endpoint':<28} {'account':<12} {'first page':>11} {'status=pending':>15}")
+        with TestClient(app) as client:
+            for path, accounts in (("/api/orders/my-orders", ("old_buyer", "new_buyer")),
+                                   ("/api/orders/farmer-orders", ("old_farmer", "new_farmer"))):
+                for account in accounts:
+                    headers = {"Authorization": f"Bearer {tokens[account]}"}
+                    medians = []
+                    for params in ({}, {"status": "pending"}):
+                        timings = []
+                        for _ in range(args.repeat):
+                            started = time.perf_counter()
+                            response = client.get(path, headers=headers, params=params)
+                            timings.append((time.perf_counter() - started) * 1000)
+                            assert response.status_code == 200, response.text
+                            assert response.json() or params, f"{account} got an empty first page"
+                        medians.append(statistics.median(timings))
+                    print(f"{path:<28} {account:<12} {medians[0]:>8.2f} ms {medians[1]:>12.2f} ms")
+
+        engine.dispose()
+        os.chdir(BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark checkout latency as the number of order lines grows.
+
+Seeds a throwaway SQLite database with one farmer's catalog and times
+POST /api/orders/ in-process for orders of increasing line counts (each line
+a different product), reporting the median latency and SQL statements per
+checkout.
+
+Usage: python benchmarks/bench_order_lines.py [--lines 1 10 50 100 200] [--repeat 20]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def seed(products, stock):
+    from sqlalchemy import insert
+    from app.database import SessionLocal, run_migrations
+    from app import models
+    from app.utils.auth_utils import create_access_token
+
+    run_migrations()
+    db = SessionLocal()
+
+    def user(name, role):
+        return models.User(
+            email=f"{name}@example.com", phone="+2348000000000", username=name, password_hash="x",
+            first_name=name, last_name="Bench", address="-", city="Ibadan", state="Oyo",
+            role=role, user_type="individual", is_verified=True, is_active=True,
+        )
+
+    farmer, buyer = user("farmer", "farmer"), user("buyer", "buyer")
+    db.add_all([farmer, buyer])
+    db.flush()
+    db.execute(insert(models.Product), [
+        {
+            "name": f"Crop {i}", "description": "bench", "price": 100 + i, "category": "Vegetables",
+            "unit": "kg", "quantity_available": stock, "is_available": True,
+            "min_order_quantity": 1, "farmer_id": farmer.id,
+        }
+        for i in range(products)
+    ])
+    db.commit()
+    product_ids = [p.id for p in db.query(models.Product.id).order_by(models.Product.id)]
+    token = create_access_token({"sub": buyer.email})
+    db.close()
+    return product_ids, token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app.database opens ./farmconnect.db relative to the working directory
+        os.chdir(workdir)
+        os.environ["RUN_MIGRATIONS"] = "false"
+        product_ids, token = seed(max(args.lines), stock=args.repeat * 10)
+
+        from fastapi.testclient import TestClient
+        from sqlalchemy import event
+        from app.database import engine
+        from app.main import app
+
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        logging.getLogger("app.main").setLevel(logging.ERROR)
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"{'lines':>6}  {'median':>10}  {'statements':>10}")
+        with TestClient(app) as client:
+            for count in args.lines:
+                body = {
+                    "items": [{"product_id": pid, "quantity": 1} for pid in product_ids[:count]],
+                    "delivery_address": "1 Market Street",
+                }
+                timings = []
+                for _ in range(args.repeat):
+                    statements.clear()
+                    started = time.perf_counter()
+                    response = client.post("/api/orders/", headers=headers, json=body)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    assert response.status_code == 200, response.text
+                print(f"{count:>6}  {statistics.median(timings):>7.2f} ms  {len(statements):>10}")
+
+        engine.dispose()
+        os.chdir(BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
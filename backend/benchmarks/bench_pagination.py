@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark keyset pagination of the product catalog against OFFSET pagination.
+
+Seeds a throwaway SQLite database and times fetching page 1 through page
+10,000 of GET /api/products/ using the same keyset_page helper the router uses.
+
+Usage: python benchmarks/bench_pagination.py [--page-size 20] [--pages 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app import models
+from app.utils.pagination import keyset_page, encode_cursor
+
+
+def seed(session, total):
+    farmer = models.User(
+        email="bench@example.com", phone="+2348000000000", username="bench",
+        password_hash="x", first_name="Bench", last_name="Farmer", address="-",
+        city="Ibadan", state="Oyo", role="farmer", user_type="individual",
+    )
+    session.add(farmer)
+    session.commit()
+
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(total):
+        batch.append({
+            "name": f"Product {i}", "description": "bench", "price": 100 + i % 900,
+            "category": "Vegetables", "unit": "kg", "quantity_available": 10,
+            "is_available": True, "min_order_quantity": 1, "farmer_id": farmer.id,
+            # Several rows per second so the id tie-breaker is exercised
+            "created_at": start + timedelta(seconds=i // 3, milliseconds=250),
+        })
+        if len(batch) == 10_000:
+            session.execute(insert(models.Product), batch)
+            batch = []
+    if batch:
+        session.execute(insert(models.Product), batch)
+    session.commit()
+
+
+def cursor_before_page(session, page, page_size):
+    """Builds the cursor a client would hold after reading page-1 pages."""
+    if page == 1:
+        return None
+    last = (
+        session.query(models.Product.created_at, models.Product.id)
+        .order_by(models.Product.created_at.desc(), models.Product.id.desc())
+        .offset((page - 1) * page_size - 1)
+        .first()
+    )
+    return encode_cursor(last.created_at, last.id)
+
+
+def time_it(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    total = args.pages * args.page_size
+    print(f"Seeding {total:,} products...")
+    seed(session, total)
+
+    base_query = session.query(models.Product).filter(models.Product.is_available == True)
+
+    print(f"{'page':>8} {'keyset ms':>10} {'offset ms':>10}")
+    page = 1
+    while page <= args.pages:
+        cursor = cursor_before_page(session, page, args.page_size)
+        keyset_ms = time_it(lambda: keyset_page(
+            session, base_query, models.Product.created_at, models.Product.id,
+            cursor, args.page_size), args.repeat)
+        offset_ms = time_it(lambda: base_query.order_by(
+            models.Product.created_at.desc(), models.Product.id.desc()
+        ).offset((page - 1) * args.page_size).limit(args.page_size).all(), args.repeat)
+        print(f"{page:>8} {keyset_ms:>10.2f} {offset_ms:>10.2f}")
+        page *= 10
+
+    session.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark checkout throughput on one hot product against its stock shard count.
+
+Runs --threads buyers in-process, each taking one unit at a time through
+app.utils.stock.take_stock in its own transaction, which stays open for
+--hold-ms to stand in for the rest of create_order (order rows, ledger,
+rollups). Repeats for each shard count in --shards (0 = the plain products
+row), checks that stock plus units sold still equals the starting stock, and
+reports takes per second.
+
+Shards only pay off where the database locks rows: point --database-url at
+PostgreSQL. On SQLite (the default, a throwaway file) every write transaction
+takes the one database lock, so all shard counts queue the same way.
+
+Usage: python benchmarks/bench_stock_shards.py [--database-url URL] [--threads 32]
+       [--takes 50] [--hold-ms 5] [--shards 0,1,4,16]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--takes", type=int, default=50, help="units each thread buys")
+    parser.add_argument("--hold-ms", type=float, default=5.0)
+    parser.add_argument("--shards", default="0,1,4,16")
+    args = parser.parse_args()
+
+    from fastapi import HTTPException
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app import models
+    from app.utils.stock import take_stock
+    from app.utils.stock_shards import set_stock_shards, stock_levels
+
+    workdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(workdir.name, 'bench.db')}"
+    connect_args = {"check_same_thread": False, "timeout": 120} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=args.threads, max_overflow=0)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    stock = args.threads * args.takes
+
+    with Session() as db:
+        farmer = models.User(
+            email="farmer@example.com", phone="+2348000000000", username="farmer", password_hash="x",
+            first_name="farmer", last_name="Bench", address="-", city="Ibadan", state="Oyo",
+            role="farmer", user_type="individual", is_verified=True, is_active=True,
+        )
+        db.add(farmer)
+        db.flush()
+        product = models.Product(
+            name="Rice", description="Bench rice", price=1000, category="Grains", unit="bag",
+            quantity_available=stock, farmer_id=farmer.id, is_available=True, min_order_quantity=1,
+        )
+        db.add(product)
+        db.commit()
+        product_id = product.id
+
+    def buyer(_):
+        taken = retries = 0
+        while taken < args.takes:
+            with Session() as db:
+                try:
+                    take_stock(db, {product_id: 1})
+                    time.sleep(args.hold_ms / 1000)
+                    db.commit()
+                    taken += 1
+                except HTTPException:
+                    db.rollback()
+                    retries += 1
+        return retries
+
+    print(f"url={url.split('@')[-1]} threads={args.threads} takes={args.takes} hold={args.hold_ms:g}ms")
+    print(f"{'shards':>6}  {'takes/sec':>10}  {'retries':>7}  stock check")
+    for shards in [int(value) for value in args.shards.split(",")]:
+        # Restock the product unsharded, then move the stock into this round's shards
+        with Session() as db:
+            set_stock_shards(db, product_id, 0)
+            db.query(models.Product).filter(models.Product.id == product_id).update(
+                {"quantity_available": stock, "is_available": True}
+            )
+            set_stock_shards(db, product_id, shards)
+            db.commit()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            retries = sum(pool.map(buyer, range(args.threads)))
+        elapsed = time.perf_counter() - started
+
+        with Session() as db:
+            left = stock_levels(db, [product_id])[product_id]
+        check = "ok" if left == 0 else f"MISMATCH: {left} left of {stock}"
+        print(f"{shards:>6}  {stock / elapsed:>10.1f}  {retries:>7}  {check}")
+
+    engine.dispose()
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Rebuild the category facet tables from the products table.
+Run after bulk data fixes or whenever facet counts drift from the catalog.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.utils.facets import rebuild_category_facets
+
+db = SessionLocal()
+try:
+    print("Rebuilding category facets...")
+    count = rebuild_category_facets(db)
+    db.commit()
+    print(f"Category facets rebuilt for {count} categories")
+finally:
+    db.close()
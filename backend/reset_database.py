@@ -1,6 +1,10 @@
-from app.database import Base, engine
+from sqlalchemy import text
+
+from app.database import Base, engine, run_migrations
 
 print("⚙️ Recreating tables...")
 Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
+with engine.begin() as connection:
+    connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+run_migrations()
 print("✅ Tables recreated successfully")
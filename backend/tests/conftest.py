@@ -0,0 +1,163 @@
+# tests/conftest.py
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Make `app` importable when pytest is run from the backend directory
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+# Each test builds its own in-memory schema; don't migrate the dev database on import
+os.environ["RUN_MIGRATIONS"] = "false"
+os.environ["RESERVATION_SWEEPER"] = "false"
+os.environ["INVENTORY_COMPACTOR"] = "false"
+os.environ["KPI_REFRESHER"] = "false"
+os.environ["ORDER_ARCHIVER"] = "false"
+os.environ["STOCK_REBALANCER"] = "false"
+
+from app.main import app
+from app.database import Base, get_db
+from app import models
+from app.utils.auth_utils import create_access_token, principal_cache
+from app.utils.analytics import record_deliveries, record_sales
+from app.utils.cache import catalog_cache
+from app.utils.platform_kpis import forget_platform_kpis
+from app.utils.farmer_orders import link_order_farmers
+from app.utils.inventory import RESTOCK, record_movements
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # Row ids repeat across the per-test databases, so cached pages, principals and KPIs must not leak
+    catalog_cache.clear()
+    principal_cache.clear()
+    forget_platform_kpis()
+    yield
+    catalog_cache.clear()
+    principal_cache.clear()
+    forget_platform_kpis()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = TestingSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(engine):
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        session = TestingSession()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def make_user(db, username, role="buyer", user_type="individual"):
+    user = models.User(
+        email=f"{username}@example.com",
+        phone="+2348012345678",
+        username=username,
+        password_hash="not-used",
+        first_name=username.title(),
+        last_name="Test",
+        address="1 Farm Road",
+        city="Ibadan",
+        state="Oyo",
+        role=role,
+        user_type=user_type,
+        is_verified=True,
+        is_active=True,
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+
+
+def make_product(db, farmer, name="Tomatoes", category="Vegetables", price=500.0, quantity=100):
+    product = models.Product(
+        name=name,
+        description=f"Fresh {name.lower()}",
+        price=price,
+        category=category,
+        unit="kg",
+        quantity_available=quantity,
+        farmer_id=farmer.id,
+        is_available=True,
+        min_order_quantity=1,
+    )
+    db.add(product)
+    db.flush()
+    record_movements(db, RESTOCK, {product.id: quantity})
+    db.commit()
+    db.refresh(product)
+    return product
+
+
+def make_order(db, buyer, items, status="pending"):
+    """Creates an order directly; `items` is a list of (product, quantity)."""
+    total = sum(product.price * quantity for product, quantity in items)
+    order = models.Order(
+        order_number=f"ORD-TEST-{buyer.id}-{db.query(models.Order).count() + 1}",
+        customer_id=buyer.id,
+        total_amount=total,
+        status=status,
+        payment_status="pending",
+        delivery_type="standard",
+        delivery_address="1 Market Street",
+    )
+    db.add(order)
+    db.flush()
+    for product, quantity in items:
+        db.add(models.OrderItem(
+            order_id=order.id,
+            product_id=product.id,
+            quantity=quantity,
+            unit_price=product.price,
+            total_price=product.price * quantity,
+        ))
+    link_order_farmers(db, order.id, [(product.farmer_id, product.price * quantity) for product, quantity in items])
+    db.flush()
+    if status != "cancelled":
+        record_sales(db, [order])
+    if status == "delivered":
+        record_deliveries(db, [order.id])
+    db.commit()
+    db.refresh(order)
+    return order
@@ -0,0 +1,83 @@
+# tests/test_admin.py
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.routers import admin as admin_router
+from conftest import make_user, make_product, make_order, auth_headers
+from app.utils.platform_kpis import refresh_platform_kpis
+
+
+def test_admin_dashboard_serves_refreshed_kpis(client, db, engine):
+    admin = make_user(db, "admin1", role="admin")
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", price=500.0)
+    make_order(db, buyer, [(rice, 2)])
+    make_order(db, buyer, [(rice, 1)], status="cancelled")
+    refresh = sessionmaker(bind=engine)
+    refresh_platform_kpis(refresh)
+
+    response = client.get("/api/admin/dashboard", headers=auth_headers(admin))
+    assert response.status_code == 200
+    kpis = response.json()
+    assert (kpis["gmv"], kpis["orders"], kpis["active_farmers"]) == (1000.0, 2, 1)
+    assert (kpis["new_signups"], kpis["total_users"], kpis["window_days"]) == (3, 3, 30)
+    assert len(kpis["daily"]) == 30
+    assert (kpis["daily"][-1]["orders"], kpis["daily"][-1]["gmv"], kpis["daily"][-1]["signups"]) == (2, 1000.0, 3)
+
+    # Served from memory until the next refresh
+    make_user(db, "buyer2")
+    make_order(db, buyer, [(rice, 1)])
+    assert client.get("/api/admin/dashboard", headers=auth_headers(admin)).json() == kpis
+    refresh_platform_kpis(refresh)
+    fresh = client.get("/api/admin/dashboard", headers=auth_headers(admin)).json()
+    assert (fresh["gmv"], fresh["orders"], fresh["total_users"]) == (1500.0, 3, 4)
+    assert fresh["as_of"] > kpis["as_of"]
+
+    assert client.get("/api/admin/dashboard", headers=auth_headers(buyer)).status_code == 403
+
+
+def test_list_users_pages_users_with_the_snapshot_total(client, db, engine):
+    admin = make_user(db, "admin1", role="admin")
+    buyer = make_user(db, "buyer1")
+    make_user(db, "farmer1", role="farmer")
+    refresh_platform_kpis(sessionmaker(bind=engine))
+
+    response = client.get("/api/admin/users?page=2&page_size=2", headers=auth_headers(admin))
+    assert response.status_code == 200
+    listing = response.json()
+    assert (listing["page"], listing["page_size"], listing["total"]) == (2, 2, 3)
+    assert [user["username"] for user in listing["users"]] == ["farmer1"]
+    assert "password_hash" not in listing["users"][0]
+
+    assert client.get("/api/admin/users", headers=auth_headers(buyer)).status_code == 403
+
+
+def test_admin_product_edits_are_optimistically_locked(client, db, engine, monkeypatch):
+    admin = make_user(db, "admin1", role="admin")
+    farmer = make_user(db, "farmer1", role="farmer")
+    product = make_product(db, farmer, name="Beans", quantity=10)
+    headers = auth_headers(admin)
+    url = f"/api/admin/products/{product.id}"
+
+    assert client.put(url, json={"price": 650}, headers=auth_headers(farmer)).status_code == 403
+    response = client.put(url, json={"price": 650, "quantity_available": 12}, headers={**headers, "If-Match": '"1"'})
+    assert (response.status_code, response.headers["ETag"]) == (200, '"2"')
+    assert (response.json()["price"], response.json()["quantity_available"]) == (650, 12)
+    assert client.put(url, json={"price": 700}, headers={**headers, "If-Match": '"1"'}).status_code == 409
+
+    # A farmer's edit committed between the admin's If-Match check and its flush
+    record_product_change = admin_router.record_product_change
+
+    def farmer_edit_lands_first(*args):
+        with engine.begin() as connection:
+            connection.execute(update(models.Product).where(models.Product.id == product.id)
+                               .values(version=models.Product.version + 1))
+        record_product_change(*args)
+
+    monkeypatch.setattr(admin_router, "record_product_change", farmer_edit_lands_first)
+    raced = client.put(url, json={"price": 700}, headers={**headers, "If-Match": '"2"'})
+    assert raced.status_code == 409
+    monkeypatch.undo()
+    assert client.get("/api/products/").json()[0]["price"] == 650
@@ -0,0 +1,46 @@
+# tests/test_analytics.py
+from datetime import datetime
+
+from conftest import make_user, make_product, auth_headers
+from app.utils.analytics import rebuild_farmer_rollups
+
+
+def test_farmer_analytics_follow_order_lifecycle(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    other_farmer = make_user(db, "farmer2", role="farmer")
+    buyer, regular = make_user(db, "buyer1"), make_user(db, "buyer2")
+    rice = make_product(db, farmer, name="Rice", price=500.0)
+    beans = make_product(db, farmer, name="Beans", price=200.0)
+    yams = make_product(db, other_farmer, name="Yams", price=300.0)
+    farm = auth_headers(farmer)
+
+    def order(user, *lines):
+        return client.post("/api/orders/", headers=auth_headers(user), json={
+            "items": [{"product_id": product.id, "quantity": quantity} for product, quantity in lines],
+            "delivery_address": "1 Market Street",
+        }).json()["id"]
+
+    shipped = order(buyer, (rice, 2), (yams, 1))
+    open_order = order(regular, (rice, 1), (beans, 2))
+    cancelled = order(regular, (rice, 3))
+    assert client.post(f"/api/orders/{cancelled}/cancel", headers=auth_headers(regular)).status_code == 200
+    for status in ("confirmed", "shipped", "delivered"):
+        assert client.patch("/api/orders/status", headers=farm,
+                            json={"order_ids": [shipped], "status": status}).json()["updated"] == 1
+
+    response = client.get("/api/farmers/me/analytics", headers=farm)
+    assert response.status_code == 200
+    analytics = response.json()
+    assert (analytics["total_orders"], analytics["total_customers"], analytics["active_products"]) == (2, 2, 2)
+    assert analytics["total_earnings"] == 1000.0
+    assert [(p["product"], p["revenue"], p["sales"]) for p in analytics["product_performance"]] == [
+        ("Rice", 1500.0, 3), ("Beans", 400.0, 2)
+    ]
+    assert len(analytics["monthly_earnings"]) == 12
+    assert analytics["monthly_earnings"][-1] == {"month": datetime.utcnow().strftime("%b %Y"), "earned": 1000.0}
+
+    # Recomputing from order_items lands on the same numbers
+    rebuild_farmer_rollups(db)
+    db.commit()
+    assert client.get("/api/farmers/me/analytics", headers=farm).json() == analytics
+    assert client.get("/api/farmers/me/analytics", headers=auth_headers(buyer)).status_code == 403
@@ -0,0 +1,47 @@
+# tests/test_auth.py
+from conftest import make_user, auth_headers
+
+
+def test_profile_answers_conditional_requests(client, db):
+    user = make_user(db, "buyer1")
+    headers = auth_headers(user)
+
+    first = client.get("/api/auth/profile", headers=headers)
+    assert first.status_code == 200
+    assert first.json()["email"] == user.email
+
+    cached = client.get("/api/auth/profile", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+    client.put("/api/auth/profile", json={"city": "Kano"}, headers=headers)
+    changed = client.get("/api/auth/profile", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.json()["city"] == "Kano"
+
+
+def test_repeat_requests_skip_auth_queries_until_user_changes(client, db):
+    admin = make_user(db, "admin1", role="admin")
+    user = make_user(db, "buyer1")
+    headers = auth_headers(user)
+
+    first = client.get("/api/auth/profile", headers=headers)
+    assert int(first.headers["X-Query-Count"]) == 1
+    again = client.get("/api/auth/profile", headers=headers)
+    assert int(again.headers["X-Query-Count"]) == 0
+    assert again.json() == first.json()
+
+    # Edits go through the cached principal and drop it
+    assert client.put("/api/auth/profile", json={"city": "Kano"}, headers=headers).status_code == 200
+    assert client.get("/api/auth/profile", headers=headers).json()["city"] == "Kano"
+    assert client.get("/api/auth/profile", headers=headers).json()["city"] == "Kano"
+
+    # Deactivation drops the cached principal, and the token stops working
+    client.get("/api/auth/profile", headers=headers)
+    assert client.put(f"/api/admin/users/{user.id}/deactivate", headers=headers).status_code == 403
+    deactivated = client.put(f"/api/admin/users/{user.id}/deactivate", headers=auth_headers(admin))
+    assert deactivated.status_code == 200
+    profile = client.get("/api/auth/profile", headers=headers)
+    assert (profile.status_code, int(profile.headers["X-Query-Count"])) == (403, 1)
+    assert client.get("/api/auth/profile", headers=headers).status_code == 403
+
+    assert client.get("/api/auth/profile", headers={"Authorization": "Bearer not-a-token"}).status_code == 401
@@ -0,0 +1,66 @@
+# tests/test_inventory.py
+from sqlalchemy.orm import sessionmaker
+
+from conftest import make_user, make_product, auth_headers
+from app import models
+from app.utils.inventory import compact_inventory, ledger_stock
+
+
+def test_stock_changes_are_logged_and_balance(client, db, engine):
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", quantity=10)
+    beans = make_product(db, farmer, name="Beans", quantity=4)
+    farm = auth_headers(farmer)
+
+    response = client.post("/api/orders/", headers=auth_headers(buyer), json={
+        "items": [{"product_id": rice.id, "quantity": 3}, {"product_id": beans.id, "quantity": 1},
+                  {"product_id": rice.id, "quantity": 2}],
+        "delivery_address": "1 Market Street",
+    })
+    assert response.status_code == 200
+    order_id = response.json()["id"]
+    assert client.put(f"/api/products/{rice.id}", headers=farm, json={"quantity_available": 8}).status_code == 200
+    assert client.post(f"/api/orders/{order_id}/cancel", headers=auth_headers(buyer)).status_code == 200
+
+    response = client.get(f"/api/products/{rice.id}/inventory", headers=farm, params={"limit": 3})
+    assert response.status_code == 200
+    history = response.json()
+    assert (history["quantity_available"], history["ledger_quantity"]) == (13, 13)
+    assert [(m["kind"], m["delta"], m["order_id"]) for m in history["movements"]] == [
+        ("cancel", 5, order_id), ("adjustment", 3, None), ("sale", -5, order_id),
+    ]
+    older = client.get(f"/api/products/{rice.id}/inventory", headers=farm,
+                       params={"cursor": response.headers["X-Next-Cursor"]}).json()
+    assert [(m["kind"], m["delta"]) for m in older["movements"]] == [("restock", 10)]
+    assert client.get(f"/api/products/{rice.id}/inventory", headers=auth_headers(buyer)).status_code == 404
+
+    # Snapshots absorb the movements without changing the balance
+    assert compact_inventory(sessionmaker(bind=engine), batch_size=4) == 7
+    assert db.query(models.InventoryMovement).count() == 7
+    assert ledger_stock(db, [rice.id, beans.id]) == {rice.id: 13, beans.id: 4}
+    client.put(f"/api/products/{beans.id}", headers=farm, json={"quantity_available": 1})
+    assert ledger_stock(db, [rice.id, beans.id]) == {rice.id: 13, beans.id: 1}
+    assert compact_inventory(sessionmaker(bind=engine)) == 1
+    assert {s.product_id: s.quantity for s in db.query(models.InventorySnapshot)} == {rice.id: 13, beans.id: 1}
+
+
+def test_movements_committed_out_of_id_order_still_balance(db, engine):
+    from app.utils.inventory import RESTOCK, SALE
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    rice = make_product(db, farmer, name="Rice", quantity=10)
+    # Ids 2 and 3 are handed out; 3 commits (and is folded) while 2 is still in flight
+    db.add(models.InventoryMovement(id=3, product_id=rice.id, kind=RESTOCK, delta=5))
+    db.commit()
+    assert compact_inventory(sessionmaker(bind=engine)) == 2
+    assert ledger_stock(db, [rice.id]) == {rice.id: 15}
+
+    db.add(models.InventoryMovement(id=2, product_id=rice.id, kind=SALE, delta=-4))
+    db.commit()
+    assert ledger_stock(db, [rice.id]) == {rice.id: 11}
+    assert compact_inventory(sessionmaker(bind=engine)) == 1
+    assert ledger_stock(db, [rice.id]) == {rice.id: 11}
+    snapshot = db.get(models.InventorySnapshot, rice.id)
+    db.refresh(snapshot)
+    assert (snapshot.quantity, snapshot.last_movement_id) == (11, 3)
@@ -0,0 +1,72 @@
+# tests/test_migrations.py
+import os
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from app.database import Base
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config(connection):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.attributes["configure_logger"] = False
+    config.attributes["connection"] = connection
+    return config
+
+
+def test_migrations_match_models_and_round_trip(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    with engine.begin() as connection:
+        command.upgrade(alembic_config(connection), "0001")
+        connection.execute(text(
+            "INSERT INTO users (email, phone, username, password_hash, first_name, last_name, "
+            "address, city, state, role, user_type) "
+            "VALUES ('f@example.com', '1', 'f', 'x', 'F', 'F', '-', '-', '-', 'farmer', 'individual')"
+        ))
+        # Rows written before is_available became NOT NULL
+        connection.execute(text(
+            "INSERT INTO products (name, price, category, unit, farmer_id, is_available) "
+            "VALUES ('Yam', 300, 'Tubers', 'kg', 1, NULL)"
+        ))
+        # An order placed before farmer_orders existed, backfilled on upgrade
+        connection.execute(text(
+            "INSERT INTO orders (order_number, customer_id, total_amount, delivery_type, created_at) "
+            "VALUES ('ORD-1', 1, 900, 'standard', '2024-03-01 12:00:00')"
+        ))
+        connection.execute(text(
+            "INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price) "
+            "VALUES (1, 1, 1, 300, 300), (1, 1, 2, 300, 600)"
+        ))
+        command.upgrade(alembic_config(connection), "head")
+
+    with engine.connect() as connection:
+        # The FTS5 table and its shadow tables are managed outside the models
+        context = MigrationContext.configure(connection, opts={
+            "include_name": lambda name, type_, parents: not (name or "").startswith("products_fts"),
+        })
+        assert compare_metadata(context, Base.metadata) == []
+        assert connection.execute(text("SELECT is_available FROM products")).scalar() == 1
+        assert connection.execute(
+            text("SELECT rowid FROM products_fts WHERE products_fts MATCH 'yam'")
+        ).scalar() == 1
+        assert connection.execute(text("SELECT available_count FROM category_facets")).scalar() == 1
+        assert connection.execute(
+            text("SELECT farmer_id, order_id, subtotal, item_count FROM farmer_orders")
+        ).all() == [(1, 1, 900.0, 2)]
+        assert connection.execute(
+            text("SELECT product_id, quantity, last_movement_id FROM inventory_snapshots")
+        ).all() == [(1, 0, 0)]
+        assert connection.execute(
+            text("SELECT farmer_id, day, order_count, units, revenue, earned FROM farmer_daily_sales")
+        ).all() == [(1, "2024-03-01", 1, 3, 900.0, 0.0)]
+
+    with engine.begin() as connection:
+        command.downgrade(alembic_config(connection), "base")
+        command.upgrade(alembic_config(connection), "head")
+    engine.dispose()
@@ -0,0 +1,67 @@
+# tests/test_order_archive.py
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from conftest import make_user, make_product, make_order, auth_headers
+from app import models
+from app.utils.analytics import farmer_analytics, rebuild_farmer_rollups
+from app.utils.order_archive import archive_orders
+
+
+def test_archived_orders_stay_readable(client, db, engine):
+    farmer = make_user(db, "farmer1", role="farmer")
+    other_farmer = make_user(db, "farmer2", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", price=100.0)
+
+    long_ago = datetime.utcnow() - timedelta(days=400)
+    delivered = make_order(db, buyer, [(rice, 1)], status="delivered").id
+    cancelled = make_order(db, buyer, [(rice, 2)], status="cancelled").id
+    pending = make_order(db, buyer, [(rice, 3)]).id
+    recent = make_order(db, buyer, [(rice, 4)], status="delivered").id
+    for order_id, hours in ((delivered, 2), (cancelled, 1), (pending, 0)):
+        db.query(models.Order).filter(models.Order.id == order_id).update(
+            {"created_at": long_ago + timedelta(hours=hours)}
+        )
+    db.commit()
+    rebuild_farmer_rollups(db)
+    db.commit()
+    analytics = farmer_analytics(db, farmer.id)
+
+    # Only finished orders past the cutoff move, with their items and farmer links
+    assert archive_orders(sessionmaker(bind=engine), older_than_days=180, batch_size=1) == 2
+    assert archive_orders(sessionmaker(bind=engine), older_than_days=180) == 0
+    assert {order.id for order in db.query(models.Order)} == {pending, recent}
+    assert {order.id for order in db.query(models.ArchivedOrder)} == {delivered, cancelled}
+    assert db.query(models.ArchivedOrderItem).count() == 2
+    assert {link.order_id for link in db.query(models.ArchivedFarmerOrder)} == {delivered, cancelled}
+    assert db.query(models.FarmerOrder).count() == 2
+
+    # Listings interleave hot and archived orders in the usual order
+    response = client.get("/api/orders/my-orders", headers=auth_headers(buyer), params={"limit": 2})
+    assert [order["id"] for order in response.json()] == [recent, delivered]
+    assert response.json()[1]["order_items"][0]["product_name"] == "Rice"
+    response = client.get("/api/orders/my-orders", headers=auth_headers(buyer),
+                          params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+    assert [order["id"] for order in response.json()] == [cancelled, pending]
+    assert "X-Next-Cursor" not in response.headers
+    response = client.get("/api/orders/my-orders", headers=auth_headers(buyer), params={"status": "cancelled"})
+    assert [order["id"] for order in response.json()] == [cancelled]
+
+    response = client.get("/api/orders/farmer-orders", headers=auth_headers(farmer), params={"limit": 2})
+    assert [order["id"] for order in response.json()] == [recent, pending]
+    response = client.get("/api/orders/farmer-orders", headers=auth_headers(farmer),
+                          params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+    assert [(order["id"], order["farmer_subtotal"]) for order in response.json()] == [
+        (cancelled, 200.0), (delivered, 100.0),
+    ]
+
+    assert client.get(f"/api/orders/{delivered}", headers=auth_headers(buyer)).json()["status"] == "delivered"
+    assert client.get(f"/api/orders/{delivered}", headers=auth_headers(farmer)).status_code == 200
+    assert client.get(f"/api/orders/{delivered}", headers=auth_headers(other_farmer)).status_code == 403
+
+    # Rebuilt rollups still count archived orders
+    rebuild_farmer_rollups(db)
+    db.commit()
+    assert farmer_analytics(db, farmer.id) == analytics
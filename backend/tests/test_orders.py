@@ -0,0 +1,286 @@
+# tests/test_orders.py
+from conftest import make_user, make_product, make_order, auth_headers
+
+
+def test_order_listings_query_count_is_constant(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    tomatoes = make_product(db, farmer, name="Tomatoes")
+    onions = make_product(db, farmer, name="Onions")
+
+    def query_counts(buyer_name, order_count):
+        buyer = make_user(db, buyer_name)
+        for _ in range(order_count):
+            make_order(db, buyer, [(tomatoes, 2), (onions, 1)])
+
+        mine = client.get("/api/orders/my-orders", headers=auth_headers(buyer))
+        assert mine.status_code == 200
+        assert len(mine.json()) == min(order_count, 50)
+        assert {i["product_name"] for i in mine.json()[0]["order_items"]} == {"Tomatoes", "Onions"}
+
+        inbox = client.get("/api/orders/farmer-orders", headers=auth_headers(farmer))
+        assert inbox.status_code == 200
+        assert all(o["buyer_name"] for o in inbox.json())
+
+        return int(mine.headers["X-Query-Count"]), int(inbox.headers["X-Query-Count"])
+
+    assert query_counts("buyer1", 2) == query_counts("buyer2", 200)
+
+
+def test_order_histories_page_and_filter(client, db):
+    from datetime import datetime, timedelta
+    from app import models
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    other_farmer = make_user(db, "farmer2", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice")
+    yams = make_product(db, other_farmer, name="Yams")
+
+    start = datetime(2024, 3, 1, 12, 0, 0)
+    for day in range(10):
+        order = make_order(db, buyer, [(rice, 1)] if day % 2 else [(yams, 1)],
+                           status="delivered" if day < 4 else "pending")
+        order.created_at = start + timedelta(days=day)
+    db.commit()
+
+    def walk(path, headers, **params):
+        seen, cursor = [], None
+        while True:
+            query = {**params, **({"cursor": cursor} if cursor else {})}
+            response = client.get(path, headers=headers, params=query)
+            assert response.status_code == 200
+            seen += [o["created_at"][:10] for o in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return seen
+
+    mine = auth_headers(buyer)
+    assert walk("/api/orders/my-orders", mine, limit=3) == [f"2024-03-{d:02d}" for d in range(10, 0, -1)]
+    assert walk("/api/orders/my-orders", mine, limit=2, status="delivered") == [
+        "2024-03-04", "2024-03-03", "2024-03-02", "2024-03-01"
+    ]
+    assert walk("/api/orders/my-orders", mine, created_from="2024-03-03T00:00:00Z",
+                created_to="2024-03-05T00:00:00") == ["2024-03-04", "2024-03-03"]
+
+    # The farmer sees only the orders holding their products
+    inbox = auth_headers(farmer)
+    assert walk("/api/orders/farmer-orders", inbox, limit=2) == ["2024-03-10", "2024-03-08", "2024-03-06",
+                                                                "2024-03-04", "2024-03-02"]
+    assert walk("/api/orders/farmer-orders", inbox, status="pending", payment_status="pending") == [
+        "2024-03-10", "2024-03-08", "2024-03-06"
+    ]
+    assert client.get("/api/orders/farmer-orders", headers=mine).status_code == 403
+    assert db.query(models.Order).count() == 10
+
+    # Their share comes from the farmer_orders link, which also gates single orders
+    newest = client.get("/api/orders/farmer-orders", headers=inbox, params={"limit": 1}).json()[0]
+    assert (newest["farmer_subtotal"], newest["farmer_item_count"]) == (rice.price, 1)
+    assert client.get(f"/api/orders/{newest['id']}", headers=inbox).status_code == 200
+    assert client.get(f"/api/orders/{newest['id']}", headers=auth_headers(other_farmer)).status_code == 403
+
+
+def test_create_order_takes_stock_atomically(client, db):
+    from app import models
+    from app.utils.facets import rebuild_category_facets
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", category="Grains", quantity=5)
+    beans = make_product(db, farmer, name="Beans", category="Legumes", quantity=1)
+    rebuild_category_facets(db)
+    db.commit()
+    headers = auth_headers(buyer)
+
+    # The second line is short, so nothing from the first line may stick
+    response = client.post("/api/orders/", headers=headers, json={
+        "items": [{"product_id": rice.id, "quantity": 2}, {"product_id": beans.id, "quantity": 3}],
+        "delivery_address": "1 Market Street",
+    })
+    assert response.status_code == 400
+    assert db.query(models.Order).count() == 0
+    db.refresh(rice)
+    assert rice.quantity_available == 5
+
+    response = client.post("/api/orders/", headers=headers, json={
+        "items": [{"product_id": rice.id, "quantity": 2}, {"product_id": beans.id, "quantity": 1}],
+        "delivery_address": "1 Market Street",
+    })
+    assert response.status_code == 200
+    assert len(response.json()["order_items"]) == 2
+    link = db.query(models.FarmerOrder).filter(models.FarmerOrder.order_id == response.json()["id"]).one()
+    assert (link.farmer_id, link.subtotal, link.item_count) == (farmer.id, 2 * rice.price + beans.price, 2)
+    db.refresh(rice)
+    db.refresh(beans)
+    assert (rice.quantity_available, beans.quantity_available, beans.is_available) == (3, 0, False)
+    assert [f["category"] for f in client.get("/api/products/facets").json()] == ["Grains"]
+
+    response = client.post(f"/api/orders/{response.json()['id']}/cancel", headers=headers)
+    assert response.status_code == 200
+    db.refresh(rice)
+    db.refresh(beans)
+    assert (rice.quantity_available, beans.quantity_available, beans.is_available) == (5, 1, True)
+    assert [f["category"] for f in client.get("/api/products/facets").json()] == ["Grains", "Legumes"]
+
+
+def test_create_order_query_count_is_constant_in_lines(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    products = [make_product(db, farmer, name=f"Crop {i}", quantity=10) for i in range(40)]
+    headers = auth_headers(buyer)
+
+    def checkout(count):
+        response = client.post("/api/orders/", headers=headers, json={
+            "items": [{"product_id": p.id, "quantity": 1} for p in products[:count]],
+            "delivery_address": "1 Market Street",
+        })
+        assert response.status_code == 200
+        assert len(response.json()["order_items"]) == count
+        assert response.json()["total_amount"] == 500.0 * count
+        return int(response.headers["X-Query-Count"])
+
+    client.get("/api/orders/my-orders", headers=headers)  # later requests reuse the cached principal
+    assert checkout(2) == checkout(40)
+
+    # Repeated lines for one product are checked against their combined quantity
+    response = client.post("/api/orders/", headers=headers, json={
+        "items": [{"product_id": products[0].id, "quantity": 4}, {"product_id": products[0].id, "quantity": 5}],
+        "delivery_address": "1 Market Street",
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough stock for Crop 0. Available: 8"
+
+
+def test_idempotency_key_replays_first_order(client, db):
+    from datetime import datetime, timedelta
+    from app import models
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", quantity=5)
+    headers = {**auth_headers(buyer), "Idempotency-Key": "checkout-1"}
+    body = {"items": [{"product_id": rice.id, "quantity": 2}], "delivery_address": "1 Market Street"}
+
+    first = client.post("/api/orders/", headers=headers, json=body)
+    retry = client.post("/api/orders/", headers=headers, json=body)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.query(models.Order).count() == 1
+    db.refresh(rice)
+    assert rice.quantity_available == 3
+
+    # Same key, different request
+    changed = client.post("/api/orders/", headers=headers, json={**body, "delivery_address": "2 Farm Road"})
+    assert changed.status_code == 422
+
+    # A failed attempt releases its key, so the retry runs for real
+    short = {**auth_headers(buyer), "Idempotency-Key": "checkout-2"}
+    too_many = {"items": [{"product_id": rice.id, "quantity": 4}], "delivery_address": "1 Market Street"}
+    assert client.post("/api/orders/", headers=short, json=too_many).status_code == 400
+    assert db.query(models.IdempotencyKey).filter_by(key="checkout-2").count() == 0
+
+    # Keys expire after IDEMPOTENCY_TTL, after which the key can be used again
+    db.query(models.IdempotencyKey).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    again = client.post("/api/orders/", headers=headers, json=body)
+    assert again.status_code == 200
+    assert again.json()["id"] != first.json()["id"]
+    assert db.query(models.IdempotencyKey).count() == 1
+
+
+def test_bulk_status_update_reports_each_order(client, db):
+    from app import models
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    other_farmer = make_user(db, "farmer2", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice")
+    yams = make_product(db, other_farmer, name="Yams")
+    pending = make_order(db, buyer, [(rice, 1)])
+    mixed = make_order(db, buyer, [(rice, 1), (yams, 1)])
+    confirmed = make_order(db, buyer, [(rice, 1)], status="confirmed")
+    delivered = make_order(db, buyer, [(rice, 1)], status="delivered")
+    theirs = make_order(db, buyer, [(yams, 1)])
+    inbox = auth_headers(farmer)
+
+    response = client.patch("/api/orders/status", headers=inbox, json={
+        "order_ids": [pending.id, mixed.id, confirmed.id, delivered.id, theirs.id, 9999, pending.id],
+        "status": "confirmed",
+    })
+    assert response.status_code == 200
+    assert response.json()["updated"] == 2
+    assert [(r["order_id"], r["result"], r["status"]) for r in response.json()["results"]] == [
+        (pending.id, "updated", "confirmed"),
+        (mixed.id, "updated", "confirmed"),
+        (confirmed.id, "unchanged", "confirmed"),
+        (delivered.id, "invalid_transition", "delivered"),
+        (theirs.id, "forbidden", None),
+        (9999, "not_found", None),
+    ]
+    db.expire_all()
+    assert db.get(models.Order, theirs.id).status == "pending"
+
+    assert client.patch("/api/orders/status", headers=inbox, json={
+        "order_ids": [pending.id], "status": "cancelled"
+    }).status_code == 400
+    assert client.patch("/api/orders/status", headers=auth_headers(buyer), json={
+        "order_ids": [pending.id], "status": "shipped"
+    }).status_code == 403
+
+    # Single updates follow the same state machine
+    assert client.patch(f"/api/orders/{delivered.id}/status", headers=inbox,
+                        json={"status": "pending"}).status_code == 400
+    assert client.patch(f"/api/orders/{pending.id}/status", headers=inbox,
+                        json={"status": "shipped"}).status_code == 200
+
+
+def test_bulk_orders_validate_together_and_report_per_order(client, db):
+    import json
+    from app import models
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    other_farmer = make_user(db, "farmer2", role="farmer")
+    rice = make_product(db, farmer, name="Rice", price=1000, quantity=10)
+    yams = make_product(db, other_farmer, name="Yams", price=200, quantity=5)
+    business = auth_headers(make_user(db, "shop1", user_type="business"))
+
+    def upload(name, content, content_type):
+        return client.post("/api/orders/bulk", headers=business, files={"file": (name, content, content_type)})
+
+    procurement = (
+        "reference,delivery_address,product_id,quantity\n"
+        f"PO-1,1 Market Street,{rice.id},4\n"
+        f"PO-2,2 Market Street,{yams.id},2\n"
+        f"PO-1,,{yams.id},1\n"
+        f"PO-3,3 Market Street,{rice.id},7\n"  # only 6 left after PO-1
+        f"PO-4,4 Market Street,999,1\n"
+        f"PO-5,5 Market Street,{rice.id},0\n"
+    )
+    response = upload("procurement.csv", procurement, "text/csv")
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total_orders"], body["created"], body["rejected"]) == (5, 2, 3)
+    results = {r["reference"]: r for r in body["results"]}
+    assert (results["PO-1"]["result"], results["PO-1"]["total_amount"]) == ("created", 4200)
+    assert results["PO-3"]["errors"] == ["Not enough stock for Rice. Available: 6"]
+    assert results["PO-4"]["errors"] == ["Product 999 not found or unavailable"]
+    assert results["PO-5"]["errors"][0].startswith("items.0.quantity")
+
+    # Each created order is a normal order: stock, ledger and farmer inboxes agree
+    db.expire_all()
+    assert (db.get(models.Product, rice.id).quantity_available, db.get(models.Product, yams.id).quantity_available) == (6, 2)
+    assert client.get(f"/api/products/{rice.id}/inventory", headers=auth_headers(farmer)).json()["ledger_quantity"] == 6
+    inbox = client.get("/api/orders/farmer-orders", headers=auth_headers(other_farmer)).json()
+    assert sorted(o["farmer_subtotal"] for o in inbox) == [200, 400]
+    order = client.get(f"/api/orders/{results['PO-1']['order_id']}", headers=business).json()
+    assert {(i["product_name"], i["quantity"]) for i in order["order_items"]} == {("Rice", 4), ("Yams", 1)}
+
+    orders = [{"reference": f"JSON-{i}", "delivery_address": "1 Market Street",
+               "items": [{"product_id": rice.id, "quantity": 1}]} for i in range(7)]
+    body = upload("orders.json", json.dumps(orders), "application/json").json()
+    assert [r["result"] for r in body["results"]] == ["created"] * 6 + ["rejected"]
+
+    individual = auth_headers(make_user(db, "buyer1"))
+    response = client.post("/api/orders/bulk", headers=individual,
+                           files={"file": ("orders.json", json.dumps(orders), "application/json")})
+    assert response.status_code == 403
@@ -0,0 +1,380 @@
+# tests/test_products.py
+import pytest
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import models
+from app.utils.cache import catalog_cache
+from conftest import make_user, make_product, auth_headers
+
+
+def test_product_listing_pages_with_cursor(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    for i in range(7):
+        make_product(db, farmer, name=f"Product {i}")
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/products/", params=params)
+        assert response.status_code == 200
+        seen.extend(p["id"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    # Rows share a created_at second, so ordering falls back to id
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 7
+
+    # The frontend's origin may read the cursor
+    response = client.get("/api/products/", params={"limit": 3}, headers={"Origin": "http://localhost:5173"})
+    assert "X-Next-Cursor" in response.headers["Access-Control-Expose-Headers"]
+
+
+def test_product_listing_rejects_bad_cursor(client):
+    response = client.get("/api/products/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_product_listing_caps_limit(client):
+    response = client.get("/api/products/", params={"limit": 10_000})
+    assert response.status_code == 422
+
+
+def test_product_search_ranks_and_tracks_updates(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    yam = make_product(db, farmer, name="Yam Tubers", category="Tubers")
+    make_product(db, farmer, name="Fresh Pepper", category="Vegetables")
+    pepper_yam = make_product(db, farmer, name="Pepper Soup Mix", category="Spices")
+    pepper_yam.description = "Goes well with yam"
+    db.commit()
+
+    response = client.get("/api/products/", params={"q": "yam"})
+    assert [p["id"] for p in response.json()] == [yam.id, pepper_yam.id]
+
+    yam.name = "Cassava"
+    yam.category = "Roots"
+    yam.description = "Cassava roots"
+    db.commit()
+    catalog_cache.clear()  # written behind the API's back
+
+    response = client.get("/api/products/", params={"q": "yam"})
+    assert [p["id"] for p in response.json()] == [pepper_yam.id]
+
+    response = client.get("/api/products/", params={"q": "cassav"})
+    assert [p["id"] for p in response.json()] == [yam.id]
+
+
+def test_product_search_pages_by_relevance(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    for i in range(5):
+        make_product(db, farmer, name=f"Maize {i}", category="Grains")
+
+    first = client.get("/api/products/", params={"q": "maize", "limit": 3})
+    second = client.get("/api/products/", params={
+        "q": "maize", "limit": 3, "cursor": first.headers["X-Next-Cursor"]
+    })
+    ids = [p["id"] for p in first.json() + second.json()]
+    assert len(ids) == len(set(ids)) == 5
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_product_search_ignores_operators(client, db):
+    response = client.get("/api/products/", params={"q": '"*) OR ('})
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_product_listing_query_count_is_constant(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+
+    def listing_queries(count):
+        for i in range(count):
+            product = make_product(db, farmer, name=f"Product {i}")
+            db.add_all([
+                models.ProductImage(product_id=product.id, image_url=f"/media/products/{i}_a.jpg"),
+                models.ProductImage(product_id=product.id, image_url=f"/media/products/{i}_b.jpg"),
+            ])
+        db.commit()
+        catalog_cache.clear()
+        response = client.get("/api/products/", params={"limit": 500})
+        assert all(len(p["images"]) == 2 for p in response.json())
+        return int(response.headers["X-Query-Count"])
+
+    # 3 products, then a full 500-product page
+    assert listing_queries(3) == listing_queries(497)
+
+
+def test_product_listing_is_cached_until_a_write(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    other = make_user(db, "farmer2", role="farmer")
+    product = make_product(db, farmer, name="Rice", category="Grains", price=900)
+    make_product(db, other, name="Okra", category="Vegetables", price=300)
+
+    grains = {"category": "Grains"}
+    cheap_veg = {"category": "vegetables", "max_price": 400}
+    assert client.get("/api/products/", params=grains).json()[0]["price"] == 900
+    assert [p["name"] for p in client.get("/api/products/", params=cheap_veg).json()] == ["Okra"]
+    client.get("/api/products/", params=cheap_veg)
+    client.get("/api/products/categories/list")
+
+    stats = client.get("/api/products/cache/stats").json()
+    client.get("/api/products/", params=grains)
+    assert client.get("/api/products/cache/stats").json()["hits"] == stats["hits"] + 1
+
+    response = client.put(
+        f"/api/products/{product.id}", json={"price": 950}, headers=auth_headers(farmer)
+    )
+    assert response.status_code == 200
+
+    # Only the grains listing showed the product; the category list is unaffected
+    stats = client.get("/api/products/cache/stats").json()
+    assert stats["invalidations"] == 1
+    assert client.get("/api/products/", params=grains).json()[0]["price"] == 950
+    before_hits = stats["hits"]
+    client.get("/api/products/", params=cheap_veg)
+    client.get("/api/products/categories/list")
+    assert client.get("/api/products/cache/stats").json()["hits"] == before_hits + 2
+
+
+def test_catalog_endpoints_answer_conditional_requests(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    product = make_product(db, farmer, name="Beans", category="Legumes")
+
+    for path in ("/api/products/", "/api/products/categories/list"):
+        first = client.get(path)
+        assert first.headers["ETag"].startswith('"')
+        assert "Last-Modified" in first.headers
+
+        cached = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        since = client.get(path, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        assert since.status_code == 304
+
+    etag = client.get("/api/products/").headers["ETag"]
+    client.put(f"/api/products/{product.id}", json={"price": 650}, headers=auth_headers(farmer))
+    changed = client.get("/api/products/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["price"] == 650
+
+
+def test_product_edits_are_optimistically_locked(client, db, engine):
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    product = make_product(db, farmer, name="Beans", quantity=10)
+    headers = auth_headers(farmer)
+    assert client.get("/api/products/").json()[0]["version"] == 1
+
+    response = client.put(f"/api/products/{product.id}", json={"price": 650},
+                          headers={**headers, "If-Match": '"1"'})
+    assert (response.status_code, response.headers["ETag"], response.json()["version"]) == (200, '"2"', 2)
+    stale = client.put(f"/api/products/{product.id}", json={"price": 700}, headers={**headers, "If-Match": '"1"'})
+    assert stale.status_code == 409
+    assert client.put(f"/api/products/{product.id}", json={"price": 700},
+                      headers={**headers, "If-Match": 'W/"2"'}).status_code == 409
+
+    # Checkout takes stock without invalidating the farmer's copy
+    client.post("/api/orders/", headers=auth_headers(buyer), json={
+        "items": [{"product_id": product.id, "quantity": 2}], "delivery_address": "1 Market Street",
+    })
+    response = client.put(f"/api/products/{product.id}", json={"quantity_available": 20},
+                          headers={**headers, "If-Match": '"2"'})
+    assert (response.json()["quantity_available"], response.json()["price"]) == (20, 650)
+
+    # An edit committed between another writer's read and its flush fails the version check
+    other = sessionmaker(bind=engine)()
+    loaded = other.get(models.Product, product.id)
+    client.put(f"/api/products/{product.id}", json={"name": "Brown beans"}, headers=headers)
+    loaded.price = 1.0
+    with pytest.raises(StaleDataError):
+        other.commit()
+    other.close()
+
+
+def test_facets_track_product_writes_and_match_rebuild(client, db):
+    from app.utils.facets import rebuild_category_facets
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    headers = auth_headers(farmer)
+    ids = []
+    for name, category, price in [
+        ("Rice", "Grains", 900), ("Millet", "Grains", 300), ("Maize", "Grains", 150), ("Okra", "Vegetables", 80)
+    ]:
+        response = client.post("/api/products/", headers=headers, json={
+            "name": name, "description": name, "price": price,
+            "category": category, "unit": "kg", "quantity_available": 10,
+        })
+        ids.append(response.json()["id"])
+
+    client.put(f"/api/products/{ids[0]}", json={"price": 2000}, headers=headers)
+    client.delete(f"/api/products/{ids[2]}", headers=headers)
+    client.put(f"/api/products/{ids[3]}", json={"category": "Grains"}, headers=headers)
+
+    facets = client.get("/api/products/facets").json()
+    assert [f["category"] for f in facets] == ["Grains"]
+    grains = facets[0]
+    assert grains["available_count"] == 3
+    assert (grains["min_price"], grains["max_price"]) == (80, 2000)
+    assert sum(b["count"] for b in grains["buckets"]) == 3
+
+    rebuild_category_facets(db)
+    db.commit()
+    assert client.get("/api/products/facets").json() == facets
+
+
+def test_catalog_export_streams_ndjson_and_csv(client, db):
+    import csv
+    import io
+    import json
+    from datetime import datetime, timedelta
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    rice = make_product(db, farmer, name="Rice", category="Grains", price=900)
+    okra = make_product(db, farmer, name="Okra", category="Vegetables", price=300)
+    db.add(models.ProductImage(product_id=rice.id, image_url="/media/products/rice.jpg"))
+    db.commit()
+
+    response = client.get("/api/products/export")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [rice.id, okra.id]
+    assert rows[0]["image_urls"] == ["/media/products/rice.jpg"]
+
+    response = client.get("/api/products/export", params={"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["name"] for row in rows] == ["Rice", "Okra"]
+    assert rows[0]["image_urls"] == "/media/products/rice.jpg"
+
+    # Incremental pulls include products withdrawn since the watermark
+    since = (datetime.utcnow() - timedelta(seconds=1)).isoformat()
+    client.delete(f"/api/products/{okra.id}", headers=auth_headers(farmer))
+    response = client.get("/api/products/export", params={"updated_since": since})
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["id"], row["is_available"]) for row in rows if row["id"] == okra.id] == [(okra.id, False)]
+
+    response = client.get("/api/products/export", params={"updated_since": "2999-01-01T00:00:00Z"})
+    assert response.text == ""
+    assert "X-Export-Watermark" in response.headers
+
+
+def test_bulk_import_reports_row_errors_and_runs_large_files_as_jobs(client, db):
+    import json
+    from app.utils.product_import import IMPORT_SYNC_ROWS
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    headers = auth_headers(farmer)
+    upload = (
+        "name,description,price,category,unit,quantity_available\n"
+        "Rice,Local rice,900,Grains,bag,10\n"
+        "Millet,Pearl millet,-5,Grains,bag,10\n"
+        "Okra,Fresh okra,300,Vegetables,kg,20\n"
+    )
+    response = client.post(
+        "/api/products/import", headers=headers,
+        files={"file": ("products.csv", upload, "text/csv")},
+    )
+    assert response.status_code == 200
+    job = response.json()
+    assert (job["status"], job["total_rows"], job["created_count"], job["error_count"]) == ("completed", 3, 2, 1)
+    assert job["errors"][0]["row"] == 2 and job["errors"][0]["errors"][0].startswith("price")
+    assert {p["name"] for p in client.get("/api/products/").json()} == {"Rice", "Okra"}
+    assert {f["category"]: f["available_count"] for f in client.get("/api/products/facets").json()} == {
+        "Grains": 1, "Vegetables": 1
+    }
+
+    rows = [
+        {"name": f"Yam {i}", "description": "Tubers", "price": 100 + i,
+         "category": "Tubers", "unit": "kg", "quantity_available": 5}
+        for i in range(IMPORT_SYNC_ROWS + 1)
+    ]
+    response = client.post(
+        "/api/products/import", headers=headers,
+        files={"file": ("products.json", json.dumps(rows), "application/json")},
+    )
+    assert response.status_code == 202
+    # TestClient runs background tasks before returning the response
+    job = client.get(f"/api/products/import/{response.json()['id']}", headers=headers).json()
+    assert (job["status"], job["created_count"]) == ("completed", IMPORT_SYNC_ROWS + 1)
+
+    buyer = make_user(db, "buyer1")
+    response = client.post(
+        "/api/products/import", headers=auth_headers(buyer),
+        files={"file": ("products.csv", upload, "text/csv")},
+    )
+    assert response.status_code == 403
+
+
+def test_near_me_filters_by_radius_and_orders_by_distance(client, db):
+    farms = {"lagos": (6.5244, 3.3792), "abeokuta": (7.1475, 3.3619), "ibadan": (7.3775, 3.9470)}
+    products = {}
+    for name, (lat, lng) in farms.items():
+        farmer = make_user(db, name, role="farmer")
+        headers = auth_headers(farmer)
+        client.put("/api/auth/profile", json={"latitude": lat, "longitude": lng}, headers=headers)
+        response = client.post("/api/products/", headers=headers, json={
+            "name": f"{name} yam", "description": "Yam", "price": 500,
+            "category": "Tubers", "unit": "kg", "quantity_available": 10,
+        })
+        products[name] = response.json()["id"]
+
+    near_lagos = {"near": "6.5244,3.3792", "radius_km": 100}
+    page = client.get("/api/products/", params={**near_lagos, "limit": 1})
+    second = client.get("/api/products/", params={
+        **near_lagos, "limit": 1, "cursor": page.headers["X-Next-Cursor"]
+    })
+    assert [p["id"] for p in page.json() + second.json()] == [products["lagos"], products["abeokuta"]]
+    assert page.json()[0]["distance_km"] == 0
+    assert 60 < second.json()[0]["distance_km"] < 80
+    assert "X-Next-Cursor" not in second.headers
+
+    # Moving a farm moves its products and drops cached radius searches
+    ibadan = db.query(models.User).filter(models.User.username == "ibadan").one()
+    client.put("/api/auth/profile", json={"latitude": 6.6, "longitude": 3.35}, headers=auth_headers(ibadan))
+    ids = [p["id"] for p in client.get("/api/products/", params=near_lagos).json()]
+    assert ids == [products["lagos"], products["ibadan"], products["abeokuta"]]
+
+    assert client.get("/api/products/", params={"near": "lagos"}).status_code == 400
+
+
+def test_geohash_cell_ranges_stay_inside_the_alphabet():
+    from app.utils.geo import geohash_range_end
+
+    assert geohash_range_end("s0d") == "s0e"
+    assert geohash_range_end("s09") == "s0b"
+    assert geohash_range_end("s0z") == "s1"
+    assert geohash_range_end("szz") == "t"
+    assert geohash_range_end("zz") is None
+    # Every hash inside a cell sorts in [cell, end) whatever the collation does with punctuation
+    assert "s0d" <= "s0dzzzzzz" < geohash_range_end("s0d")
+
+
+def test_listing_loaded_before_a_write_is_not_cached(client, db, monkeypatch):
+    from app.routers import products as products_router
+    from app.utils.cache import invalidate_product, product_snapshot
+
+    farmer = make_user(db, "farmer1", role="farmer")
+    rice = make_product(db, farmer, name="Rice", category="Grains", price=900)
+    load_page = products_router._load_product_page
+
+    def load_then_write(*args):
+        page = load_page(*args)
+        # A price edit commits and invalidates after this page was read
+        before = product_snapshot(rice)
+        rice.price = 950
+        db.commit()
+        invalidate_product(before, product_snapshot(rice))
+        return page
+
+    monkeypatch.setattr(products_router, "_load_product_page", load_then_write)
+    assert client.get("/api/products/").json()[0]["price"] == 900
+    monkeypatch.setattr(products_router, "_load_product_page", load_page)
+
+    assert client.get("/api/products/cache/stats").json()["stale_fills"] == 1
+    assert client.get("/api/products/").json()[0]["price"] == 950
@@ -0,0 +1,114 @@
+# tests/test_reservations.py
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from conftest import make_user, make_product, auth_headers
+from app import models
+from app.utils.reservations import sweep_expired_reservations
+
+
+def _listed(client, product_id):
+    return next(p for p in client.get("/api/products/").json() if p["id"] == product_id)
+
+
+def test_reservation_holds_stock_until_ordered(client, db):
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rival = make_user(db, "buyer2")
+    rice = make_product(db, farmer, name="Rice", quantity=5)
+
+    response = client.post("/api/reservations/", headers=auth_headers(buyer), json={
+        "items": [{"product_id": rice.id, "quantity": 3}],
+    })
+    assert response.status_code == 201
+    reservation_id = response.json()["id"]
+    listed = _listed(client, rice.id)
+    assert (listed["quantity_available"], listed["quantity_reserved"], listed["quantity_sellable"]) == (5, 3, 2)
+
+    # Held units aren't for sale to anyone else
+    response = client.post("/api/orders/", headers=auth_headers(rival), json={
+        "items": [{"product_id": rice.id, "quantity": 3}], "delivery_address": "2 Farm Road",
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough stock for Rice. Available: 2"
+    assert client.post("/api/reservations/", headers=auth_headers(rival), json={
+        "items": [{"product_id": rice.id, "quantity": 3}],
+    }).status_code == 400
+
+    # ...and convert into an order in one step
+    order_body = {"reservation_id": reservation_id, "delivery_address": "1 Market Street"}
+    response = client.post("/api/orders/", headers=auth_headers(buyer), json=order_body)
+    assert response.status_code == 200
+    assert [(i["product_id"], i["quantity"]) for i in response.json()["order_items"]] == [(rice.id, 3)]
+    db.refresh(rice)
+    assert (rice.quantity_available, rice.quantity_reserved) == (2, 0)
+    assert db.query(models.Reservation).count() == 0
+
+    assert client.post("/api/orders/", headers=auth_headers(buyer), json=order_body).status_code == 404
+
+
+def test_expired_reservations_are_swept(client, db, engine):
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", quantity=10)
+    beans = make_product(db, farmer, name="Beans", quantity=10)
+    headers = auth_headers(buyer)
+
+    ids = [
+        client.post("/api/reservations/", headers=headers, json={"items": items}).json()["id"]
+        for items in (
+            [{"product_id": rice.id, "quantity": 2}, {"product_id": beans.id, "quantity": 1}],
+            [{"product_id": rice.id, "quantity": 3}],
+            [{"product_id": beans.id, "quantity": 4}],
+        )
+    ]
+    assert [r["id"] for r in client.get("/api/reservations/", headers=headers).json()] == ids
+
+    # Cancelling gives the stock back straight away
+    assert client.delete(f"/api/reservations/{ids[2]}", headers=headers).status_code == 200
+    db.refresh(beans)
+    assert beans.quantity_reserved == 1
+
+    db.query(models.Reservation).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    response = client.post("/api/orders/", headers=headers, json={
+        "reservation_id": ids[0], "delivery_address": "1 Market Street",
+    })
+    assert response.status_code == 410
+
+    released = sweep_expired_reservations(sessionmaker(bind=engine), batch_size=1)
+    assert released == 2
+    db.refresh(rice)
+    db.refresh(beans)
+    assert (rice.quantity_reserved, beans.quantity_reserved) == (0, 0)
+    assert (rice.quantity_available, beans.quantity_available) == (10, 10)
+    assert db.query(models.ReservationItem).count() == 0
+
+
+def test_cached_listings_follow_holds_releases_and_sweeps(client, db, engine):
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", quantity=5)
+    headers = auth_headers(buyer)
+
+    def sellable():
+        response = client.get("/api/products/")
+        return response.json()[0]["quantity_sellable"], response.headers["ETag"]
+
+    before, etag = sellable()
+    assert before == 5 and sellable() == (5, etag)  # served from the cache
+    hold = {"items": [{"product_id": rice.id, "quantity": 3}]}
+    first = client.post("/api/reservations/", headers=headers, json=hold).json()["id"]
+    held, held_etag = sellable()
+    assert held == 2 and held_etag != etag
+
+    assert client.delete(f"/api/reservations/{first}", headers=headers).status_code == 200
+    assert sellable()[0] == 5
+
+    client.post("/api/reservations/", headers=headers, json=hold)
+    assert sellable()[0] == 2
+    db.query(models.Reservation).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert sweep_expired_reservations(sessionmaker(bind=engine)) == 1
+    assert sellable()[0] == 5
@@ -0,0 +1,71 @@
+# tests/test_stock_shards.py
+from sqlalchemy.orm import sessionmaker
+
+from conftest import make_user, make_product, auth_headers
+from app import models
+from app.utils.stock_shards import rebalance_stock_shards, stock_levels
+
+
+def shard_quantities(db, product_id):
+    db.expire_all()
+    return [shard.quantity for shard in db.query(models.ProductStockShard).filter(
+        models.ProductStockShard.product_id == product_id
+    ).order_by(models.ProductStockShard.shard)]
+
+
+def test_high_contention_products_sell_from_shards(client, db, engine):
+    farmer = make_user(db, "farmer1", role="farmer")
+    buyer = make_user(db, "buyer1")
+    rice = make_product(db, farmer, name="Rice", quantity=10)
+    farm, buy = auth_headers(farmer), auth_headers(buyer)
+
+    def order(quantity):
+        return client.post("/api/orders/", headers=buy, json={
+            "items": [{"product_id": rice.id, "quantity": quantity}], "delivery_address": "1 Market Street",
+        })
+
+    response = client.put(f"/api/products/{rice.id}", headers=farm, json={"stock_shards": 4})
+    assert (response.json()["stock_shards"], response.json()["quantity_available"]) == (4, 10)
+    assert shard_quantities(db, rice.id) == [3, 3, 2, 2]
+
+    def listed():
+        return [(p["name"], p["quantity_available"]) for p in client.get("/api/products/").json()]
+
+    # Checkouts take from the shards; the products row is only a cached total,
+    # so the listing lags sales until the rebalancer refreshes it
+    assert listed() == [("Rice", 10)]
+    first = order(2).json()["id"]
+    assert order(2).status_code == 200
+    assert order(2).status_code == 200
+    assert sum(shard_quantities(db, rice.id)) == 4
+    assert db.get(models.Product, rice.id).quantity_available == 10
+    assert listed() == [("Rice", 10)]
+    history = client.get(f"/api/products/{rice.id}/inventory", headers=farm).json()
+    assert (history["quantity_available"], history["ledger_quantity"]) == (4, 4)
+    assert rebalance_stock_shards(sessionmaker(bind=engine)) == 1
+    assert listed() == [("Rice", 4)]
+
+    assert order(5).json()["detail"] == "Not enough stock for Rice. Available: 4"
+    # The sale that empties the last shard delists the product straight away
+    assert order(4).status_code == 200  # spans several shards
+    assert sum(shard_quantities(db, rice.id)) == 0
+    assert listed() == []
+    db.expire_all()
+    product = db.get(models.Product, rice.id)
+    assert (product.quantity_available, product.is_available) == (0, False)
+    assert client.get("/api/products/facets").json() == []
+    assert rebalance_stock_shards(sessionmaker(bind=engine)) == 0
+    hold = {"items": [{"product_id": rice.id, "quantity": 1}]}
+    assert client.post("/api/reservations/", headers=buy, json=hold).status_code == 409
+
+    assert client.post(f"/api/orders/{first}/cancel", headers=buy).status_code == 200
+    assert sum(shard_quantities(db, rice.id)) == 2
+    assert db.get(models.Product, rice.id).is_available is True
+
+    response = client.put(f"/api/products/{rice.id}", headers=farm, json={"quantity_available": 9})
+    assert response.json()["quantity_available"] == 9
+    assert shard_quantities(db, rice.id) == [3, 2, 2, 2]
+    response = client.put(f"/api/products/{rice.id}", headers=farm, json={"stock_shards": 0})
+    assert (response.json()["stock_shards"], response.json()["quantity_available"]) == (0, 9)
+    assert shard_quantities(db, rice.id) == []
+    assert stock_levels(db, [rice.id]) == {rice.id: 9}
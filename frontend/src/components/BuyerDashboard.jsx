@@ -6,6 +6,7 @@ import { Badge } from "../components/ui/badge";
 import { useLanguage } from "../contexts/LanguageContext";
 import { Input } from "../components/ui/input";
 import axios from 'axios';
+import { fetchAllPages } from '../services/api';
 
 import {
   ShoppingCart,
@@ -209,7 +210,7 @@ const BuyerDashboard = () => {
       try {
         // Try with auth first if available, otherwise without
         const productHeaders = headers.Authorization ? headers : {};
-        productsResponse = await axios.get(`${API_BASE}/products`, {
+        productsResponse = await fetchAllPages(axios, `${API_BASE}/products`, {
           headers: productHeaders,
           timeout: 10000
         });
@@ -218,7 +219,7 @@ const BuyerDashboard = () => {
         console.error('❌ Error loading products:', err.response?.status, err.response?.data || err.message);
         // Try without auth headers if auth failed
         try {
-          productsResponse = await axios.get(`${API_BASE}/products`, { timeout: 10000 });
+          productsResponse = await fetchAllPages(axios, `${API_BASE}/products`, { timeout: 10000 });
           console.log('✅ Products loaded without auth:', productsResponse.data?.length || 0, 'products');
         } catch (err2) {
           console.error('❌ Products endpoint failed even without auth:', err2.message);
@@ -44,6 +44,7 @@ import { Badge } from '../components/ui/badge';
 import { Input } from '../components/ui/input';
 import StatsCard from '../components/StatsCard';
 import axios from 'axios';
+import { fetchAllPages } from '../services/api';
 
 // ✅ BACKEND INTEGRATION CONSTANTS - UPDATED
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:8002';
@@ -508,9 +509,9 @@ const FarmerDashboard = () => {
 
       // Load products
       try {
-        const productsResponse = await axios.get(
-          `${API_BASE}/products?farmer_id=${currentUser.id}`,
-          { headers, timeout: 10000 }
+        const productsResponse = await fetchAllPages(
+          axios, `${API_BASE}/products`,
+          { headers, timeout: 10000, params: { farmer_id: currentUser.id } }
         );
         const productsWithFullImageUrls = productsResponse.data.map(product => ({
           ...product,
@@ -35,9 +35,25 @@ api.interceptors.response.use(
   }
 );
 
+// Paged listings (e.g. /api/products) return one page at a time, with the
+// next page's cursor in the X-Next-Cursor header; follow it to the end.
+export const fetchAllPages = async (client, url, config = {}) => {
+  const items = [];
+  let cursor;
+  do {
+    const response = await client.get(url, {
+      ...config,
+      params: { limit: 500, ...config.params, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return { data: items };
+};
+
 // ✅ Named exports for different API groups
 export const productAPI = {
-  getAll: (params = {}) => api.get("/api/products", { params }),
+  getAll: (params = {}) => fetchAllPages(api, "/api/products", { params }),
   getById: (id) => api.get(`/api/products/${id}`),
   create: (data) => api.post("/api/products", data),
   update: (id, data) => api.put(`/api/products/${id}`, data),